@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Polyberg Adaptive Concurrency
+AIMD in-flight limit for bulk paginated API fetches
+- Additive increase: +1 in-flight request per round trip of successes
+- Multiplicative decrease on 429, timeouts, or latency well above the
+  no-load baseline; at most one cut per round trip
+- The learned limit persists per host across cycles, and is reported as a
+  gauge in the "http" metrics component
+- `python src/adaptive_concurrency.py` runs it against a local throttling
+  stand-in server
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+try:
+    from .http_client import HttpClient, backoff, set_host_limit, shared_client
+    from .instrumentation import metrics
+except ImportError:
+    from http_client import HttpClient, backoff, set_host_limit, shared_client
+    from instrumentation import metrics
+
+INITIAL_LIMIT = 4
+MIN_LIMIT = 1
+MAX_LIMIT = 32
+DECREASE = 0.5
+LATENCY_TOLERANCE = 2.0  # cut when latency exceeds baseline by this factor...
+LATENCY_SLACK = 0.05     # ...and by at least this many seconds (ignores jitter on fast links)
+PAGE_ATTEMPTS = 5
+
+
+class AIMDController:
+    """Additive-increase / multiplicative-decrease concurrency limit"""
+
+    def __init__(self, name: str, initial: float = INITIAL_LIMIT, min_limit: int = MIN_LIMIT,
+                 max_limit: int = MAX_LIMIT, decrease: float = DECREASE,
+                 latency_tolerance: float = LATENCY_TOLERANCE):
+        """
+        Args:
+            name: Gauge name in the "http" metrics component
+            initial: Starting in-flight limit
+            min_limit / max_limit: Bounds for the limit
+            decrease: Factor applied to the limit on a congestion signal
+            latency_tolerance: Latency / baseline ratio treated as congestion
+        """
+        self.name = name
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.baseline: Optional[float] = None  # no-load latency estimate
+        self.rtt = 0.1  # smoothed latency; also the minimum spacing between cuts
+        self._last_cut = 0.0
+        self._lock = threading.Lock()
+        self.metrics = metrics("http")
+        self.stats = {"ok": 0, "throttled": 0, "timeout": 0, "error": 0, "cuts": 0}
+        self.metrics.gauge(f"{name}.limit", self.limit)
+
+    @property
+    def allowed(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    def on_result(self, outcome: str, latency: float = 0.0) -> None:
+        """Feed one request outcome: "ok", "throttled", "timeout" or "error" """
+        with self._lock:
+            self.stats[outcome] += 1
+            now = time.monotonic()
+            if outcome == "ok":
+                self.rtt += (latency - self.rtt) * 0.2
+                if self.baseline is None or latency < self.baseline:
+                    self.baseline = latency
+                else:
+                    # Let the baseline follow a slower path over time
+                    self.baseline += (latency - self.baseline) * 0.01
+                if (latency > self.baseline * self.latency_tolerance
+                        and latency - self.baseline > LATENCY_SLACK):
+                    self._cut(now)
+                else:
+                    # 1/limit per success adds about one slot per round trip
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            elif outcome in ("throttled", "timeout"):
+                self._cut(now)
+            self.metrics.gauge(f"{self.name}.limit", round(self.limit, 2))
+
+    def _cut(self, now: float) -> None:
+        # Requests already in flight report the same congestion; count it once
+        if now - self._last_cut < self.rtt:
+            return
+        self._last_cut = now
+        self.limit = max(self.min_limit, self.limit * self.decrease)
+        self.stats["cuts"] += 1
+        self.metrics.count(f"{self.name}.cuts")
+
+
+_controllers: Dict[str, AIMDController] = {}
+_controllers_lock = threading.Lock()
+
+
+def controller(host: str) -> AIMDController:
+    """Process-wide controller for `host`, so what one sync learns the next reuses"""
+    with _controllers_lock:
+        c = _controllers.get(host)
+        if c is None:
+            c = _controllers[host] = AIMDController(host)
+        return c
+
+
+def _fetch_page(http: HttpClient, url: str, params: dict, timeout) -> Tuple[str, float, Optional[list]]:
+    try:
+        response = http.get(url, params, retries=0, timeout=timeout)
+    except requests.Timeout:
+        return "timeout", 0.0, None
+    except requests.RequestException:
+        return "error", 0.0, None
+    # elapsed is time to response headers, so token-bucket waits are not counted
+    latency = response.elapsed.total_seconds()
+    if response.status_code == 429:
+        return "throttled", latency, None
+    if response.status_code != 200:
+        return "error", latency, None
+    try:
+        data = response.json()
+    except ValueError:
+        return "error", latency, None
+    return "ok", latency, data if isinstance(data, list) else []
+
+
+def fetch_pages(url: str, params: dict = None, page_size: int = 200, max_pages: Optional[int] = None,
+                http: HttpClient = None, ctl: AIMDController = None, timeout=(5, 15)) -> List[list]:
+    """Fetch offset-paginated results with an adaptive number of requests in flight
+
+    Pages are requested ahead speculatively; the first page shorter than
+    `page_size` marks the end. Throttled or failed pages are retried with
+    backoff, up to PAGE_ATTEMPTS times. Returns pages in offset order,
+    stopping before the first page that could not be fetched.
+    """
+    http = http or shared_client()
+    ctl = ctl or controller(urlsplit(url).hostname or "")
+    params = dict(params or {})
+
+    pages: Dict[int, list] = {}
+    retry: deque = deque()  # (ready_at, page, attempt)
+    inflight = {}
+    next_page = 0
+    end = max_pages  # first page index known to be past the data
+    failed: Optional[int] = None
+
+    with ThreadPoolExecutor(max_workers=ctl.max_limit, thread_name_prefix="page") as pool:
+        while True:
+            now = time.monotonic()
+            while len(inflight) < ctl.allowed:
+                if retry and retry[0][0] <= now:
+                    _, page, attempt = retry.popleft()
+                    if end is not None and page >= end:
+                        continue
+                elif end is None or next_page < end:
+                    page, attempt = next_page, 0
+                    next_page += 1
+                else:
+                    break
+                page_params = {**params, "limit": page_size, "offset": page * page_size}
+                inflight[pool.submit(_fetch_page, http, url, page_params, timeout)] = (page, attempt)
+
+            if not inflight:
+                if not retry:
+                    break
+                time.sleep(max(0.0, retry[0][0] - now))
+                continue
+
+            timeout_s = max(0.0, retry[0][0] - now) if retry else None
+            done, _ = wait(inflight, timeout=timeout_s, return_when=FIRST_COMPLETED)
+            for fut in done:
+                page, attempt = inflight.pop(fut)
+                outcome, latency, data = fut.result()
+                ctl.on_result(outcome, latency)
+                if outcome == "ok":
+                    pages[page] = data
+                    if len(data) < page_size and (end is None or page + 1 < end):
+                        end = page + 1
+                elif attempt + 1 < PAGE_ATTEMPTS:
+                    retry.append((time.monotonic() + backoff(attempt), page, attempt + 1))
+                    retry = deque(sorted(retry))
+                else:
+                    failed = page if failed is None else min(failed, page)
+                    end = page if end is None else min(end, page)
+
+    out = []
+    for page in range(len(pages) + 1):
+        if page not in pages or (end is not None and page >= end):
+            break
+        out.append(pages[page])
+    if failed is not None:
+        metrics("http").count("pages_failed")
+        print(f"[Pages] {url}: gave up at offset {failed * page_size} after {PAGE_ATTEMPTS} attempts")
+    return out
+
+
+class ThrottlingStandIn:
+    """Local paginated API that answers 429 beyond `capacity` concurrent requests"""
+
+    def __init__(self, items: int = 20_000, capacity: int = 8, service_time: float = 0.02, port: int = 0):
+        self.items = items
+        self.capacity = capacity
+        self.service_time = service_time
+        self.inflight = 0
+        self.served = 0
+        self.throttled = 0
+        lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with lock:
+                    stand_in.inflight += 1
+                    over = stand_in.inflight > stand_in.capacity
+                try:
+                    if over:
+                        with lock:
+                            stand_in.throttled += 1
+                        self._send(429, b"[]")
+                        return
+                    time.sleep(stand_in.service_time)
+                    q = parse_qs(urlsplit(self.path).query)
+                    offset, limit = int(q["offset"][0]), int(q["limit"][0])
+                    rows = [{"id": i} for i in range(offset, min(offset + limit, stand_in.items))]
+                    with lock:
+                        stand_in.served += 1
+                    self._send(200, json.dumps(rows).encode())
+                finally:
+                    with lock:
+                        stand_in.inflight -= 1
+
+            def _send(self, status, body):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/markets"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    """Fixed limits vs AIMD against the local stand-in"""
+    set_host_limit("127.0.0.1", 10_000, 10_000)  # measure the controller, not the token bucket
+    http = HttpClient()
+    with ThrottlingStandIn(items=40_000, capacity=8, service_time=0.02) as api:
+        aimd = AIMDController("aimd")
+        for label, ctl in [
+            ("fixed 1", AIMDController("fixed1", initial=1, max_limit=1)),
+            ("fixed 32", AIMDController("fixed32", initial=32, min_limit=32, max_limit=32)),
+            ("aimd (cold)", aimd),
+            ("aimd (warm)", aimd),
+        ]:
+            api.throttled = 0
+            started = time.monotonic()
+            pages = fetch_pages(api.url, page_size=200, http=http, ctl=ctl)
+            elapsed = time.monotonic() - started
+            rows = sum(len(p) for p in pages)
+            print(f"{label:<12} {rows:>6} rows in {elapsed:5.2f}s  {len(pages) / elapsed:6.1f} pages/s  "
+                  f"429s={api.throttled:<4} final limit={ctl.limit:5.2f}")
+
+__all__ = [
+    "AIMDController",
+    "controller",
+    "fetch_pages",
+    "ThrottlingStandIn",
+]
+
+
+if __name__ == "__main__":
+    main()
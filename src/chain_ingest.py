@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Polyberg Chain Ingestion
+Pull ERC-20 Transfer logs over plain JSON-RPC (eth_getLogs)
+- Chunked block ranges fetched concurrently
+- Adaptive range splitting when a node rejects a response as too large
+- Block-height checkpoint so restarts resume instead of rescanning
+- `python src/chain_ingest.py` runs the scanner against a local stand-in node
+"""
+
+import json
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+DATA_DIR.mkdir(exist_ok=True)
+
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+# ~30 days of 12s blocks, so a first run fills the 30d wallet windows
+LOOKBACK_BLOCKS = 30 * 7200
+
+# Error fragments nodes use when a getLogs range returns too much data
+TOO_LARGE_HINTS = (
+    "more than",
+    "too many",
+    "too large",
+    "limit exceeded",
+    "response size",
+    "range is too",
+    "block range",
+)
+
+
+class RPCError(Exception):
+    """JSON-RPC error response"""
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message
+
+    @property
+    def too_large(self) -> bool:
+        msg = self.message.lower()
+        return self.code == -32005 or any(h in msg for h in TOO_LARGE_HINTS)
+
+
+class JSONRPCClient:
+    """Minimal JSON-RPC 2.0 client with batch support"""
+    def __init__(self, url: str, pool_size: int = 8, timeout: float = 20):
+        self.url = url
+        self.timeout = timeout
+        self.s = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.s.mount("http://", adapter)
+        self.s.mount("https://", adapter)
+        self._ids = 0
+        self._lock = threading.Lock()
+
+    def _next_id(self) -> int:
+        with self._lock:
+            self._ids += 1
+            return self._ids
+
+    def call(self, method: str, params: list) -> object:
+        payload = {"jsonrpc": "2.0", "id": self._next_id(), "method": method, "params": params}
+        r = self.s.post(self.url, json=payload, timeout=self.timeout)
+        r.raise_for_status()
+        msg = r.json()
+        if msg.get("error"):
+            err = msg["error"]
+            raise RPCError(int(err.get("code", 0)), str(err.get("message", "")))
+        return msg.get("result")
+
+    def batch(self, calls: List[Tuple[str, list]]) -> List[object]:
+        """Send several calls in one HTTP round trip, results in call order"""
+        if not calls:
+            return []
+        payload = [
+            {"jsonrpc": "2.0", "id": self._next_id(), "method": m, "params": p}
+            for m, p in calls
+        ]
+        r = self.s.post(self.url, json=payload, timeout=self.timeout)
+        r.raise_for_status()
+        by_id = {msg.get("id"): msg for msg in r.json()}
+        out = []
+        for req in payload:
+            msg = by_id.get(req["id"], {})
+            if msg.get("error"):
+                err = msg["error"]
+                raise RPCError(int(err.get("code", 0)), str(err.get("message", "")))
+            out.append(msg.get("result"))
+        return out
+
+    def block_number(self) -> int:
+        return int(self.call("eth_blockNumber", []), 16)
+
+
+class TransferIngestor:
+    """Concurrent eth_getLogs scanner for ERC-20 Transfer events"""
+
+    def __init__(
+        self,
+        rpc_url: str,
+        contracts: Dict[str, str],
+        decimals: Optional[Dict[str, int]] = None,
+        chunk_size: int = 2000,
+        workers: int = 4,
+        confirmations: int = 12,
+        lookback_blocks: int = LOOKBACK_BLOCKS,
+        min_amount: float = 10_000,
+        checkpoint_file: Optional[Path] = None,
+    ):
+        """
+        Args:
+            rpc_url: JSON-RPC endpoint (a local stand-in works the same way)
+            contracts: label -> token contract address
+            decimals: label -> token decimals (defaults to 18)
+            chunk_size: Initial block span per eth_getLogs request
+            workers: Concurrent in-flight requests
+            confirmations: Blocks to stay behind head to avoid reorgs
+            lookback_blocks: Blocks to scan on a first run with no checkpoint
+            min_amount: Drop transfers below this token amount
+            checkpoint_file: Where the scanned block height is persisted
+        """
+        self.rpc = JSONRPCClient(rpc_url, pool_size=workers)
+        self.contracts = {label: addr.lower() for label, addr in contracts.items()}
+        self.labels = {addr: label for label, addr in self.contracts.items()}
+        self.decimals = decimals or {}
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.confirmations = confirmations
+        self.lookback_blocks = lookback_blocks
+        self.min_amount = min_amount
+        self.checkpoint_file = checkpoint_file or DATA_DIR / "chain_checkpoint.json"
+        self.checkpoint = self._load_checkpoint()
+        self.scanned: Optional[int] = None  # last block returned but not yet committed
+        self.last_error: Optional[Exception] = None
+        self.stats = {"requests": 0, "splits": 0, "logs": 0}
+
+    def _load_checkpoint(self) -> Optional[int]:
+        if self.checkpoint_file.exists():
+            try:
+                with open(self.checkpoint_file, "r") as f:
+                    return int(json.load(f)["last_block"])
+            except (ValueError, KeyError, TypeError, json.JSONDecodeError):
+                return None
+        return None
+
+    def _save_checkpoint(self, block: int) -> None:
+        tmp = self.checkpoint_file.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"last_block": block, "updated": datetime.now(timezone.utc).isoformat()}, f)
+        tmp.replace(self.checkpoint_file)
+        self.checkpoint = block
+        self.scanned = None
+
+    def _get_logs(self, start: int, end: int) -> List[dict]:
+        self.stats["requests"] += 1
+        return self.rpc.call("eth_getLogs", [{
+            "fromBlock": hex(start),
+            "toBlock": hex(end),
+            "address": list(self.contracts.values()),
+            "topics": [TRANSFER_TOPIC],
+        }]) or []
+
+    def decode_log(self, log: dict) -> Optional[dict]:
+        """Decode a raw Transfer log; None for foreign or sub-threshold logs"""
+        topics = log.get("topics") or []
+        if len(topics) < 3:
+            return None
+        token = self.labels.get((log.get("address") or "").lower())
+        if token is None:
+            return None
+        raw = int(log.get("data") or "0x0", 16)
+        amount = raw / (10 ** self.decimals.get(token, 18))
+        if amount < self.min_amount:
+            return None
+        return {
+            "block": int(log["blockNumber"], 16),
+            "log_index": int(log.get("logIndex") or "0x0", 16),
+            "tx": log.get("transactionHash", ""),
+            "token": token,
+            "from": "0x" + topics[1][-40:].lower(),
+            "to": "0x" + topics[2][-40:].lower(),
+            "amount": amount,
+        }
+
+    def _attach_timestamps(self, transfers: List[dict]) -> None:
+        """Resolve block timestamps with one batched header request"""
+        blocks = sorted({t["block"] for t in transfers})
+        if not blocks:
+            return
+        headers = self.rpc.batch([("eth_getBlockByNumber", [hex(b), False]) for b in blocks])
+        ts = {b: int(h["timestamp"], 16) for b, h in zip(blocks, headers) if h}
+        for t in transfers:
+            t["ts"] = ts.get(t["block"])
+
+    def _scan_range(self, start: int, end: int) -> Tuple[int, int, Optional[List[dict]]]:
+        """Fetch one range; None means the node asked for a smaller range"""
+        try:
+            logs = self._get_logs(start, end)
+        except RPCError as e:
+            if e.too_large and end > start:
+                return start, end, None
+            raise
+        transfers = [t for t in (self.decode_log(log) for log in logs) if t]
+        self._attach_timestamps(transfers)
+        return start, end, transfers
+
+    def scan(self, start: int, end: int) -> List[dict]:
+        """Scan [start, end] concurrently
+
+        Returns the transfers of the contiguous scanned prefix and records its
+        last block in `scanned`. A failing range stops the scan there; what
+        came before it is still returned. Nothing is checkpointed until
+        commit(), so callers persist their own state first.
+        """
+        pending = [(s, min(s + self.chunk_size - 1, end)) for s in range(start, end + 1, self.chunk_size)]
+        done: Dict[int, Tuple[int, List[dict]]] = {}
+        results: List[dict] = []
+        watermark = start - 1
+        self.last_error = None
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            in_flight = set()
+            while pending or in_flight:
+                while pending and len(in_flight) < self.workers:
+                    s, e = pending.pop(0)
+                    in_flight.add(pool.submit(self._scan_range, s, e))
+
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    try:
+                        s, e, transfers = fut.result()
+                    except (RPCError, requests.RequestException, ValueError) as err:
+                        # Stop scheduling; ranges already in flight still finish
+                        if self.last_error is None:
+                            self.last_error = err
+                        pending.clear()
+                        continue
+                    if transfers is None:
+                        mid = (s + e) // 2
+                        pending[:0] = [(s, mid), (mid + 1, e)]
+                        self.stats["splits"] += 1
+                        continue
+                    done[s] = (e, transfers)
+
+                # Advance over every range that now joins the finished prefix
+                while watermark + 1 in done:
+                    e, transfers = done.pop(watermark + 1)
+                    results.extend(transfers)
+                    watermark = e
+
+        if self.last_error is not None:
+            print(f"[Chain] Scan stopped after block {watermark}: {self.last_error}")
+        if watermark >= start:
+            self.scanned = watermark
+        results.sort(key=lambda t: (t["block"], t["log_index"]))
+        self.stats["logs"] += len(results)
+        return results
+
+    def run(self, verbose: bool = True) -> List[dict]:
+        """Scan from the checkpoint (or lookback window) up to the confirmed head
+
+        Call commit() once the returned transfers are applied and saved;
+        until then the next run scans the same blocks again.
+        """
+        head = self.rpc.block_number() - self.confirmations
+        if self.checkpoint is not None:
+            start = self.checkpoint + 1
+        else:
+            start = max(0, head - self.lookback_blocks)
+        if start > head:
+            return []
+
+        if verbose:
+            print(f"[Chain] Scanning blocks {start}..{head} ({head - start + 1} blocks)")
+        transfers = self.scan(start, head)
+        if verbose:
+            print(f"[Chain] {len(transfers)} transfers, {self.stats['requests']} requests, {self.stats['splits']} splits")
+        return transfers
+
+    def commit(self) -> None:
+        """Checkpoint the blocks returned by the last run"""
+        if self.scanned is not None and (self.checkpoint is None or self.scanned > self.checkpoint):
+            self._save_checkpoint(self.scanned)
+
+
+class LocalRPCStandIn:
+    """In-process JSON-RPC stand-in serving canned Transfer logs
+
+    Rejects getLogs queries returning more than `max_results` logs the
+    way hosted nodes do, so range splitting can be exercised locally.
+    """
+
+    def __init__(self, logs: List[dict], head: int, max_results: int = 1000,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.logs = sorted(logs, key=lambda l: (int(l["blockNumber"], 16), int(l.get("logIndex", "0x0"), 16)))
+        self.head = head
+        self.max_results = max_results
+        self.fail_block: Optional[int] = None  # getLogs ranges covering this block fail with a server error
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                if isinstance(body, list):
+                    out = [standin.handle(req) for req in body]
+                else:
+                    out = standin.handle(body)
+                raw = json.dumps(out).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def handle(self, req: dict) -> dict:
+        method, params = req.get("method"), req.get("params") or []
+        out = {"jsonrpc": "2.0", "id": req.get("id")}
+        if method == "eth_blockNumber":
+            out["result"] = hex(self.head)
+        elif method == "eth_getBlockByNumber":
+            n = int(params[0], 16)
+            out["result"] = {"number": hex(n), "timestamp": hex(1_700_000_000 + n * 12)}
+        elif method == "eth_getLogs":
+            q = params[0]
+            lo, hi = int(q["fromBlock"], 16), int(q["toBlock"], 16)
+            addrs = {a.lower() for a in q.get("address") or []}
+            hits = [
+                l for l in self.logs
+                if lo <= int(l["blockNumber"], 16) <= hi and (not addrs or l["address"].lower() in addrs)
+            ]
+            if self.fail_block is not None and lo <= self.fail_block <= hi:
+                out["error"] = {"code": -32000, "message": "internal error"}
+            elif len(hits) > self.max_results:
+                out["error"] = {"code": -32005, "message": f"query returned more than {self.max_results} results"}
+            else:
+                out["result"] = hits
+        else:
+            out["error"] = {"code": -32601, "message": "method not found"}
+        return out
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _standin_log(block: int, index: int, contract: str, amount: int) -> dict:
+    return {
+        "address": contract,
+        "blockNumber": hex(block),
+        "logIndex": hex(index),
+        "transactionHash": "0x" + f"{block:032x}{index:032x}",
+        "topics": [TRANSFER_TOPIC, "0x" + "0" * 24 + f"{block:040x}", "0x" + "0" * 24 + f"{index + 1:040x}"],
+        "data": hex(amount),
+    }
+
+
+def main():
+    """Ingest from a local stand-in: range splitting, partial failure, checkpoint resume"""
+    import tempfile
+    contract = "0x" + "a" * 40
+    logs = [_standin_log(b, i, contract, 50_000 * 10 ** 6) for b in range(1, 3001) for i in range(2)]
+    with tempfile.TemporaryDirectory() as tmp, LocalRPCStandIn(logs, head=2000, max_results=300) as node:
+        checkpoint = Path(tmp) / "checkpoint.json"
+
+        def ingestor():
+            return TransferIngestor(node.url, {"usdc": contract}, decimals={"usdc": 6}, chunk_size=250,
+                                    confirmations=0, lookback_blocks=2000, checkpoint_file=checkpoint)
+
+        # First run: 500 logs per 250-block chunk force splits down to <= 300 results
+        ing = ingestor()
+        first = ing.run(verbose=False)
+        assert len(first) == 2 * 2000 and ing.stats["splits"] > 0, ing.stats
+        assert [t["block"] for t in first] == sorted(t["block"] for t in first)
+        assert ing.checkpoint is None, "nothing is checkpointed before commit()"
+        ing.commit()
+        print(f"first run: {len(first)} transfers, {ing.stats['splits']} splits, checkpoint {ing.checkpoint}")
+
+        # A server error mid-range returns the prefix before it and commits only that far
+        node.head, node.fail_block = 3000, 2500
+        ing = ingestor()
+        partial = ing.run(verbose=False)
+        assert ing.last_error is not None and ing.scanned is not None and ing.scanned < 2500, ing.scanned
+        assert all(t["block"] <= ing.scanned for t in partial)
+        ing.commit()
+        print(f"failed run: {len(partial)} transfers up to block {ing.checkpoint}")
+
+        # A fresh ingestor resumes from the checkpoint and picks up exactly the rest
+        node.fail_block = None
+        ing = ingestor()
+        rest = ing.run(verbose=False)
+        ing.commit()
+        blocks = [t["block"] for t in first + partial + rest]
+        assert blocks == sorted(blocks) and len(blocks) == len(logs), (len(blocks), len(logs))
+        print(f"resumed run: {len(rest)} transfers, checkpoint {ing.checkpoint}; all {len(blocks)} ingested once")
+
+
+__all__ = [
+    "TRANSFER_TOPIC",
+    "RPCError",
+    "JSONRPCClient",
+    "TransferIngestor",
+    "LocalRPCStandIn",
+]
+
+
+if __name__ == "__main__":
+    main()
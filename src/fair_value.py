@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Polyberg Fair Value
+Streaming fair probabilities for the live 15m crypto up/down markets
+- A window resolves Up when the Chainlink price at its end is at or above
+  the price at its start; with realized volatility sigma (per sqrt second)
+  and tau seconds left, P(up) = N((ln(S / S0) - sigma^2 tau / 2) / (sigma sqrt(tau)))
+- Every Chainlink tick and every book update re-prices all tracked markets
+  in one numpy pass and compares against the Up token's best bid/ask
+- An edge signal is emitted when fair value clears the ask (buy) or the bid
+  (sell) by MIN_EDGE, and again only when its side or size changes
+- `python src/fair_value.py` streams signals to the terminal and
+  data/fair_value_signals.jsonl, and records books and prices to
+  data/ticks/ for the backtester
+"""
+
+import asyncio
+import json
+import math
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    from .backtester import TickRecorder
+    from .instrumentation import metrics
+    from .polymarket_capturer import (GammaClient, OrderBook, PriceCache, orderbook_listener,
+                                      parse_iso, rtds_prices_listener)
+except ImportError:
+    from backtester import TickRecorder
+    from instrumentation import metrics
+    from polymarket_capturer import (GammaClient, OrderBook, PriceCache, orderbook_listener,
+                                     parse_iso, rtds_prices_listener)
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+ASSETS = ("btc", "eth", "sol", "xrp")
+ORACLE = "cl"          # resolution source; also the spot used for pricing
+VOL_SOURCES = ("bn", "cl")  # Binance ticks more often, so it is preferred for realized vol
+WINDOW_SEC = 15 * 60
+SCAN_INTERVAL = 60
+SCAN_HORIZON = 1800    # track windows starting up to this far ahead
+MIN_EDGE = 0.03
+EDGE_STEP = 0.01       # re-emit a standing signal once its edge moved this much
+MAX_PRICE_AGE_MS = 5_000
+MAX_BOOK_AGE_MS = 60_000  # a book silent this long is treated as disconnected
+BOOK_RECONNECT_SEC = 1
+REF_TOLERANCE_MS = 5_000  # the window-start price must be at most this old
+VOL_WINDOW_SEC = 900
+VOL_STEP_MS = 1_000
+VOL_REFRESH_SEC = 5
+MIN_VOL_POINTS = 60
+SECONDS_PER_YEAR = 365 * 86400
+# Fallback annualized volatility until enough ticks are cached; a quarter of it is the floor
+ANNUAL_VOL = {"btc": 0.5, "eth": 0.65, "sol": 0.8, "xrp": 0.8}
+
+
+def norm_cdf(z: np.ndarray) -> np.ndarray:
+    """Standard normal CDF (Abramowitz & Stegun 7.1.26, |error| < 1.5e-7)"""
+    x = np.abs(z) / math.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-x * x)
+    return 0.5 * (1.0 + np.sign(z) * erf)
+
+
+def fair_probability(spot: np.ndarray, ref: np.ndarray, sigma: np.ndarray, tau: np.ndarray) -> np.ndarray:
+    """P(price at expiry >= ref) for arrays of spot, reference, per-sqrt-second vol and seconds left
+
+    Works on any matching shapes, e.g. BookFrame.oracle() output in a vectorized backtest.
+    """
+    spot, ref, sigma, tau = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (spot, ref, sigma, tau)))
+    sd = sigma * np.sqrt(np.maximum(tau, 1e-9))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (np.log(spot / ref) - 0.5 * sd * sd) / sd
+    p = norm_cdf(z)
+    # Expired windows are decided
+    return np.where(tau > 0, p, (spot >= ref).astype(float))
+
+
+@dataclass
+class WindowMarket:
+    market_id: str
+    asset: str
+    token_id: str  # the Up outcome
+    start_ms: int
+    end_ms: int
+    title: str = ""
+
+
+def window_market(event: dict) -> Optional[WindowMarket]:
+    """WindowMarket for a Gamma 15m event, or None if it is not a tradable up/down window"""
+    asset = GammaClient.extract_asset(event)
+    markets = event.get("markets") or []
+    if asset not in ASSETS or not markets:
+        return None
+    m = markets[0]
+    try:
+        start = parse_iso(event.get("eventStartTime") or event.get("startTime"))
+        end_raw = m.get("endDate") or event.get("endDate")
+        end = parse_iso(end_raw) if end_raw else start + timedelta(seconds=WINDOW_SEC)
+        tokens = GammaClient.token_pair(m)
+        outcomes = [str(o).lower() for o in json.loads(m.get("outcomes") or "[]")]
+    except (TypeError, ValueError, KeyError, AttributeError):
+        return None
+    up = outcomes.index("up") if "up" in outcomes else 0
+    return WindowMarket(
+        market_id=str(m.get("id", "")),
+        asset=asset,
+        token_id=tokens[up],
+        start_ms=int(start.timestamp() * 1000),
+        end_ms=int(end.timestamp() * 1000),
+        title=event.get("title") or event.get("slug", ""),
+    )
+
+
+class FairValueEngine:
+    """Vectorized fair value and edge detection over the live 15m markets"""
+
+    def __init__(self, cache: PriceCache, gamma: GammaClient = None, min_edge: float = MIN_EDGE,
+                 recorder: Optional[TickRecorder] = None):
+        """
+        Args:
+            cache: PriceCache fed by rtds_prices_listener; the engine subscribes to it
+            gamma: Market discovery (scan_15m_events)
+            min_edge: Probability points fair value must clear the bid/ask by
+            recorder: Records every book update and oracle price for the backtester
+        """
+        self.cache = cache
+        self.gamma = gamma or GammaClient()
+        self.min_edge = min_edge
+        self.recorder = recorder
+        self.markets: List[WindowMarket] = []
+        self.books: Dict[str, OrderBook] = {}  # token_id -> book
+        self.book_ms: Dict[str, int] = {}  # token_id -> last book message
+        self.metrics = metrics("fair_value")
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._asset_index = {a: i for i, a in enumerate(ASSETS)}
+        # Per asset
+        self.spot = np.full(len(ASSETS), np.nan)
+        self.spot_ts = np.zeros(len(ASSETS), dtype=np.int64)
+        self.sigma = np.array([ANNUAL_VOL[a] / math.sqrt(SECONDS_PER_YEAR) for a in ASSETS])
+        self._sigma_floor = self.sigma * 0.25
+        self._vol_updated = np.zeros(len(ASSETS))
+        # Per market, rebuilt by set_markets()
+        self._rebuild([])
+
+    def subscribe(self, listener: Callable[[Dict], None]) -> Callable[[], None]:
+        """Call listener(signal) for every emitted signal; returns an unsubscribe function"""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _rebuild(self, markets: List[WindowMarket], keep: Optional[Dict[str, Dict]] = None) -> None:
+        keep = keep or {}
+        n = len(markets)
+        self.markets = markets
+        self.asset_idx = np.array([self._asset_index[m.asset] for m in markets], dtype=np.intp)
+        self.start_ms = np.array([m.start_ms for m in markets], dtype=np.int64)
+        self.end_ms = np.array([m.end_ms for m in markets], dtype=np.int64)
+        self.ref = np.array([keep.get(m.market_id, {}).get("ref", np.nan) for m in markets], dtype=float)
+        self.bid = np.full(n, np.nan)
+        self.ask = np.full(n, np.nan)
+        self.fair = np.full(n, np.nan)
+        self.book_ts = np.array([self.book_ms.get(m.token_id, 0) for m in markets], dtype=np.int64)
+        self.last_side = np.array([keep.get(m.market_id, {}).get("side", 0) for m in markets], dtype=np.int8)
+        self.last_edge = np.array([keep.get(m.market_id, {}).get("edge", 0.0) for m in markets])
+        self._row = {m.token_id: i for i, m in enumerate(markets)}
+        for i, m in enumerate(markets):
+            book = self.books.get(m.token_id)
+            if book is not None:
+                self._read_book(i, book)
+
+    def set_markets(self, markets: List[WindowMarket], now_ms: Optional[int] = None) -> None:
+        """Track `markets` (expired ones are dropped), keeping state for those already tracked"""
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        live = sorted((m for m in markets if m.end_ms > now_ms), key=lambda m: m.end_ms)
+        keep = {
+            m.market_id: {"ref": self.ref[i], "side": self.last_side[i], "edge": self.last_edge[i]}
+            for i, m in enumerate(self.markets)
+        }
+        self._rebuild(live, keep)
+        tokens = {m.token_id for m in live}
+        for token in [t for t in self.books if t not in tokens]:
+            del self.books[token]
+            self.book_ms.pop(token, None)
+
+    def _read_book(self, i: int, book: OrderBook) -> None:
+        bid, ask = book.best_bid(), book.best_ask()
+        self.bid[i] = np.nan if bid is None else bid
+        self.ask[i] = np.nan if ask is None else ask
+
+    def _refresh_vol(self, a: int, now_ms: int) -> None:
+        if time.monotonic() - self._vol_updated[a] < VOL_REFRESH_SEC:
+            return
+        self._vol_updated[a] = time.monotonic()
+        asset = ASSETS[a]
+        for source in VOL_SOURCES:
+            ts, px = self.cache.window(source, asset, now_ms - VOL_WINDOW_SEC * 1000)
+            if len(ts) < 2:
+                continue
+            ts = np.asarray(ts, dtype=np.int64)
+            grid = np.arange(max(ts[0], now_ms - VOL_WINDOW_SEC * 1000), now_ms, VOL_STEP_MS)
+            if len(grid) < MIN_VOL_POINTS:
+                continue
+            # Last price at or before each grid point, then per-second log returns
+            sampled = np.asarray(px, dtype=float)[np.searchsorted(ts, grid, side="right") - 1]
+            r = np.diff(np.log(sampled))
+            sigma = math.sqrt(float(np.mean(r * r)) / (VOL_STEP_MS / 1000))
+            self.sigma[a] = max(sigma, self._sigma_floor[a])
+            self.metrics.gauge(f"{asset}.sigma_annual", round(self.sigma[a] * math.sqrt(SECONDS_PER_YEAR), 4))
+            return
+
+    def _fill_refs(self, now_ms: int) -> None:
+        for i in np.flatnonzero(np.isnan(self.ref) & (self.start_ms <= now_ms)):
+            m = self.markets[i]
+            ts, px = self.cache.asof(ORACLE, m.asset, m.start_ms)
+            # A price from long before the start (or none at all) is not the reference
+            if px is not None and m.start_ms - ts <= REF_TOLERANCE_MS:
+                self.ref[i] = px
+
+    def on_price(self, source: str, asset: str, ts_ms: int, price: float) -> None:
+        """PriceCache listener: an oracle tick re-prices every market"""
+        a = self._asset_index.get(asset)
+        if source != ORACLE or a is None or ts_ms < self.spot_ts[a]:
+            return
+        self.spot[a] = price
+        self.spot_ts[a] = ts_ms
+        self.metrics.count("ticks")
+        self._refresh_vol(a, ts_ms)
+        self.evaluate(received=time.perf_counter())
+
+    def on_book(self, token_id: str) -> None:
+        """A book changed: re-read its best bid/ask and re-price"""
+        i = self._row.get(token_id)
+        book = self.books.get(token_id)
+        if i is None or book is None:
+            return
+        self.book_ms[token_id] = self.book_ts[i] = int(time.time() * 1000)
+        self._read_book(i, book)
+        self.metrics.count("book_updates")
+        self.evaluate(received=time.perf_counter())
+
+    def evaluate(self, now_ms: Optional[int] = None, received: Optional[float] = None) -> List[Dict]:
+        """Price every tracked market and emit new or changed edge signals"""
+        started = time.perf_counter()
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        if not self.markets:
+            return []
+        self._fill_refs(now_ms)
+
+        idx = self.asset_idx
+        spot = self.spot[idx]
+        tau = (self.end_ms - now_ms) / 1000.0
+        fresh = ((now_ms - self.spot_ts[idx]) <= MAX_PRICE_AGE_MS) & ((now_ms - self.book_ts) <= MAX_BOOK_AGE_MS)
+        active = fresh & ~np.isnan(self.ref) & ~np.isnan(spot) & (self.start_ms <= now_ms) & (tau > 0)
+
+        fair = fair_probability(np.where(active, spot, 1.0), np.where(active, self.ref, 1.0),
+                                self.sigma[idx], tau)
+        self.fair = np.where(active, fair, np.nan)
+
+        with np.errstate(invalid="ignore"):
+            buy_edge = self.fair - self.ask
+            sell_edge = self.bid - self.fair
+            side = np.where(buy_edge >= self.min_edge, 1, np.where(sell_edge >= self.min_edge, -1, 0)).astype(np.int8)
+        edge = np.where(side == 1, buy_edge, np.where(side == -1, sell_edge, 0.0))
+        changed = (side != self.last_side) | ((side != 0) & (np.abs(edge - self.last_edge) >= EDGE_STEP))
+
+        signals = []
+        for i in np.flatnonzero(changed & (side != 0)):
+            m = self.markets[i]
+            signals.append({
+                "market_id": m.market_id,
+                "title": m.title,
+                "asset": m.asset,
+                "token_id": m.token_id,
+                "side": "buy" if side[i] == 1 else "sell",
+                "fair": round(float(self.fair[i]), 4),
+                "price": float(self.ask[i] if side[i] == 1 else self.bid[i]),
+                "edge": round(float(edge[i]), 4),
+                "spot": float(spot[i]),
+                "ref": float(self.ref[i]),
+                "sigma_annual": round(float(self.sigma[idx[i]]) * math.sqrt(SECONDS_PER_YEAR), 4),
+                "tau_sec": round(float(tau[i]), 1),
+                "ts_ms": now_ms,
+            })
+        self.last_side[changed] = side[changed]
+        self.last_edge[changed] = edge[changed]
+
+        done = time.perf_counter()
+        self.metrics.record("evaluate", done - started)
+        for signal in signals:
+            if received is not None:
+                signal["latency_ms"] = round((done - received) * 1000, 3)
+            self.metrics.count("signals")
+            for listener in self._listeners:
+                listener(signal)
+        return signals
+
+    def snapshot(self) -> List[Dict]:
+        """Current fair value and book per tracked market"""
+        def num(x):
+            return None if np.isnan(x) else round(float(x), 4)
+        return [
+            {"market_id": m.market_id, "asset": m.asset, "fair": num(self.fair[i]),
+             "bid": num(self.bid[i]), "ask": num(self.ask[i]), "ref": num(self.ref[i]),
+             "end_ms": m.end_ms}
+            for i, m in enumerate(self.markets)
+        ]
+
+    async def _book_callback(self, token_id: str, msg: dict) -> None:
+        book = self.books.get(token_id)
+        if book is None:
+            return
+        kind = msg.get("event_type")
+        if kind == "book" and str(msg.get("asset_id", token_id)) == token_id:
+            book.book(msg.get("bids", []), msg.get("asks", []))
+        elif kind == "price_change":
+            for change in msg.get("price_changes") or msg.get("changes") or []:
+                if str(change.get("asset_id", msg.get("asset_id", token_id))) != token_id:
+                    continue
+                try:
+                    book.update(change["side"], float(change["price"]), float(change["size"]))
+                except (KeyError, TypeError, ValueError):
+                    continue
+        else:
+            return
+        if self.recorder is not None:
+            i = self._row.get(token_id)
+            if i is not None:
+                m = self.markets[i]
+                self.recorder.record_book(int(time.time() * 1000), m.market_id, token_id, m.asset, book.snapshot())
+        self.on_book(token_id)
+
+    async def _watch_book(self, m: WindowMarket, stop: asyncio.Event) -> None:
+        """orderbook_listener for one market, reconnected as soon as it returns"""
+        callback = lambda msg: self._book_callback(m.token_id, msg)
+        while not stop.is_set():
+            await orderbook_listener(m.market_id, m.token_id, callback, stop)
+            if stop.is_set():
+                break
+            # The levels are unknown until the next "book" message; stop pricing against them
+            self.book_ms.pop(m.token_id, None)
+            i = self._row.get(m.token_id)
+            if i is not None:
+                self.book_ts[i] = 0
+            self.metrics.count("book_reconnects")
+            try:
+                await asyncio.wait_for(stop.wait(), BOOK_RECONNECT_SEC)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self, stop_evt: asyncio.Event) -> None:
+        """Track live windows and their books until stop_evt is set"""
+        unsubscribe = self.cache.subscribe(self.on_price)
+        unrecord = self.cache.subscribe(self.recorder.record_price) if self.recorder else None
+        listeners: Dict[str, tuple] = {}  # token_id -> (task, stop event)
+        try:
+            while not stop_evt.is_set():
+                try:
+                    with self.metrics.stage("scan"):
+                        events = await asyncio.to_thread(self.gamma.scan_15m_events, SCAN_HORIZON)
+                    self.set_markets([m for m in map(window_market, events) if m is not None])
+                except Exception as e:
+                    print(f"[FairValue] scan error: {e}", flush=True)
+
+                tracked = {m.token_id: m for m in self.markets}
+                for token in [t for t in listeners if t not in tracked]:
+                    task, stop = listeners.pop(token)
+                    stop.set()
+                    task.cancel()
+                for token, m in tracked.items():
+                    if token in listeners and not listeners[token][0].done():
+                        continue
+                    self.books.setdefault(token, OrderBook(token))
+                    stop = asyncio.Event()
+                    listeners[token] = (asyncio.create_task(self._watch_book(m, stop)), stop)
+                self.metrics.gauge("markets", len(self.markets))
+                if self.recorder is not None:
+                    self.recorder.flush()
+
+                try:
+                    await asyncio.wait_for(stop_evt.wait(), SCAN_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            unsubscribe()
+            if unrecord:
+                unrecord()
+                self.recorder.close()
+            for task, stop in listeners.values():
+                stop.set()
+                task.cancel()
+            await asyncio.gather(*(task for task, _ in listeners.values()), return_exceptions=True)
+
+
+def terminal_sink(signal: Dict) -> None:
+    print(f"[Edge] {signal['asset'].upper():<4} {signal['side']:<4} fair={signal['fair']:.3f} "
+          f"px={signal['price']:.3f} edge={signal['edge']:+.3f} tau={signal['tau_sec']:>5.0f}s "
+          f"({signal.get('latency_ms', 0):.2f} ms)  {signal['title'][:50]}", flush=True)
+
+
+async def main():
+    """Stream edge signals to the terminal and data/fair_value_signals.jsonl, recording ticks"""
+    cache = PriceCache()
+    engine = FairValueEngine(cache, recorder=TickRecorder())
+    engine.subscribe(terminal_sink)
+    out = open(DATA_DIR / "fair_value_signals.jsonl", "a")
+    engine.subscribe(lambda signal: (out.write(json.dumps(signal) + "\n"), out.flush()))
+    stop_evt = asyncio.Event()
+    try:
+        await asyncio.gather(rtds_prices_listener(cache, stop_evt), engine.run(stop_evt))
+    finally:
+        stop_evt.set()
+        out.close()
+
+
+__all__ = [
+    "norm_cdf",
+    "fair_probability",
+    "WindowMarket",
+    "window_market",
+    "FairValueEngine",
+]
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,253 @@
+"""
+Polyberg HTTP Client
+One pooled HTTP layer for every fetcher, with sync and async facades
+- Keep-alive connection pools per host (requests / aiohttp)
+- Per-host token-bucket rate limits, shared by both facades
+- Retries on connection errors, timeouts, 429 and 5xx with jittered
+  exponential backoff (Retry-After is honoured)
+- Per-host request, retry and byte counts in the "http" metrics component
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+try:
+    from .instrumentation import metrics
+except ImportError:
+    from instrumentation import metrics
+
+USER_AGENT = "Polyberg/1.0"
+POOL_HOSTS = 16        # hosts kept in the pool manager
+POOL_PER_HOST = 32     # keep-alive connections per host
+DEFAULT_TIMEOUT = (5, 15)
+
+# host -> (requests per second, burst)
+HOST_LIMITS = {
+    "gamma-api.polymarket.com": (20.0, 40),
+    "clob.polymarket.com": (20.0, 40),
+    "polymarket.com": (10.0, 20),
+    "api.coingecko.com": (0.5, 5),
+}
+DEFAULT_LIMIT = (10.0, 20)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.25
+BACKOFF_CAP = 8.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket handing out reservations
+
+    reserve() takes a token now and returns how long the caller must wait
+    before using it, so threads and coroutines can share one bucket and each
+    sleep their own way.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def bucket(host: str) -> TokenBucket:
+    """Process-wide limiter for `host`"""
+    with _buckets_lock:
+        b = _buckets.get(host)
+        if b is None:
+            b = _buckets[host] = TokenBucket(*HOST_LIMITS.get(host, DEFAULT_LIMIT))
+        return b
+
+
+def set_host_limit(host: str, rate: float, burst: int) -> None:
+    HOST_LIMITS[host] = (rate, burst)
+    with _buckets_lock:
+        _buckets.pop(host, None)
+
+
+def backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Full-jitter exponential delay before retry number `attempt` (0-based)"""
+    if retry_after:
+        try:
+            return min(BACKOFF_CAP, float(retry_after))
+        except ValueError:
+            pass  # HTTP-date form; fall back to our own schedule
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+class HttpClient:
+    """Blocking client over one pooled requests.Session"""
+
+    def __init__(self, retries: int = MAX_RETRIES, pool_hosts: int = POOL_HOSTS,
+                 pool_per_host: int = POOL_PER_HOST):
+        self.retries = retries
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT})
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_per_host)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.metrics = metrics("http")
+
+    def request(self, method: str, url: str, retries: Optional[int] = None, **kwargs) -> requests.Response:
+        """Send with rate limiting and retries
+
+        Returns the last response, which may still be a 429/5xx once retries
+        run out; raises the last exception if every attempt failed to connect.
+        Pass retries=0 when the caller reacts to failures itself.
+        """
+        host = urlsplit(url).hostname or ""
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+        retries = self.retries if retries is None else retries
+        limiter = bucket(host)
+        for attempt in range(retries + 1):
+            wait = limiter.reserve()
+            if wait:
+                self.metrics.count("throttled")
+                time.sleep(wait)
+            try:
+                with self.metrics.stage(host):
+                    response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == retries:
+                    raise
+                self.metrics.count("retries")
+                time.sleep(backoff(attempt))
+                continue
+            if response.status_code in RETRY_STATUSES and attempt < retries:
+                self.metrics.count("retries")
+                delay = backoff(attempt, response.headers.get("Retry-After"))
+                response.close()
+                time.sleep(delay)
+                continue
+            if not kwargs.get("stream"):
+                self.metrics.add_bytes(host, len(response.content))
+            return response
+        raise AssertionError("unreachable")
+
+    def get(self, url: str, params: dict = None, **kwargs) -> requests.Response:
+        return self.request("GET", url, params=params, **kwargs)
+
+    def get_json(self, url: str, params: dict = None, **kwargs) -> Any:
+        response = self.get(url, params, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_shared: Optional[HttpClient] = None
+_shared_lock = threading.Lock()
+
+
+def shared_client() -> HttpClient:
+    """The process-wide HttpClient, created on first use"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HttpClient()
+        return _shared
+
+
+class AsyncHttpClient:
+    """asyncio facade over one aiohttp session, same limits and retries"""
+
+    def __init__(self, retries: int = MAX_RETRIES, pool_per_host: int = POOL_PER_HOST,
+                 keepalive: float = 30):
+        self.retries = retries
+        self.pool_per_host = pool_per_host
+        self.keepalive = keepalive
+        self.session = None
+        self.metrics = metrics("http")
+
+    async def start(self) -> "AsyncHttpClient":
+        import aiohttp  # only the async facade needs it
+        connector = aiohttp.TCPConnector(limit_per_host=self.pool_per_host, keepalive_timeout=self.keepalive)
+        self.session = aiohttp.ClientSession(connector=connector, headers={"User-Agent": USER_AGENT})
+        return self
+
+    async def close(self) -> None:
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def request(self, method: str, url: str, timeout: float = 15, **kwargs) -> Tuple[int, bytes]:
+        """(status, body) of the last attempt; raises if every attempt failed to connect"""
+        import aiohttp
+        if self.session is None:
+            await self.start()
+        host = urlsplit(url).hostname or ""
+        limiter = bucket(host)
+        for attempt in range(self.retries + 1):
+            wait = limiter.reserve()
+            if wait:
+                self.metrics.count("throttled")
+                await asyncio.sleep(wait)
+            try:
+                with self.metrics.stage(host):
+                    async with self.session.request(
+                        method, url, timeout=aiohttp.ClientTimeout(total=timeout), **kwargs
+                    ) as resp:
+                        status = resp.status
+                        retry_after = resp.headers.get("Retry-After")
+                        body = await resp.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+                self.metrics.count("retries")
+                await asyncio.sleep(backoff(attempt))
+                continue
+            if status in RETRY_STATUSES and attempt < self.retries:
+                self.metrics.count("retries")
+                await asyncio.sleep(backoff(attempt, retry_after))
+                continue
+            self.metrics.add_bytes(host, len(body))
+            return status, body
+        raise AssertionError("unreachable")
+
+    async def get(self, url: str, params: dict = None, **kwargs) -> Tuple[int, bytes]:
+        return await self.request("GET", url, params=params, **kwargs)
+
+    async def get_json(self, url: str, params: dict = None, **kwargs) -> Any:
+        """Decoded body of a 200 response, None otherwise"""
+        status, body = await self.get(url, params, **kwargs)
+        return json.loads(body) if status == 200 else None
+
+
+__all__ = [
+    "HOST_LIMITS",
+    "TokenBucket",
+    "bucket",
+    "set_host_limit",
+    "backoff",
+    "HttpClient",
+    "shared_client",
+    "AsyncHttpClient",
+]
@@ -0,0 +1,295 @@
+"""
+Polyberg Instrumentation
+Per-component stage timers, counters, gauges and byte counts, plus an on-demand
+sampling profiler
+- metrics("markets").stage("http") times a block, or a function when used
+  as a decorator
+- write_report() dumps every component to data/run_report.json (and one
+  line per cycle to data/run_reports.jsonl, trimmed to its newest half once
+  it passes HISTORY_MAX_BYTES), slowest stages first
+- POLYBERG_PROFILE=1 turns profiled() blocks into sampled stack captures
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ContextDecorator
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+REPORT_FILE = DATA_DIR / "run_report.json"
+HISTORY_FILE = DATA_DIR / "run_reports.jsonl"
+HISTORY_MAX_BYTES = 16 << 20  # the daemon reports every minute; this keeps about a week
+PROFILE_ENV = "POLYBERG_PROFILE"
+SAMPLE_INTERVAL = 0.005
+MAX_STACKS = 20_000  # distinct stacks kept by SamplingProfiler; rarer ones fold into OTHER_STACK
+OTHER_STACK = "(other)"
+
+
+class _StageTimer(ContextDecorator):
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+        self.started = 0.0
+
+    def _recreate_cm(self):
+        # Decorated functions may run concurrently; each call gets its own timer
+        return _StageTimer(self.metrics, self.name)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(self.name, time.perf_counter() - self.started, error=exc_type is not None)
+        return False
+
+
+class Metrics:
+    """Stage timings, counters, gauges and byte totals for one component"""
+
+    def __init__(self, component: str):
+        self.component = component
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages: Dict[str, List[float]] = {}  # name -> [calls, seconds, max, errors]
+            self.counters: Counter = Counter()
+            self.gauges: Dict[str, float] = {}
+            self.bytes: Counter = Counter()
+
+    def stage(self, name: str) -> _StageTimer:
+        """Context manager / decorator timing `name`"""
+        return _StageTimer(self, name)
+
+    def record(self, name: str, seconds: float, calls: int = 1, error: bool = False) -> None:
+        """Add time measured elsewhere (e.g. summed over a hot loop)"""
+        with self._lock:
+            s = self.stages.get(name)
+            if s is None:
+                s = self.stages[name] = [0, 0.0, 0.0, 0]
+            s[0] += calls
+            s[1] += seconds
+            s[2] = max(s[2], seconds / calls if calls else seconds)
+            s[3] += error
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    def gauge(self, name: str, value: float) -> None:
+        """Set a current value (e.g. a concurrency limit); the report keeps the last one"""
+        with self._lock:
+            self.gauges[name] = value
+
+    def add_bytes(self, name: str, n: int) -> None:
+        with self._lock:
+            self.bytes[name] += n
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            stages = {
+                name: {
+                    "calls": calls,
+                    "seconds": round(seconds, 6),
+                    "mean_ms": round(seconds / calls * 1000, 3) if calls else 0.0,
+                    "max_ms": round(worst * 1000, 3),
+                    "errors": errors,
+                }
+                for name, (calls, seconds, worst, errors) in sorted(self.stages.items(), key=lambda kv: -kv[1][1])
+            }
+            return {"stages": stages, "counters": dict(self.counters), "gauges": dict(self.gauges),
+                    "bytes": dict(self.bytes)}
+
+
+_registry: Dict[str, Metrics] = {}
+_registry_lock = threading.Lock()
+
+
+def metrics(component: str) -> Metrics:
+    """Shared Metrics for `component`, created on first use"""
+    with _registry_lock:
+        m = _registry.get(component)
+        if m is None:
+            m = _registry[component] = Metrics(component)
+        return m
+
+
+def snapshot() -> Dict[str, Dict]:
+    with _registry_lock:
+        components = list(_registry.values())
+    return {m.component: m.snapshot() for m in components}
+
+
+def reset() -> None:
+    with _registry_lock:
+        components = list(_registry.values())
+    for m in components:
+        m.reset()
+
+
+def slowest(components: Dict[str, Dict], n: int = 10) -> List[Dict]:
+    """Top-n stages across components by total time"""
+    rows = [
+        {"stage": f"{component}.{name}", **stage}
+        for component, data in components.items()
+        for name, stage in data["stages"].items()
+    ]
+    return sorted(rows, key=lambda r: -r["seconds"])[:n]
+
+
+def _append_history(path: Path, line: str, max_bytes: int = HISTORY_MAX_BYTES) -> None:
+    """Append one report line; past max_bytes keep only the newest lines filling half of it"""
+    with open(path, "a") as f:
+        f.write(line)
+    if path.stat().st_size <= max_bytes:
+        return
+    keep: List[bytes] = []
+    size = 0
+    for row in reversed(path.read_bytes().splitlines(keepends=True)):
+        size += len(row)
+        if size > max_bytes // 2 and keep:
+            break
+        keep.append(row)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.writelines(reversed(keep))
+    tmp.replace(path)
+
+
+def write_report(path: Path = REPORT_FILE, extra: Optional[Dict] = None, clear: bool = False) -> Dict:
+    """Write the current metrics as this cycle's run report
+
+    Args:
+        path: Report file, replaced atomically
+        extra: Additional top-level fields (cycle timing, profile summary, ...)
+        clear: Reset all metrics afterwards, so the next report covers one cycle
+    """
+    components = snapshot()
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "slowest": slowest(components),
+        "components": components,
+        **(extra or {}),
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(report, f, indent=2)
+    tmp.replace(path)
+    _append_history(path.parent / HISTORY_FILE.name, json.dumps(report, separators=(",", ":")) + "\n")
+    if clear:
+        reset()
+    return report
+
+
+class SamplingProfiler:
+    """Statistical profiler: samples every thread's stack from a background thread
+
+    Cheap enough to leave on for a whole cycle, unlike cProfile, and it sees
+    time spent blocked in C calls (socket reads, json) as well.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()  # "outer;...;inner" -> samples, at most MAX_STACKS + 1 keys
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{Path(code.co_filename).name}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                key = ";".join(reversed(stack))
+                if key not in self.stacks and len(self.stacks) >= MAX_STACKS:
+                    key = OTHER_STACK
+                self.stacks[key] += 1
+            self.samples += 1
+
+    def start(self) -> "SamplingProfiler":
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def top(self, n: int = 20) -> List[Dict]:
+        """Innermost frames by share of samples"""
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [{"frame": frame, "samples": count, "share": round(count / total, 4)}
+                for frame, count in leaves.most_common(n)]
+
+    def save_collapsed(self, path: Path) -> None:
+        """Folded stacks, the input format of flamegraph.pl / speedscope"""
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class profiled:
+    """Sample the enclosed block when POLYBERG_PROFILE is set; no-op otherwise
+
+    On exit the folded stacks go to data/profile_<name>.folded and the
+    hottest frames are kept in .summary for the run report.
+    """
+
+    def __init__(self, name: str, enabled: Optional[bool] = None):
+        self.name = name
+        self.enabled = bool(os.environ.get(PROFILE_ENV)) if enabled is None else enabled
+        self.profiler: Optional[SamplingProfiler] = None
+        self.summary: Optional[Dict] = None
+
+    def __enter__(self):
+        if self.enabled:
+            self.profiler = SamplingProfiler().start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profiler:
+            self.profiler.stop()
+            out = DATA_DIR / f"profile_{self.name}.folded"
+            self.profiler.save_collapsed(out)
+            self.summary = {"file": str(out), "samples": self.profiler.samples, "top": self.profiler.top()}
+        return False
+
+
+__all__ = [
+    "Metrics",
+    "metrics",
+    "snapshot",
+    "reset",
+    "slowest",
+    "write_report",
+    "SamplingProfiler",
+    "profiled",
+]
@@ -0,0 +1,239 @@
+"""
+Live Dashboard - Diff-rendered terminal table fed by an update stream
+- Updates are coalesced per key and drawn at most `fps` times a second
+- Only cells that differ from what is on screen are rewritten
+- Rows outside the visible window are kept in order but never drawn
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import time
+from bisect import bisect_left, insort
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+Column = Tuple[str, int, Callable[[Any], str]]  # (title, width, format)
+
+_HEADER_LINES = 2  # title row + rule
+_KEYS = {
+    b"j": 1, b"\x1b[B": 1,
+    b"k": -1, b"\x1b[A": -1,
+    b" ": "page", b"\x1b[6~": "page",
+    b"b": "-page", b"\x1b[5~": "-page",
+    b"g": "top", b"G": "bottom",
+    b"q": "quit",
+}
+
+
+class LiveDashboard:
+    """Ranked live table that redraws only what changed"""
+
+    def __init__(
+        self,
+        columns: Sequence[Column],
+        rank: Callable[[Any], float],
+        fps: float = 10,
+        stream=None,
+        height: Optional[int] = None,
+    ):
+        """
+        Args:
+            columns: (title, width, format) per column; format turns a row
+                object into the cell text
+            rank: Sort key for rows (highest first)
+            fps: Frame rate cap; updates arriving between frames are merged
+            stream: Output stream (stdout by default)
+            height: Visible rows; follows the terminal size when None
+        """
+        self.columns = list(columns)
+        self.rank = rank
+        self.interval = 1.0 / fps
+        self.stream = stream or sys.stdout
+        self.fixed_height = height
+
+        self._col_at: List[int] = []
+        col = 1
+        for _, width, _ in self.columns:
+            self._col_at.append(col)
+            col += width + 1
+        self._blank = tuple(" " * width for _, width, _ in self.columns)
+
+        self.rows: Dict[str, Tuple[str, ...]] = {}  # key -> rendered cells
+        self._sort_key: Dict[str, Tuple[float, str]] = {}
+        self._order: List[Tuple[float, str]] = []  # ascending (-rank, key)
+        self._pending: Dict[str, Any] = {}  # key -> latest row, None = removed
+
+        self.offset = 0
+        self.height = height or self._terminal_height()
+        self._visible: List[str] = []
+        self._line_of: Dict[str, int] = {}
+        self._screen: List[Optional[Tuple[str, ...]]] = [None] * self.height
+        self._full = True
+
+        self._wake: Optional[asyncio.Event] = None
+        self._stop: Optional[asyncio.Event] = None
+        self.stats = {"updates": 0, "frames": 0, "cells": 0, "bytes": 0}
+
+    def _terminal_height(self) -> int:
+        return self.fixed_height or max(1, shutil.get_terminal_size().lines - _HEADER_LINES - 1)
+
+    # Update stream
+
+    def push(self, key: str, row: Any) -> None:
+        """Queue a row; only the latest value per key reaches the next frame"""
+        self._pending[key] = row
+        self.stats["updates"] += 1
+        if self._wake:
+            self._wake.set()
+
+    def remove(self, key: str) -> None:
+        self.push(key, None)
+
+    def scroll(self, delta: int) -> None:
+        last = max(0, len(self._order) - self.height)
+        offset = min(max(0, self.offset + delta), last)
+        if offset != self.offset:
+            self.offset = offset
+            self._full = True
+            if self._wake:
+                self._wake.set()
+
+    # Frame building
+
+    def _apply(self) -> Set[str]:
+        """Fold pending updates into the model; returns keys whose cells changed"""
+        changed = set()
+        limit = self.offset + self.height
+        for key, row in self._pending.items():
+            old = self._sort_key.get(key)
+            if old is not None and (row is None or (-self.rank(row), key) != old):
+                i = bisect_left(self._order, old)
+                del self._order[i]
+                self._full |= i < limit
+            if row is None:
+                if old is not None:
+                    del self._sort_key[key]
+                    del self.rows[key]
+                continue
+            new = (-self.rank(row), key)
+            if new != old:
+                insort(self._order, new)
+                self._sort_key[key] = new
+                self._full |= bisect_left(self._order, new) < limit
+            cells = tuple(fmt(row)[:width].ljust(width) for _, width, fmt in self.columns)
+            if self.rows.get(key) != cells:
+                self.rows[key] = cells
+                changed.add(key)
+        self._pending.clear()
+        self.offset = min(self.offset, max(0, len(self._order) - self.height))
+        return changed
+
+    def _header(self) -> str:
+        title = " ".join(t[:w].rjust(w) if i else t[:w].ljust(w) for i, (t, w, _) in enumerate(self.columns))
+        return f"\x1b[1;1H\x1b[1m{title}\x1b[0m\x1b[2;1H{'=' * len(title)}"
+
+    def render(self) -> str:
+        """Escape sequences turning the current screen into the next frame"""
+        changed = self._apply()
+        height = self._terminal_height()
+        out = []
+        if height != self.height or not self.stats["frames"]:
+            self.height = height
+            self._screen = [None] * height
+            self._full = True
+            out.append("\x1b[2J" + self._header())
+
+        if self._full:
+            self._visible = [key for _, key in self._order[self.offset:self.offset + self.height]]
+            self._line_of = {key: i for i, key in enumerate(self._visible)}
+            lines = range(self.height)
+            self._full = False
+        else:
+            lines = sorted(self._line_of[k] for k in changed if k in self._line_of)
+
+        cells_written = 0
+        for i in lines:
+            cells = self.rows[self._visible[i]] if i < len(self._visible) else self._blank
+            old = self._screen[i]
+            if old == cells:
+                continue
+            line = i + _HEADER_LINES + 1
+            for c, cell in enumerate(cells):
+                if old is None or old[c] != cell:
+                    out.append(f"\x1b[{line};{self._col_at[c]}H{cell}")
+                    cells_written += 1
+            self._screen[i] = cells
+
+        shown = min(self.offset + self.height, len(self._order))
+        status = (f"{len(self._order)} rows | {self.offset + 1 if shown else 0}-{shown} | "
+                  f"{self.stats['updates']} updates / {self.stats['frames'] + 1} frames | j/k space/b g/G q")
+        out.append(f"\x1b[{self.height + _HEADER_LINES + 1};1H\x1b[7m{status}\x1b[K\x1b[0m")
+
+        self.stats["frames"] += 1
+        self.stats["cells"] += cells_written
+        frame = "".join(out)
+        self.stats["bytes"] += len(frame)
+        return frame
+
+    # Terminal loop
+
+    def _on_key(self, fd: int) -> None:
+        action = _KEYS.get(os.read(fd, 16))
+        if action is None:
+            return
+        if action == "quit":
+            self._stop.set()
+        elif action == "page":
+            self.scroll(self.height)
+        elif action == "-page":
+            self.scroll(-self.height)
+        elif action == "top":
+            self.scroll(-self.offset)
+        elif action == "bottom":
+            self.scroll(len(self._order))
+        else:
+            self.scroll(action)
+
+    async def run(self, stop_evt: Optional[asyncio.Event] = None) -> None:
+        """Draw frames until stop_evt is set (or 'q' is pressed)"""
+        loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._wake.set()
+        self._stop = stop_evt or asyncio.Event()
+
+        fd, saved = None, None
+        if sys.stdin.isatty():
+            import termios
+            import tty
+            fd = sys.stdin.fileno()
+            saved = termios.tcgetattr(fd)
+            tty.setcbreak(fd)
+            loop.add_reader(fd, self._on_key, fd)
+
+        self.stream.write("\x1b[?1049h\x1b[?25l")  # alternate screen, hide cursor
+        try:
+            while not self._stop.is_set():
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    continue
+                self._wake.clear()
+                started = time.monotonic()
+                self.stream.write(self.render())
+                self.stream.flush()
+                # Anything pushed while sleeping lands in the next frame
+                await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+        finally:
+            self.stream.write("\x1b[?25h\x1b[?1049l")
+            self.stream.flush()
+            if fd is not None:
+                import termios
+                loop.remove_reader(fd)
+                termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+
+
+__all__ = [
+    "Column",
+    "LiveDashboard",
+]
@@ -6,10 +6,24 @@ Integrates Hans's production Polymarket capturer with Polyberg terminal.
 
 import asyncio
 import json
+import sys
+import time
 from datetime import datetime, timezone
 from pathlib import Path
 from polymarket_capturer import GammaClient, PriceCache, OrderBook, rtds_prices_listener, utc_now
-import requests
+from http_client import shared_client
+from instrumentation import metrics, profiled, write_report
+from leaderboard import Leaderboard
+from market_search import MarketSearchIndex
+from push_server import PushHub, PushServer, feeder_sink
+
+# Daemon refresh cadence per stage, seconds
+STAGE_INTERVALS = {"markets": 15, "whales": 300, "news": 120}
+STAGE_TIMEOUT = 60
+SAVE_INTERVAL = 5
+REPORT_INTERVAL = 60  # daemon run report window, seconds
+ASSETS = ("btc", "eth", "sol", "xrp")
+WHALE_TTL_SEC = 7 * 86400  # wallets the Gamma users feed has not returned for this long are unranked
 
 class PolybergLiveFeeder:
     def __init__(self):
@@ -17,11 +31,21 @@ class PolybergLiveFeeder:
         self.data_file = self.repo_root / "data" / "live_data.json"
         self.gamma = GammaClient()
         self.price_cache = PriceCache()
+        self.leaderboard = Leaderboard(("pnl_30d", "pnl_7d", "win_rate"))
+        self.search_index = MarketSearchIndex()
+        self.markets: dict = {}
+        # Same pooled, rate-limited client as GammaClient
+        self.http = shared_client()
+        self.latest = {"markets": [], "whales": [], "news": []}
+        self.push = None  # called with (stage, result) when a push hub is attached
+        self.metrics = metrics("feeder")
         
     def get_live_markets(self) -> list:
         """Fetch current 15-minute markets from Gamma API"""
         try:
-            events = self.gamma.scan_15m_events()
+            with self.metrics.stage("gamma_scan"):
+                events = self.gamma.scan_15m_events()
+            self.metrics.count("events", len(events))
             
             markets = []
             for e in events:
@@ -65,17 +89,20 @@ class PolybergLiveFeeder:
             print(f"Market fetch error: {e}")
             return []
     
-    def get_whale_wallets(self) -> list:
-        """Fetch top wallets from Gamma API"""
+    def get_whale_wallets(self, limit: int = 25) -> list:
+        """Fetch wallets from Gamma API and return the top ranked by 30d PnL"""
         whales = []
         try:
-            users = self.gamma.get("users", {"limit": 50})
+            with self.metrics.stage("gamma_users"):
+                users = self.gamma.get("users", {"limit": 50})
             
-            for user in users[:25]:
+            # Observed wallets stay ranked until WHALE_TTL_SEC without a sighting;
+            # only changed ones are re-inserted
+            for user in users:
                 try:
                     address = user.get("address")
                     if address:
-                        whales.append({
+                        self.leaderboard.update(address, {
                             "address": address,
                             "trades": int(user.get("trade_count", 0)),
                             "win_rate": float(user.get("win_rate", 0)) / 100,
@@ -85,7 +112,11 @@ class PolybergLiveFeeder:
                 except:
                     continue
             
-            print(f"✓ Whale wallets: {len(whales)}")
+            evicted = self.leaderboard.evict_before(time.time() - WHALE_TTL_SEC)
+            if evicted:
+                self.metrics.count("whales_evicted", len(evicted))
+            whales = self.leaderboard.top("pnl_30d", limit)
+            print(f"✓ Whale wallets: {len(whales)} of {len(self.leaderboard)} ranked")
         except Exception as e:
             print(f"Whale fetch error: {e}")
         
@@ -95,10 +126,12 @@ class PolybergLiveFeeder:
         """Fetch crypto news from CoinGecko"""
         news = []
         try:
-            response = requests.get(
-                "https://api.coingecko.com/api/v3/news",
-                timeout=15
-            )
+            with self.metrics.stage("news_http"):
+                response = self.http.get(
+                    "https://api.coingecko.com/api/v3/news",
+                    timeout=15
+                )
+            self.metrics.add_bytes("news_http", len(response.content))
             
             if response.status_code == 200:
                 items = response.json().get("data", [])[:12]
@@ -119,7 +152,26 @@ class PolybergLiveFeeder:
         
         return news
     
-    def save_data(self, markets: list, whales: list, news: list):
+    def search_markets(self, query: str, limit: int = 10) -> list:
+        """Search the last fetched markets by title"""
+        return [self.markets[market_id] for market_id, _ in self.search_index.search(query, limit)]
+    
+    def get_prices(self) -> dict:
+        """Latest streamed oracle prices per asset"""
+        now_ms = int(time.time() * 1000)
+        prices = {}
+        for asset in ASSETS:
+            entry = {}
+            for source in ("cl", "bn"):
+                ts, px = self.price_cache.asof(source, asset, now_ms)
+                if px is not None:
+                    entry[source] = px
+                    entry["ts"] = max(entry.get("ts", 0), ts)
+            if entry:
+                prices[asset] = entry
+        return prices
+    
+    def save_data(self, markets: list, whales: list, news: list, prices: dict = None):
         """Save all data to live_data.json"""
         data = {
             "timestamp": utc_now().isoformat(),
@@ -127,9 +179,15 @@ class PolybergLiveFeeder:
             "whales": whales,
             "news": news,
         }
+        if prices:
+            data["prices"] = prices
         
-        with open(self.data_file, "w") as f:
-            json.dump(data, f, indent=2)
+        tmp = self.data_file.with_suffix(".tmp")
+        with self.metrics.stage("write"):
+            with open(tmp, "w") as f:
+                json.dump(data, f, indent=2)
+            tmp.replace(self.data_file)
+        self.metrics.add_bytes("live_data", self.data_file.stat().st_size)
         
         print(f"✓ Saved: {len(markets)} markets | {len(whales)} whales | {len(news)} news")
     
@@ -137,12 +195,133 @@ class PolybergLiveFeeder:
         """Full update cycle"""
         print(f"[{utc_now().strftime('%H:%M:%S')}] Fetching live Polymarket data...")
         
-        markets = self.get_live_markets()
-        whales = self.get_whale_wallets()
-        news = self.get_news()
+        with profiled("feeder") as prof:
+            markets = self._run_stage("markets")
+            whales = self._run_stage("whales")
+            news = self._run_stage("news")
+            
+            self.save_data(markets, whales, news)
+        write_report(extra={"profile": prof.summary} if prof.summary else None, clear=True)
+    
+    def _run_stage(self, name: str) -> list:
+        with self.metrics.stage(f"stage:{name}"):
+            if name == "markets":
+                markets = self.get_live_markets()
+                self.markets = {str(m["id"]): m for m in markets}
+                with self.metrics.stage("search_sync"):
+                    self.search_index.sync(markets)
+                return markets
+            if name == "whales":
+                return self.get_whale_wallets()
+            return self.get_news()
+    
+    async def _stage_loop(self, name: str, interval: float, dirty: asyncio.Event, stop_evt: asyncio.Event):
+        """Refresh one stage on its own cadence; blocking I/O runs in a worker thread
+
+        A worker thread cannot be cancelled, so a run that outlives STAGE_TIMEOUT
+        stays in flight and later cycles wait on it instead of starting another.
+        """
+        inflight = None
+        while not stop_evt.is_set():
+            started = time.monotonic()
+            if inflight is None:
+                inflight = asyncio.ensure_future(asyncio.to_thread(self._run_stage, name))
+            else:
+                self.metrics.count(f"stage_skipped:{name}")
+            done, _ = await asyncio.wait({inflight}, timeout=STAGE_TIMEOUT)
+            if not done:
+                print(f"⚠ {name} stage still running after {STAGE_TIMEOUT}s; skipping this cycle", flush=True)
+            else:
+                task, inflight = inflight, None
+                try:
+                    result = task.result()
+                    # Keep the last good data when a stage comes back empty
+                    if result:
+                        self.latest[name] = result
+                        dirty.set()
+                        if self.push:
+                            self.push(name, result)
+                except Exception as e:
+                    print(f"{name} stage error: {e}", flush=True)
+            
+            delay = max(0.0, interval - (time.monotonic() - started))
+            try:
+                await asyncio.wait_for(stop_evt.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def _save_loop(self, dirty: asyncio.Event, stop_evt: asyncio.Event):
+        """Write live_data.json at most every SAVE_INTERVAL seconds, and only when a stage
+        result or a streamed price changed since the last write"""
+        saved_prices = None
+        while not stop_evt.is_set():
+            try:
+                await asyncio.wait_for(stop_evt.wait(), SAVE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            prices = self.get_prices()
+            prices_changed = bool(prices) and prices != saved_prices
+            if prices_changed and self.push:
+                self.push("prices", prices)
+            if dirty.is_set() or prices_changed:
+                dirty.clear()
+                saved_prices = prices
+                self.save_data(self.latest["markets"], self.latest["whales"], self.latest["news"], prices)
+    
+    async def _report_loop(self, stop_evt: asyncio.Event):
+        """Write a run report per REPORT_INTERVAL window"""
+        while not stop_evt.is_set():
+            try:
+                await asyncio.wait_for(stop_evt.wait(), REPORT_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            write_report(extra={"window_sec": REPORT_INTERVAL}, clear=True)
+    
+    async def run_daemon(self, stop_evt: asyncio.Event = None, intervals: dict = None, hub: PushHub = None):
+        """Long-running mode: concurrent stages, streamed RTDS prices, periodic saves
+
+        With a hub, every stage result (and the prices) is also pushed to it.
+        """
+        stop_evt = stop_evt or asyncio.Event()
+        intervals = {**STAGE_INTERVALS, **(intervals or {})}
+        dirty = asyncio.Event()
+        print(f"[{utc_now().strftime('%H:%M:%S')}] Feeder daemon: " +
+              ", ".join(f"{k} every {v}s" for k, v in intervals.items()), flush=True)
         
-        self.save_data(markets, whales, news)
+        tasks = [asyncio.create_task(rtds_prices_listener(self.price_cache, stop_evt))]
+        tasks += [
+            asyncio.create_task(self._stage_loop(name, interval, dirty, stop_evt))
+            for name, interval in intervals.items()
+        ]
+        tasks.append(asyncio.create_task(self._save_loop(dirty, stop_evt)))
+        tasks.append(asyncio.create_task(self._report_loop(stop_evt)))
+        if hub:
+            self.push = feeder_sink(hub)
+            tasks.append(asyncio.create_task(hub.run(stop_evt)))
+        try:
+            await stop_evt.wait()
+        finally:
+            stop_evt.set()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+async def run_with_push(feeder: PolybergLiveFeeder):
+    """Daemon plus the local SSE push server for the dashboard"""
+    hub = PushHub()
+    server = PushServer(hub)
+    await server.start()
+    try:
+        await feeder.run_daemon(hub=hub)
+    finally:
+        await server.close()
 
 if __name__ == "__main__":
     feeder = PolybergLiveFeeder()
-    feeder.update()
+    if "--daemon" in sys.argv:
+        try:
+            asyncio.run(run_with_push(feeder) if "--push" in sys.argv else feeder.run_daemon())
+        except KeyboardInterrupt:
+            pass
+    else:
+        feeder.update()
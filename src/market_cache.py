@@ -0,0 +1,157 @@
+"""
+Market Cache - In-memory market store with TTLs and stale-while-revalidate
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    fetched_at: float
+    ttl: float
+
+    def age(self, now: float) -> float:
+        return now - self.fetched_at
+
+    def fresh(self, now: float) -> bool:
+        return now - self.fetched_at < self.ttl
+
+
+class MarketCache:
+    """Serve markets from memory while a background task keeps them warm"""
+
+    def __init__(
+        self,
+        loader: Callable[[], Awaitable[List[Any]]],
+        key: Callable[[Any], str] = lambda m: m.market_id,
+        rank: Callable[[Any], float] = lambda m: m.volume_24h or 0,
+        ttl: float = 30,
+        stale_ttl: float = 300,
+        refresh_interval: float = 15,
+    ):
+        """
+        Args:
+            loader: Coroutine returning the full current market list
+            key: Market id of an item
+            rank: Sort key for the ranked view (highest first)
+            ttl: Seconds an entry counts as fresh
+            stale_ttl: Seconds a stale entry is still served while revalidating;
+                entries older than this (e.g. closed markets) are evicted
+            refresh_interval: Background refresh cadence
+        """
+        self.loader = loader
+        self.key = key
+        self.rank = rank
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.refresh_interval = refresh_interval
+        self.entries: Dict[str, CacheEntry] = {}
+        self._ranked: List[Any] = []
+        self._refreshing: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[List[Any], List[str]], None]] = []
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, market_id: str) -> bool:
+        return market_id in self.entries
+
+    def __setitem__(self, market_id: str, value: Any) -> None:
+        self.entries[market_id] = CacheEntry(value, time.monotonic(), self.ttl)
+
+    def get(self, market_id: str, default: Any = None) -> Any:
+        """Cached market, stale or not; a stale hit schedules a refresh"""
+        entry = self.entries.get(market_id)
+        if entry is None:
+            self.stats["misses"] += 1
+            return default
+        now = time.monotonic()
+        if entry.fresh(now):
+            self.stats["hits"] += 1
+            return entry.value
+        if entry.age(now) < self.stale_ttl:
+            self.stats["stale_hits"] += 1
+            self.revalidate()
+            return entry.value
+        self.stats["misses"] += 1
+        self.revalidate()
+        return default
+
+    def top(self, limit: int = 10) -> List[Any]:
+        """Ranked markets, precomputed at refresh time"""
+        if self._ranked and not self.entries[self.key(self._ranked[0])].fresh(time.monotonic()):
+            self.revalidate()
+        return self._ranked[:limit]
+
+    def subscribe(self, listener: Callable[[List[Any], List[str]], None]) -> Callable[[], None]:
+        """Call listener(changed, evicted_ids) after each update; returns an unsubscribe"""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def update(self, markets: List[Any]) -> None:
+        now = time.monotonic()
+        changed = []
+        for m in markets:
+            key = self.key(m)
+            old = self.entries.get(key)
+            if old is None or old.value != m:
+                changed.append(m)
+            self.entries[key] = CacheEntry(m, now, self.ttl)
+
+        expired = [k for k, e in self.entries.items() if e.age(now) >= self.stale_ttl]
+        for k in expired:
+            del self.entries[k]
+
+        self._ranked = sorted((e.value for e in self.entries.values()), key=self.rank, reverse=True)
+        for listener in self._listeners:
+            listener(changed, expired)
+
+    async def refresh(self) -> None:
+        try:
+            markets = await self.loader()
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Market cache refresh error: {e}")
+            return
+        if markets:
+            self.update(markets)
+            self.stats["refreshes"] += 1
+
+    def revalidate(self) -> None:
+        """Start a refresh in the background unless one is already running"""
+        if self._refreshing and not self._refreshing.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._refreshing = loop.create_task(self.refresh())
+
+    async def _run(self) -> None:
+        if self.entries:
+            # Already loaded (start() usually follows an awaited refresh()); don't fetch twice
+            await asyncio.sleep(self.refresh_interval)
+        while True:
+            self.revalidate()
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        for task in (self._task, self._refreshing):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._refreshing = None
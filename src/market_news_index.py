@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Polyberg Market-News Linker
+Token-level inverted index over market titles and slugs
+- Postings maintained incrementally as markets open, change or close
+- Articles scored against candidate markets only, BM25-style, top-k by heap
+- Persisted to data/market_news_index.json, so a run re-indexes only the
+  markets that changed since the last one
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "the", "of", "to", "in", "on", "for", "and", "or", "as", "is", "be", "by",
+    "at", "will", "with", "from", "before", "after", "than", "more", "less", "above",
+    "below", "up", "down", "over", "under", "this", "that", "it", "its", "vs", "what",
+    "who", "which", "how", "yes", "no", "end", "new",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+# Tokens in more than half of all markets say nothing about which one an article is about
+MAX_DF_RATIO = 0.5
+# With ~25k markets, a token unique to one market scores ~10, one in 100 markets ~5.5,
+# and one in 8% of markets ("bitcoin") ~2.5. So 6 takes one fairly specific shared
+# term, or a common term plus one found in under ~1% of markets ("bitcoin" + a price level).
+MIN_SCORE = 6.0
+
+
+def _tokenizer_id() -> str:
+    """Changes whenever tokenize() would index the same text differently"""
+    return hashlib.sha1(" ".join(sorted(STOPWORDS)).encode()).hexdigest()[:12]
+
+
+class MarketNewsIndex:
+    """BM25 inverted index from market text to market ids"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_df_ratio: float = MAX_DF_RATIO,
+                 min_score: float = MIN_SCORE, path: Optional[Path] = None):
+        """
+        Args:
+            k1, b: BM25 term-frequency saturation and length normalization
+            max_df_ratio: Query tokens found in more than this share of markets
+                are skipped; below it, common tokens count with their (low) IDF
+            min_score: Default score an article needs to be linked to a market
+            path: Where save() and load() keep the index
+        """
+        self.path = path or DATA_DIR / "market_news_index.json"
+        self.dirty = False
+        self.k1 = k1
+        self.b = b
+        self.max_df_ratio = max_df_ratio
+        self.min_score = min_score
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.doc_len: Dict[str, int] = {}
+        self.doc_text: Dict[str, str] = {}
+        self.total_len = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def upsert(self, market_id: str, title: str, slug: str = "") -> bool:
+        """Index or re-index one market; False when its text is unchanged"""
+        return self._index_text(market_id, f"{title} {slug.replace('-', ' ')}")
+
+    def _index_text(self, market_id: str, text: str) -> bool:
+        if self.doc_text.get(market_id) == text:
+            return False
+        self.remove(market_id)
+        tf = Counter(tokenize(text))
+        for token, n in tf.items():
+            self.postings[token][market_id] = n
+        length = sum(tf.values())
+        self.doc_len[market_id] = length
+        self.doc_text[market_id] = text
+        self.total_len += length
+        self.dirty = True
+        return True
+
+    def remove(self, market_id: str) -> None:
+        text = self.doc_text.pop(market_id, None)
+        if text is None:
+            return
+        for token in set(tokenize(text)):
+            docs = self.postings.get(token)
+            if docs is not None:
+                docs.pop(market_id, None)
+                if not docs:
+                    del self.postings[token]
+        self.total_len -= self.doc_len.pop(market_id)
+        self.dirty = True
+
+    def sync(self, markets: Iterable[Dict]) -> Tuple[int, int]:
+        """Bring the index in line with a market list; returns (changed, removed)"""
+        live = set()
+        changed = 0
+        for m in markets:
+            market_id = str(m.get("id", ""))
+            if not market_id:
+                continue
+            live.add(market_id)
+            changed += self.upsert(market_id, m.get("title", ""), m.get("slug", ""))
+        gone = [market_id for market_id in self.doc_len if market_id not in live]
+        for market_id in gone:
+            self.remove(market_id)
+        return changed, len(gone)
+
+    def search(self, text: str, k: int = 3, min_score: float = 0.0) -> List[Tuple[str, float]]:
+        """Top-k (market_id, score) for a piece of text"""
+        n_docs = len(self.doc_len)
+        if not n_docs:
+            return []
+        avgdl = self.total_len / n_docs
+        max_df = max(1, int(n_docs * self.max_df_ratio))
+        scores: Dict[str, float] = defaultdict(float)
+
+        for token in set(tokenize(text)):
+            docs = self.postings.get(token)
+            if not docs or len(docs) > max_df:
+                continue
+            df = len(docs)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for market_id, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[market_id] / avgdl)
+                scores[market_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = heapq.nlargest(k, scores.items(), key=lambda x: x[1])
+        return [(market_id, round(score, 3)) for market_id, score in ranked if score >= min_score]
+
+    def link(self, articles: List[Dict], k: int = 3, min_score: Optional[float] = None) -> Dict[str, List[Dict]]:
+        """Related articles per market id, best match first (min_score defaults to self.min_score)"""
+        min_score = self.min_score if min_score is None else min_score
+        related: Dict[str, List[Dict]] = defaultdict(list)
+        for article in articles:
+            for market_id, score in self.search(article.get("title", ""), k, min_score):
+                related[market_id].append({
+                    "title": article.get("title", ""),
+                    "url": article.get("url", ""),
+                    "source": article.get("source", ""),
+                    "score": score,
+                })
+        for items in related.values():
+            items.sort(key=lambda a: a["score"], reverse=True)
+        return dict(related)
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None, **kwargs) -> "MarketNewsIndex":
+        """The saved index, or an empty one; rebuilt from the saved texts if tokenize() changed"""
+        index = cls(path=path, **kwargs)
+        try:
+            with open(index.path, "r") as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return index
+        if raw.get("tokenizer") == _tokenizer_id():
+            for token, docs in raw.get("postings", {}).items():
+                index.postings[token] = docs
+            index.doc_len = raw.get("doc_len", {})
+            index.doc_text = raw.get("doc_text", {})
+            index.total_len = sum(index.doc_len.values())
+        else:
+            for market_id, text in raw.get("doc_text", {}).items():
+                index._index_text(market_id, text)
+        return index
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        raw = {
+            "tokenizer": _tokenizer_id(),
+            "postings": self.postings,
+            "doc_len": self.doc_len,
+            "doc_text": self.doc_text,
+        }
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(raw, f, separators=(",", ":"))
+        tmp.replace(self.path)
+        self.dirty = False
+
+
+__all__ = [
+    "MAX_DF_RATIO",
+    "MIN_SCORE",
+    "tokenize",
+    "MarketNewsIndex",
+]
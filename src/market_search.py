@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Polyberg Market Search
+In-memory prefix and typo-tolerant search over market titles and slugs
+- Prefix lookup by bisecting a sorted token vocabulary
+- Typo fallback through trigram -> token postings
+- Per-token postings kept in weight order, so top-k stops early
+- Incremental insert/delete; results ranked by volume and liquidity
+"""
+
+import heapq
+import json
+import math
+import re
+import sys
+from bisect import bisect_left, insort
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+MAX_MERGE_TERMS = 64  # wider prefixes walk the global weight order instead
+
+
+def search_tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def weight(volume: float, liquidity: float) -> float:
+    """Ranking weight; log-scaled so liquidity still breaks volume ties"""
+    return math.log1p(max(volume, 0.0)) + 0.5 * math.log1p(max(liquidity, 0.0))
+
+
+class MarketSearchIndex:
+    """Prefix + trigram index from market text to market ids"""
+
+    def __init__(self, min_similarity: float = 0.4):
+        """
+        Args:
+            min_similarity: Trigram Dice similarity a title token needs to
+                stand in for a mistyped query token
+        """
+        self.min_similarity = min_similarity
+        self.vocab: List[str] = []  # sorted distinct tokens, for prefix ranges
+        self.postings: Dict[str, List[Tuple[float, str]]] = {}  # token -> sorted (-weight, id)
+        self.gram_tokens: Dict[str, Set[str]] = defaultdict(set)  # trigram -> tokens
+        self.text: Dict[str, str] = {}
+        self.tokens: Dict[str, Set[str]] = {}
+        self.weights: Dict[str, float] = {}
+        self.by_weight: List[Tuple[float, str]] = []  # sorted (-weight, id)
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def _post(self, token: str, market_id: str, w: float) -> None:
+        docs = self.postings.get(token)
+        if docs is None:
+            docs = self.postings[token] = []
+            insort(self.vocab, token)
+            for gram in trigrams(token):
+                self.gram_tokens[gram].add(token)
+        insort(docs, (-w, market_id))
+
+    def _unpost(self, token: str, market_id: str, w: float) -> None:
+        docs = self.postings.get(token)
+        if docs is None:
+            return
+        i = bisect_left(docs, (-w, market_id))
+        if i < len(docs) and docs[i][1] == market_id:
+            del docs[i]
+        if not docs:
+            del self.postings[token]
+            del self.vocab[bisect_left(self.vocab, token)]
+            for gram in trigrams(token):
+                tokens = self.gram_tokens.get(gram)
+                if tokens is not None:
+                    tokens.discard(token)
+                    if not tokens:
+                        del self.gram_tokens[gram]
+
+    def upsert(self, market_id: str, title: str, slug: str = "", volume: float = 0.0,
+               liquidity: float = 0.0) -> bool:
+        """Index or re-rank one market; False when its text and weight are unchanged"""
+        w = weight(volume, liquidity)
+        text = f"{title} {slug.replace('-', ' ')}"
+        old_w = self.weights.get(market_id)
+        if self.text.get(market_id) == text and old_w == w:
+            return False
+        self.remove(market_id)
+        tokens = set(search_tokens(text))
+        for token in tokens:
+            self._post(token, market_id, w)
+        self.text[market_id] = text
+        self.tokens[market_id] = tokens
+        self.weights[market_id] = w
+        insort(self.by_weight, (-w, market_id))
+        return True
+
+    def remove(self, market_id: str) -> None:
+        tokens = self.tokens.pop(market_id, None)
+        if tokens is None:
+            return
+        w = self.weights.pop(market_id)
+        self.text.pop(market_id, None)
+        del self.by_weight[bisect_left(self.by_weight, (-w, market_id))]
+        for token in tokens:
+            self._unpost(token, market_id, w)
+
+    def sync(self, markets: Iterable[Dict]) -> Tuple[int, int]:
+        """Bring the index in line with a market list; returns (changed, removed)"""
+        live = set()
+        changed = 0
+        for m in markets:
+            market_id = str(m.get("id", ""))
+            if not market_id:
+                continue
+            live.add(market_id)
+            changed += self.upsert(
+                market_id, m.get("title") or m.get("name", ""), m.get("slug", ""),
+                float(m.get("volume_24h", 0) or 0), float(m.get("liquidity", 0) or 0),
+            )
+        gone = [market_id for market_id in self.text if market_id not in live]
+        for market_id in gone:
+            self.remove(market_id)
+        return changed, len(gone)
+
+    def _prefix_range(self, prefix: str) -> Tuple[int, int]:
+        # Tokens are [a-z0-9], and "{" sorts after all of them
+        return bisect_left(self.vocab, prefix), bisect_left(self.vocab, prefix + "{")
+
+    def prefix_terms(self, prefix: str) -> List[str]:
+        lo, hi = self._prefix_range(prefix)
+        return self.vocab[lo:hi]
+
+    def fuzzy_terms(self, token: str) -> List[str]:
+        """Vocabulary tokens within min_similarity (trigram Dice) of `token`"""
+        grams = trigrams(token)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for term in self.gram_tokens.get(gram, ()):
+                shared[term] += 1
+        return [
+            term for term, n in shared.items()
+            # A padded token of length L has L trigrams
+            if 2 * n / (len(grams) + len(term)) >= self.min_similarity
+        ]
+
+    def _ranked(self, groups: List[Tuple[str, Set[str]]], k: int, skip: Set[str]) -> List[str]:
+        """Top-k ids matching every (prefix, alternates) group, by weight
+
+        The narrowest group drives a weight-ordered merge of its postings
+        (or the global weight order when every prefix is very wide); the
+        walk stops as soon as k matches are found.
+        """
+        term_sets: List[Tuple[int, Set[str]]] = []  # (postings, terms)
+        wide: List[Tuple[str, Set[str]]] = []  # checked by prefix instead
+        for prefix, alternates in groups:
+            lo, hi = self._prefix_range(prefix)
+            if hi - lo + len(alternates) > MAX_MERGE_TERMS:
+                wide.append((prefix, alternates))
+                continue
+            terms = set(self.vocab[lo:hi]) | alternates
+            if not terms:
+                return []
+            term_sets.append((sum(len(self.postings[t]) for t in terms), terms))
+        term_sets.sort(key=lambda x: x[0])
+
+        if term_sets:
+            stream = heapq.merge(*(self.postings[t] for t in term_sets[0][1]))
+            sets = [terms for _, terms in term_sets[1:]]
+        else:
+            stream = iter(self.by_weight)
+            sets = []
+
+        out: List[str] = []
+        seen = set(skip)
+        for _, market_id in stream:
+            if market_id in seen:
+                continue
+            seen.add(market_id)
+            tokens = self.tokens[market_id]
+            if any(tokens.isdisjoint(terms) for terms in sets):
+                continue
+            if wide and not all(
+                any(t.startswith(prefix) for t in tokens) or not tokens.isdisjoint(alternates)
+                for prefix, alternates in wide
+            ):
+                continue
+            out.append(market_id)
+            if len(out) >= k:
+                break
+        return out
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top-k (market_id, weight): prefix matches first, then fuzzy ones"""
+        tokens = search_tokens(query)
+        if not tokens:
+            return []
+
+        # Every query token must prefix some token of the market text
+        ranked = self._ranked([(t, set()) for t in tokens], k, set())
+
+        if len(ranked) < k:
+            # Typo fallback: each token may also match a similar vocabulary term
+            groups = [
+                (t, {term for term in self.fuzzy_terms(t) if not term.startswith(t)} if len(t) >= 3 else set())
+                for t in tokens
+            ]
+            if any(alternates for _, alternates in groups):
+                ranked += self._ranked(groups, k - len(ranked), set(ranked))
+
+        return [(market_id, round(self.weights[market_id], 3)) for market_id in ranked]
+
+
+def main():
+    """Search data/live_data.json from the command line"""
+    data_file = Path(__file__).parent.parent / "data" / "live_data.json"
+    with open(data_file, "r") as f:
+        markets = json.load(f).get("markets", [])
+    index = MarketSearchIndex()
+    index.sync(markets)
+    by_id = {str(m.get("id", "")): m for m in markets}
+    for market_id, _ in index.search(" ".join(sys.argv[1:])):
+        m = by_id[market_id]
+        print(f"{m.get('title', '')[:60]:<62} ${m.get('volume_24h', 0):>14,.0f}")
+
+
+__all__ = [
+    "search_tokens",
+    "trigrams",
+    "weight",
+    "MarketSearchIndex",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Paper Matching Engine - Simulated execution against live or recorded OrderBook depth
+- Incoming orders walk external depth level by level (partial fills, slippage)
+- Unfilled remainder rests locally with price-time priority
+- Resting orders fill as new depth crosses them
+"""
+
+import time
+from bisect import insort
+from collections import deque
+from itertools import count
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+TICKS_PER_UNIT = 1000  # 0.001 price resolution
+BUY, SELL = 1, -1
+
+
+def to_tick(price: float) -> int:
+    return int(round(price * TICKS_PER_UNIT))
+
+
+class Order:
+    """Compact resting/incoming order"""
+    __slots__ = ("order_id", "book", "side", "tick", "size", "filled", "notional", "ts", "ref_tick", "status")
+
+    def __init__(self, order_id: int, book: str, side: int, tick: int, size: float, ts: float):
+        self.order_id = order_id
+        self.book = book
+        self.side = side
+        self.tick = tick
+        self.size = size
+        self.filled = 0.0
+        self.notional = 0.0  # sum of fill price * size, in ticks
+        self.ts = ts
+        self.ref_tick = 0  # best opposite price at arrival, for slippage
+        self.status = "new"
+
+    @property
+    def remaining(self) -> float:
+        return self.size - self.filled
+
+    @property
+    def avg_price(self) -> float:
+        return self.notional / self.filled / TICKS_PER_UNIT if self.filled else 0.0
+
+    @property
+    def slippage(self) -> float:
+        """Average fill price minus the touch at arrival, signed against the order"""
+        if not self.filled or not self.ref_tick:
+            return 0.0
+        return self.side * (self.avg_price - self.ref_tick / TICKS_PER_UNIT)
+
+    def to_dict(self) -> Dict:
+        return {
+            "order_id": self.order_id,
+            "book": self.book,
+            "side": "buy" if self.side == BUY else "sell",
+            "price": self.tick / TICKS_PER_UNIT,
+            "size": self.size,
+            "filled": self.filled,
+            "avg_price": self.avg_price,
+            "slippage": self.slippage,
+            "status": self.status,
+        }
+
+
+Fill = Tuple[Order, float, float]  # (order, price, size)
+
+
+class SimBook:
+    """One token's external depth plus locally resting paper orders"""
+
+    def __init__(self, name: str):
+        self.name = name
+        # External depth: ascending asks, descending bids as [tick, size] levels
+        self.ext_asks: List[List] = []
+        self.ext_bids: List[List] = []
+        # Local resting orders: tick -> FIFO queue, plus sorted ticks
+        self.bids: Dict[int, Deque[Order]] = {}
+        self.asks: Dict[int, Deque[Order]] = {}
+        self.bid_ticks: List[int] = []  # ascending, best = last
+        self.ask_ticks: List[int] = []  # ascending, best = first
+
+    def set_depth(self, bids: List[Tuple[float, float]], asks: List[Tuple[float, float]]) -> None:
+        self.ext_bids = sorted(([to_tick(p), s] for p, s in bids if s > 0), reverse=True)
+        self.ext_asks = sorted([to_tick(p), s] for p, s in asks if s > 0)
+
+    def best_ask(self) -> int:
+        return self.ext_asks[0][0] if self.ext_asks else 0
+
+    def best_bid(self) -> int:
+        return self.ext_bids[0][0] if self.ext_bids else 0
+
+    def _take(self, order: Order, levels: List[List], fills: List[Fill], slip_ticks: int) -> None:
+        """Consume external levels that cross the order, best first"""
+        side = order.side
+        while levels and order.filled < order.size:
+            level = levels[0]
+            tick = level[0]
+            if side == BUY and tick > order.tick or side == SELL and tick < order.tick:
+                break
+            qty = min(level[1], order.size - order.filled)
+            # Slippage worsens the price, but never past the order's own limit
+            px = min(tick + slip_ticks, order.tick) if side == BUY else max(tick - slip_ticks, order.tick)
+            order.filled += qty
+            order.notional += px * qty
+            fills.append((order, px / TICKS_PER_UNIT, qty))
+            level[1] -= qty
+            if level[1] <= 1e-12:
+                levels.pop(0)
+
+    def _rest(self, order: Order) -> None:
+        queues, ticks = (self.bids, self.bid_ticks) if order.side == BUY else (self.asks, self.ask_ticks)
+        q = queues.get(order.tick)
+        if q is None:
+            q = queues[order.tick] = deque()
+            insort(ticks, order.tick)
+        q.append(order)
+        order.status = "resting" if not order.filled else "partial"
+
+    @staticmethod
+    def _head(q: Deque[Order]) -> Optional[Order]:
+        """First live order in a queue, dropping cancelled ones lazily"""
+        while q:
+            o = q[0]
+            if o.status != "cancelled":
+                return o
+            q.popleft()
+        return None
+
+    def _cross_local(self, order: Order, fills: List[Fill]) -> List[Order]:
+        """Match against opposite resting paper orders in price-time order"""
+        touched = []
+        if order.side == BUY:
+            queues, ticks = self.asks, self.ask_ticks
+            while ticks and order.remaining > 0 and ticks[0] <= order.tick:
+                tick = ticks[0]
+                self._match_queue(order, queues, tick, fills, touched)
+                if not queues.get(tick):
+                    queues.pop(tick, None)
+                    ticks.pop(0)
+        else:
+            queues, ticks = self.bids, self.bid_ticks
+            while ticks and order.remaining > 0 and ticks[-1] >= order.tick:
+                tick = ticks[-1]
+                self._match_queue(order, queues, tick, fills, touched)
+                if not queues.get(tick):
+                    queues.pop(tick, None)
+                    ticks.pop()
+        return touched
+
+    @staticmethod
+    def _match_queue(order: Order, queues: Dict[int, Deque[Order]], tick: int,
+                     fills: List[Fill], touched: List[Order]) -> None:
+        q = queues[tick]
+        while order.remaining > 0:
+            maker = SimBook._head(q)
+            if maker is None:
+                break
+            qty = min(maker.remaining, order.remaining)
+            for o in (order, maker):
+                o.filled += qty
+                o.notional += tick * qty
+                fills.append((o, tick / TICKS_PER_UNIT, qty))
+            touched.append(maker)
+            if maker.remaining <= 1e-12:
+                maker.status = "filled"
+                q.popleft()
+            else:
+                maker.status = "partial"
+
+    def sweep(self, fills: List[Fill], slip_ticks: int) -> List[Order]:
+        """Fill resting orders that new external depth now crosses"""
+        touched = []
+        while self.bid_ticks and self.ext_asks and self.bid_ticks[-1] >= self.ext_asks[0][0]:
+            tick = self.bid_ticks[-1]
+            q = self.bids[tick]
+            while self.ext_asks and self.ext_asks[0][0] <= tick:
+                o = self._head(q)
+                if o is None:
+                    break
+                self._take(o, self.ext_asks, fills, slip_ticks)
+                touched.append(o)
+                if o.remaining <= 1e-12:
+                    o.status = "filled"
+                    q.popleft()
+                else:
+                    o.status = "partial"
+            if not q:
+                del self.bids[tick]
+                self.bid_ticks.pop()
+        while self.ask_ticks and self.ext_bids and self.ask_ticks[0] <= self.ext_bids[0][0]:
+            tick = self.ask_ticks[0]
+            q = self.asks[tick]
+            while self.ext_bids and self.ext_bids[0][0] >= tick:
+                o = self._head(q)
+                if o is None:
+                    break
+                self._take(o, self.ext_bids, fills, slip_ticks)
+                touched.append(o)
+                if o.remaining <= 1e-12:
+                    o.status = "filled"
+                    q.popleft()
+                else:
+                    o.status = "partial"
+            if not q:
+                del self.asks[tick]
+                self.ask_ticks.pop(0)
+        return touched
+
+
+class MatchingEngine:
+    """Local paper execution venue over OrderBook depth"""
+
+    def __init__(self, slippage_ticks: int = 0, on_fill: Optional[Callable[[Order, float, float], None]] = None):
+        """
+        Args:
+            slippage_ticks: Extra adverse ticks applied to every external fill, capped at the order's limit
+            on_fill: Called as on_fill(order, price, size) for each fill
+        """
+        self.slippage_ticks = slippage_ticks
+        self.on_fill = on_fill
+        self.books: Dict[str, SimBook] = {}
+        self.orders: Dict[int, Order] = {}
+        self._ids = count(1)
+        self.stats = {"events": 0, "orders": 0, "fills": 0, "cancels": 0, "book_updates": 0}
+
+    def book(self, name: str) -> SimBook:
+        b = self.books.get(name)
+        if b is None:
+            b = self.books[name] = SimBook(name)
+        return b
+
+    def _emit(self, fills: List[Fill]) -> None:
+        self.stats["fills"] += len(fills)
+        for order, price, size in fills:
+            if order.remaining <= 1e-12:
+                self.orders.pop(order.order_id, None)
+            if self.on_fill:
+                self.on_fill(order, price, size)
+
+    def submit(self, book: str, side: int, price: float, size: float, ioc: bool = False) -> Order:
+        """Submit a limit order (ioc=True cancels any unfilled remainder)"""
+        self.stats["events"] += 1
+        self.stats["orders"] += 1
+        b = self.book(book)
+        order = Order(next(self._ids), book, side, to_tick(price), size, time.monotonic())
+        order.ref_tick = b.best_ask() if side == BUY else b.best_bid()
+        self.orders[order.order_id] = order
+
+        fills: List[Fill] = []
+        # External liquidity was there first, so it has time priority at equal price
+        levels = b.ext_asks if side == BUY else b.ext_bids
+        b._take(order, levels, fills, self.slippage_ticks)
+        if order.remaining > 1e-12:
+            b._cross_local(order, fills)
+
+        if order.remaining <= 1e-12:
+            order.status = "filled"
+        elif ioc:
+            order.status = "cancelled" if not order.filled else "partial"
+            self.orders.pop(order.order_id, None)
+        else:
+            b._rest(order)
+        self._emit(fills)
+        return order
+
+    def cancel(self, order_id: int) -> Optional[Order]:
+        self.stats["events"] += 1
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return None
+        # Left in its queue as a tombstone; matching skips and drops it
+        order.status = "cancelled"
+        self.stats["cancels"] += 1
+        return order
+
+    def on_depth(self, book: str, bids: List[Tuple[float, float]], asks: List[Tuple[float, float]]) -> None:
+        """Replace a book's external depth and fill whatever it now crosses"""
+        self.stats["events"] += 1
+        self.stats["book_updates"] += 1
+        b = self.book(book)
+        b.set_depth(bids, asks)
+        fills: List[Fill] = []
+        b.sweep(fills, self.slippage_ticks)
+        self._emit(fills)
+
+    def on_orderbook(self, book: str, ob) -> None:
+        """Feed a polymarket_capturer.OrderBook"""
+        self.on_depth(book, list(ob.bids.items()), list(ob.asks.items()))
+
+    def on_snapshot(self, book: str, snap: Dict) -> None:
+        """Feed a recorded OrderBook.snapshot() row"""
+        bids, asks = [], []
+        i = 1
+        while f"bid_price_{i}" in snap or f"ask_price_{i}" in snap:
+            if f"bid_price_{i}" in snap:
+                bids.append((float(snap[f"bid_price_{i}"]), float(snap[f"bid_size_{i}"])))
+            if f"ask_price_{i}" in snap:
+                asks.append((float(snap[f"ask_price_{i}"]), float(snap[f"ask_size_{i}"])))
+            i += 1
+        self.on_depth(book, bids, asks)
+
+
+def benchmark(n: int = 200_000) -> float:
+    """Order events per second against a synthetic 5-level book"""
+    import random
+    rng = random.Random(7)
+    engine = MatchingEngine()
+    depth_b = [(0.50 - i * 0.01, 500.0) for i in range(5)]
+    depth_a = [(0.51 + i * 0.01, 500.0) for i in range(5)]
+    engine.on_depth("t", depth_b, depth_a)
+    events = [(rng.random(), rng.randint(-4, 2) * 0.01, rng.randint(1, 50)) for _ in range(n)]
+    resting = []
+    started = time.perf_counter()
+    for r, offset, size in events:
+        if r < 0.05:
+            engine.on_depth("t", depth_b, depth_a)
+        elif r < 0.2 and resting:
+            engine.cancel(resting.pop())
+        else:
+            side = BUY if r < 0.6 else SELL
+            o = engine.submit("t", side, 0.505 + side * offset, size)
+            if o.status in ("resting", "partial"):
+                resting.append(o.order_id)
+    return n / (time.perf_counter() - started)
+
+
+__all__ = [
+    "BUY",
+    "SELL",
+    "Order",
+    "SimBook",
+    "MatchingEngine",
+]
+
+
+if __name__ == "__main__":
+    print(f"{benchmark():,.0f} order events/sec")
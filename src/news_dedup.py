@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Polyberg News Near-Duplicate Index
+Catch the same story syndicated under slightly different headlines
+- MinHash signatures over word shingles of the normalized title (single
+  words plus adjacent pairs, so reordered headlines do not collide)
+- Banded LSH buckets for constant-time candidate lookup
+- LRU + age eviction, persisted across runs
+"""
+
+import hashlib
+import json
+import random
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+DATA_DIR.mkdir(exist_ok=True)
+
+_MERSENNE = (1 << 61) - 1
+_TOKEN_RE = re.compile(r"[a-z0-9$%]+")
+STOPWORDS = {
+    "a", "an", "the", "of", "to", "in", "on", "for", "and", "or", "as", "is", "are",
+    "at", "by", "with", "from", "after", "amid", "its", "it", "this", "that", "be",
+    "says", "said", "according", "report", "new",
+}
+
+
+def title_tokens(title: str) -> List[str]:
+    """Normalized tokens in title order: lowercase, punctuation and stopwords dropped"""
+    return [t for t in _TOKEN_RE.findall(title.lower()) if t not in STOPWORDS]
+
+
+def title_shingles(title: str) -> Set[str]:
+    """Words and adjacent word pairs of the normalized title
+
+    Pairs tell "ETH overtakes BTC" from "BTC overtakes ETH"; the single
+    words keep a long headline with one substituted word above the
+    threshold, where pairs alone would lose two of every few shingles.
+    """
+    tokens = title_tokens(title)
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index of recently seen article titles"""
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        num_perm: int = 32,
+        bands: int = 8,
+        threshold: float = 0.6,
+        max_entries: int = 5000,
+        max_age_sec: int = 7 * 86400,
+        seed: int = 1,
+    ):
+        """
+        Args:
+            num_perm: MinHash signature length
+            bands: LSH bands (num_perm / bands rows each); candidates share a band
+            threshold: Estimated Jaccard similarity that counts as a duplicate
+            max_entries: LRU capacity
+            max_age_sec: Entries not seen for this long are evicted
+        """
+        assert num_perm % bands == 0
+        self.path = path or DATA_DIR / "news_dedup.json"
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_age_sec = max_age_sec
+
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _MERSENNE), rng.randrange(0, _MERSENNE)) for _ in range(num_perm)]
+
+        # entry id -> [key, title, signature, last_seen]; ordered oldest-touched first
+        self.entries: "OrderedDict[int, list]" = OrderedDict()
+        self.buckets: Dict[Tuple[int, Tuple[int, ...]], Set[int]] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def signature(self, title: str) -> Optional[Tuple[int, ...]]:
+        """MinHash of the title's shingles; None when nothing is left after normalization"""
+        hashes = [_token_hash(t) for t in title_shingles(title)]
+        if not hashes:
+            return None
+        return tuple(
+            min((a * h + b) % _MERSENNE for h in hashes)
+            for a, b in self._perms
+        )
+
+    def _band_keys(self, sig: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+        r = self.rows
+        return [(i, sig[i * r:(i + 1) * r]) for i in range(self.bands)]
+
+    def _similarity(self, a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+        return sum(x == y for x, y in zip(a, b)) / self.num_perm
+
+    def find(self, title: str) -> Optional[Tuple[int, float]]:
+        """Best matching entry id and estimated similarity, if above threshold"""
+        sig = self.signature(title)
+        return self._find(sig) if sig is not None else None
+
+    def _find(self, sig: Tuple[int, ...]) -> Optional[Tuple[int, float]]:
+        candidates = set()
+        for band in self._band_keys(sig):
+            candidates.update(self.buckets.get(band, ()))
+        best = None
+        for entry_id in candidates:
+            sim = self._similarity(sig, self.entries[entry_id][2])
+            if sim >= self.threshold and (best is None or sim > best[1]):
+                best = (entry_id, sim)
+        return best
+
+    def _touch(self, entry_id: int, now: float) -> None:
+        self.entries[entry_id][3] = now
+        self.entries.move_to_end(entry_id)
+
+    def _insert(self, key: str, title: str, sig: Tuple[int, ...], now: float) -> int:
+        entry_id = self._next_id
+        self._next_id += 1
+        self.entries[entry_id] = [key, title, sig, now]
+        for band in self._band_keys(sig):
+            self.buckets.setdefault(band, set()).add(entry_id)
+        return entry_id
+
+    def _evict(self, entry_id: int) -> None:
+        _, _, sig, _ = self.entries.pop(entry_id)
+        for band in self._band_keys(sig):
+            bucket = self.buckets.get(band)
+            if bucket:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self.buckets[band]
+
+    def evict(self, now: Optional[float] = None) -> None:
+        """Drop least recently seen entries over capacity or past max age"""
+        now = now if now is not None else time.time()
+        while self.entries:
+            entry_id, entry = next(iter(self.entries.items()))
+            if len(self.entries) > self.max_entries or now - entry[3] > self.max_age_sec:
+                self._evict(entry_id)
+            else:
+                break
+
+    def is_duplicate(self, title: str, key: str = "", now: Optional[float] = None) -> bool:
+        """Check a title and remember it
+
+        `key` identifies the article (GUID or URL): a match with the same key
+        is the same article seen again, not a duplicate. Titles made only of
+        stopwords and punctuation have no signature and are never duplicates.
+        """
+        now = now if now is not None else time.time()
+        sig = self.signature(title)
+        if sig is None:
+            return False
+        match = self._find(sig)
+        if match is not None:
+            entry_id = match[0]
+            self._touch(entry_id, now)
+            return not key or self.entries[entry_id][0] != key
+        self._insert(key, title, sig, now)
+        self.evict(now)
+        return False
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None, **kwargs) -> "NearDuplicateIndex":
+        index = cls(path, **kwargs)
+        if not index.path.exists():
+            return index
+        try:
+            with open(index.path, "r") as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return index
+
+        # Signatures depend on the hash parameters; rebuild them if those changed
+        same_params = raw.get("params") == index._params()
+        for key, title, sig, last_seen in raw.get("entries", []):
+            sig = tuple(sig) if same_params else index.signature(title)
+            if sig is not None:
+                index._insert(key, title, sig, last_seen)
+        index.evict()
+        return index
+
+    def _params(self) -> list:
+        # "shingles" marks signatures built from title_shingles rather than bare tokens
+        return [self.num_perm, self.bands, self._perms[0][0], "shingles"]
+
+    def save(self) -> None:
+        raw = {
+            "params": self._params(),
+            "entries": [[k, t, list(s), ts] for k, t, s, ts in self.entries.values()],
+        }
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(raw, f, separators=(",", ":"))
+        tmp.replace(self.path)
+
+
+__all__ = [
+    "title_tokens",
+    "title_shingles",
+    "NearDuplicateIndex",
+]
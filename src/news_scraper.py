@@ -4,195 +4,373 @@ Polyberg News Scraper - Fetch from multiple reliable sources
 """
 
 import json
+import re
+import threading
 import requests
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timezone
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+from html.entities import name2codepoint
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlparse
 import time
 
+try:
+    from .http_client import HttpClient, shared_client
+    from .instrumentation import metrics, profiled, write_report
+    from .news_dedup import NearDuplicateIndex
+    from .news_timeline import ArticleTimeline, parse_timestamp
+except ImportError:
+    from http_client import HttpClient, shared_client
+    from instrumentation import metrics, profiled, write_report
+    from news_dedup import NearDuplicateIndex
+    from news_timeline import ArticleTimeline, parse_timestamp
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+DATA_DIR.mkdir(exist_ok=True)
+
+# Feed registry: add or remove sources here
+FEEDS = [
+    {"source": "CoinTelegraph", "url": "https://cointelegraph.com/feed", "category": "crypto", "limit": 10},
+    {"source": "TechCrunch", "url": "https://techcrunch.com/feed/", "category": "tech", "limit": 5},
+    {"source": "The Verge", "url": "https://www.theverge.com/rss/index.xml", "category": "tech", "limit": 5},
+    {"source": "ESPN", "url": "https://feeds.espn.com/feeds/site/espntech.xml", "category": "sports", "limit": 5},
+    {"source": "CryptoSlate", "url": "https://cryptoslate.com/feed/", "category": "crypto", "limit": 5},
+]
+
+FEED_TIMEOUT = 10      # per-source seconds
+RUN_DEADLINE = 15      # whole news stage seconds
+HOST_CONCURRENCY = 1   # simultaneous requests per host
+HOST_INTERVAL = 1.0    # minimum seconds between requests to one host
+CHUNK_SIZE = 16384     # response bytes fed to the parser at a time
+
+# Sent per request, so a session shared with other fetchers keeps its own defaults
+HEADERS = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'}
+
+# RSS <item> / Atom <entry> child tag -> article field
+ITEM_TAGS = {"item", "entry"}
+FIELD_TAGS = {
+    "title": "title",
+    "link": "url",
+    "pubDate": "time",
+    "published": "time",
+    "updated": "time",
+    "guid": "guid",
+    "id": "guid",
+}
+
+def _local(tag: str) -> str:
+    """Strip an XML namespace: '{http://www.w3.org/2005/Atom}entry' -> 'entry'"""
+    return tag.rsplit("}", 1)[-1]
+
+# Named entities XML knows; any other (HTML's &nbsp;, &mdash;, ...) is undefined to a strict parser
+_XML_ENTITIES = {"amp", "lt", "gt", "quot", "apos"}
+_ENTITY = re.compile(rb"&(#[0-9]+;|#x[0-9a-fA-F]+;|[A-Za-z][A-Za-z0-9]*;)?")
+
+def _xml_entity(match: "re.Match") -> bytes:
+    ref = match.group(1)
+    if ref is None:
+        return b"&amp;"  # bare '&' in text
+    name = ref[:-1].decode("ascii")
+    if ref.startswith(b"#") or name in _XML_ENTITIES:
+        return match.group(0)
+    if name in name2codepoint:
+        return b"&#%d;" % name2codepoint[name]
+    return b"&amp;" + ref
+
+def sanitize_feed(raw: bytes) -> bytes:
+    """Rewrite HTML entities and stray ampersands so a strict XML parser accepts the feed"""
+    return _ENTITY.sub(_xml_entity, raw)
+
+def _pull_items(chunks: Iterable[bytes], limit: int, seen_guids: Set[str], items: List[Dict]) -> Tuple[List[Dict], bool]:
+    parser = ET.XMLPullParser(events=("start", "end"))
+    current: Optional[Dict] = None
+    
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            tag = _local(elem.tag)
+            if event == "start":
+                if tag in ITEM_TAGS:
+                    current = {}
+                continue
+            if current is None:
+                continue
+            
+            if tag in ITEM_TAGS:
+                elem.clear()
+                guid = current.get("guid") or current.get("url")
+                if guid:
+                    current["guid"] = guid
+                    if guid in seen_guids:
+                        return items, True
+                if current.get("title"):
+                    items.append(current)
+                    if len(items) >= limit:
+                        return items, False
+                current = None
+            elif tag in FIELD_TAGS:
+                field = FIELD_TAGS[tag]
+                value = (elem.text or "").strip()
+                if tag == "link" and not value:
+                    # Atom links carry the URL in href; only rel="alternate" is the article
+                    if elem.get("rel", "alternate") != "alternate":
+                        continue
+                    value = elem.get("href", "")
+                if value and field not in current:
+                    current[field] = value
+    
+    return items, False
+
+def parse_feed_stream(chunks: Iterable[bytes], limit: int, seen_guids: Set[str] = frozenset()) -> Tuple[List[Dict], bool]:
+    """Pull-parse RSS/Atom bytes into item fields in one pass
+
+    Stops after `limit` items, or at the first item whose GUID is in
+    `seen_guids` (feeds list newest first, so the rest is already known).
+    Returns (items, stopped_at_known_guid).
+
+    Feeds that are not well-formed XML (HTML entities, stray '&') are read
+    in full, sanitized and parsed again; if that still fails, the items
+    parsed before the error are kept.
+    """
+    chunks = iter(chunks)
+    consumed: List[bytes] = []
+    items: List[Dict] = []
+    
+    def recorded():
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield chunk
+    
+    try:
+        return _pull_items(recorded(), limit, seen_guids, items)
+    except ET.ParseError:
+        raw = b"".join(consumed) + b"".join(chunks)
+    try:
+        retry = _pull_items([sanitize_feed(raw)], limit, seen_guids, [])
+    except ET.ParseError:
+        return items, False
+    return retry if len(retry[0]) >= len(items) or retry[1] else (items, False)
+
+class HostPoliteness:
+    """Per-host concurrency cap and minimum spacing between requests"""
+    def __init__(self, concurrency: int = HOST_CONCURRENCY, interval: float = HOST_INTERVAL):
+        self.concurrency = concurrency
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._slots: Dict[str, threading.Semaphore] = {}
+        self._last: Dict[str, float] = {}
+    
+    def _slot(self, host: str) -> threading.Semaphore:
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.Semaphore(self.concurrency)
+            return self._slots[host]
+    
+    def acquire(self, host: str) -> None:
+        self._slot(host).acquire()
+        with self._lock:
+            wait_for = self._last.get(host, 0) + self.interval - time.monotonic()
+        if wait_for > 0:
+            time.sleep(wait_for)
+    
+    def release(self, host: str) -> None:
+        with self._lock:
+            self._last[host] = time.monotonic()
+        self._slot(host).release()
+
+def validators_of(response: requests.Response) -> Dict[str, Optional[str]]:
+    """The response headers FeedCache needs for the next conditional request"""
+    return {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+
+
+class FeedCache:
+    """Persistent per-feed validators (ETag / Last-Modified) and parsed items"""
+    def __init__(self, path: Path = None):
+        self.path = path or DATA_DIR / "news_cache.json"
+        self.entries: Dict[str, Dict] = self._load()
+        self.dirty = False
+    
+    def _load(self) -> Dict:
+        if self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    return json.load(f)
+            except:
+                return {}
+        return {}
+    
+    def get(self, url: str) -> Optional[Dict]:
+        return self.entries.get(url)
+    
+    def headers(self, url: str) -> Dict[str, str]:
+        """Conditional request headers for a cached feed"""
+        entry = self.entries.get(url) or {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+    
+    def store(self, url: str, validators: Dict, items: List[Dict]) -> None:
+        """Cache a fetched feed; validators as returned by validators_of(response)"""
+        self.entries[url] = {
+            **validators,
+            "fetched": datetime.now(timezone.utc).isoformat(),
+            "items": items,
+        }
+        self.dirty = True
+    
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f)
+        tmp.replace(self.path)
+        self.dirty = False
+
 class NewsScraperPolyberg:
-    def __init__(self):
+    def __init__(self, feeds: List[Dict] = None, cache: FeedCache = None, dedup: NearDuplicateIndex = None,
+                 http: HttpClient = None):
+        self.feeds = feeds if feeds is not None else FEEDS
+        self.cache = cache or FeedCache()
+        self.dedup = dedup or NearDuplicateIndex.load()
+        self.timeline = ArticleTimeline.load()
+        self.stats = {"not_modified": 0, "downloaded": 0, "bytes": 0}
         self.articles = []
         self.seen_titles = set()
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'
-        })
+        self.http = http or shared_client()
+        self.politeness = HostPoliteness()
+        self.metrics = metrics("news")
     
-    def deduplicate(self, title):
-        """Avoid duplicate articles"""
+    def deduplicate(self, title, key=''):
+        """Avoid duplicate articles, including near-duplicates seen in earlier runs"""
         normalized = title.lower().strip()
         if normalized in self.seen_titles:
             return False
         self.seen_titles.add(normalized)
-        return True
+        return not self.dedup.is_duplicate(title, key)
     
-    def fetch_cointelegraph(self):
-        """Fetch from CoinTelegraph RSS"""
-        try:
-            response = self.session.get(
-                'https://cointelegraph.com/feed',
-                timeout=10
-            )
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'xml')
-                items = soup.find_all('item', limit=10)
-                for item in items:
-                    try:
-                        title = item.find('title').text if item.find('title') else ''
-                        link = item.find('link').text if item.find('link') else ''
-                        pubDate = item.find('pubDate').text if item.find('pubDate') else ''
-                        
-                        if title and self.deduplicate(title):
-                            self.articles.append({
-                                'title': title,
-                                'source': 'CoinTelegraph',
-                                'url': link,
-                                'time': pubDate,
-                                'category': 'crypto'
-                            })
-                    except:
-                        pass
-                print(f"[News] CoinTelegraph: {len([a for a in self.articles if a['source'] == 'CoinTelegraph'])} articles")
-        except Exception as e:
-            print(f"[News] CoinTelegraph error: {e}")
-    
-    def fetch_theverge(self):
-        """Fetch from The Verge"""
-        try:
-            response = self.session.get(
-                'https://www.theverge.com/rss/index.xml',
-                timeout=10
-            )
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'xml')
-                items = soup.find_all('item', limit=5)
-                for item in items:
-                    try:
-                        title = item.find('title').text if item.find('title') else ''
-                        link = item.find('link').text if item.find('link') else ''
-                        pubDate = item.find('pubDate').text if item.find('pubDate') else ''
-                        
-                        if title and self.deduplicate(title):
-                            self.articles.append({
-                                'title': title,
-                                'source': 'The Verge',
-                                'url': link,
-                                'time': pubDate,
-                                'category': 'tech'
-                            })
-                    except:
-                        pass
-                print(f"[News] The Verge: {len([a for a in self.articles if a['source'] == 'The Verge'])} articles")
-        except Exception as e:
-            print(f"[News] The Verge error: {e}")
-    
-    def fetch_techcrunch(self):
-        """Fetch from TechCrunch RSS"""
-        try:
-            response = self.session.get(
-                'https://techcrunch.com/feed/',
-                timeout=10
-            )
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'xml')
-                items = soup.find_all('item', limit=5)
-                for item in items:
-                    try:
-                        title = item.find('title').text if item.find('title') else ''
-                        link = item.find('link').text if item.find('link') else ''
-                        pubDate = item.find('pubDate').text if item.find('pubDate') else ''
-                        
-                        if title and self.deduplicate(title):
-                            self.articles.append({
-                                'title': title,
-                                'source': 'TechCrunch',
-                                'url': link,
-                                'time': pubDate,
-                                'category': 'tech'
-                            })
-                    except:
-                        pass
-                print(f"[News] TechCrunch: {len([a for a in self.articles if a['source'] == 'TechCrunch'])} articles")
-        except Exception as e:
-            print(f"[News] TechCrunch error: {e}")
-    
-    def fetch_espn(self):
-        """Fetch from ESPN RSS"""
-        try:
-            response = self.session.get(
-                'https://feeds.espn.com/feeds/site/espntech.xml',
-                timeout=10
-            )
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'xml')
-                items = soup.find_all('item', limit=5)
-                for item in items:
-                    try:
-                        title = item.find('title').text if item.find('title') else ''
-                        link = item.find('link').text if item.find('link') else ''
-                        pubDate = item.find('pubDate').text if item.find('pubDate') else ''
-                        
-                        if title and self.deduplicate(title):
-                            self.articles.append({
-                                'title': title,
-                                'source': 'ESPN',
-                                'url': link,
-                                'time': pubDate,
-                                'category': 'sports'
-                            })
-                    except:
-                        pass
-                print(f"[News] ESPN: {len([a for a in self.articles if a['source'] == 'ESPN'])} articles")
-        except Exception as e:
-            print(f"[News] ESPN error: {e}")
-    
-    def fetch_cryptofees(self):
-        """Fetch from Crypto Fees Twitter/News"""
+    def to_articles(self, feed: Dict, items: List[Dict]) -> List[Dict]:
+        """Shape parsed items as news.json articles, timestamps parsed once here"""
+        fetched = time.time()
+        return [
+            {
+                'title': item['title'],
+                'source': feed['source'],
+                'url': item.get('url', ''),
+                'time': item.get('time', ''),
+                'category': feed['category'],
+                'guid': item.get('guid', ''),
+                'ts': parse_timestamp(item.get('time', '')) or fetched,
+            }
+            for item in items
+        ]
+    
+    def fetch_feed(self, feed: Dict) -> List[Dict]:
+        """Fetch and parse one registered feed, reusing the cache on 304"""
+        items, validators = self._download(feed)
+        if validators is not None:
+            self.cache.store(feed['url'], validators, items)
+        return items
+    
+    def _download(self, feed: Dict) -> Tuple[List[Dict], Optional[Dict]]:
+        """(articles, validators) for one feed; validators is None when nothing new was downloaded
+
+        Runs in worker threads that may outlive run()'s deadline, so it only
+        reads the cache; run() stores results on the calling thread.
+        """
+        url = feed['url']
+        host = urlparse(url).netloc
+        limit = feed.get('limit', 5)
+        cached = (self.cache.get(url) or {}).get('items', [])
+        with self.metrics.stage("politeness_wait"):
+            self.politeness.acquire(host)
         try:
-            # Try CryptoSlate as alternative
-            response = self.session.get(
-                'https://cryptoslate.com/feed/',
-                timeout=10
-            )
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'xml')
-                items = soup.find_all('item', limit=5)
-                for item in items:
-                    try:
-                        title = item.find('title').text if item.find('title') else ''
-                        link = item.find('link').text if item.find('link') else ''
-                        pubDate = item.find('pubDate').text if item.find('pubDate') else ''
-                        
-                        if title and self.deduplicate(title):
-                            self.articles.append({
-                                'title': title,
-                                'source': 'CryptoSlate',
-                                'url': link,
-                                'time': pubDate,
-                                'category': 'crypto'
-                            })
-                    except:
-                        pass
-                print(f"[News] CryptoSlate: {len([a for a in self.articles if a['source'] == 'CryptoSlate'])} articles")
-        except Exception as e:
-            print(f"[News] CryptoSlate error: {e}")
-    
-    def run(self):
-        """Fetch all news"""
+            # Per-source stage, so one slow feed stands out in the run report
+            with self.metrics.stage(f"feed:{feed['source']}"):
+                response = self.http.get(
+                    url,
+                    headers={**HEADERS, **self.cache.headers(url)},
+                    timeout=feed.get('timeout', FEED_TIMEOUT),
+                    stream=True
+                )
+                try:
+                    if response.status_code == 304:
+                        self.stats["not_modified"] += 1
+                        self.metrics.count("not_modified")
+                        return [dict(item) for item in cached], None
+                    if response.status_code != 200:
+                        return [], None
+                    
+                    def chunks():
+                        for chunk in response.iter_content(CHUNK_SIZE):
+                            self.stats["bytes"] += len(chunk)
+                            self.metrics.add_bytes(feed['source'], len(chunk))
+                            yield chunk
+                    
+                    seen = {item['guid'] for item in cached if item.get('guid')}
+                    parsed, hit_known = parse_feed_stream(chunks(), limit, seen)
+                finally:
+                    # Closing early skips downloading the rest of the feed
+                    response.close()
+        finally:
+            self.politeness.release(host)
+        
+        self.stats["downloaded"] += 1
+        self.metrics.count("downloaded")
+        items = self.to_articles(feed, parsed)
+        if hit_known:
+            items += [dict(item) for item in cached[:limit - len(items)]]
+        return items, validators_of(response)
+    
+    def run(self, deadline: float = RUN_DEADLINE):
+        """Fetch all registered feeds concurrently"""
         print("[News] Fetching from multiple sources...")
-        self.fetch_cointelegraph()
-        time.sleep(1)
-        self.fetch_techcrunch()
-        time.sleep(1)
-        self.fetch_theverge()
-        time.sleep(1)
-        self.fetch_espn()
-        time.sleep(1)
-        self.fetch_cryptofees()
+        started = time.monotonic()
+        
+        pool = ThreadPoolExecutor(max_workers=max(1, len(self.feeds)))
+        futures = {pool.submit(self._download, feed): feed for feed in self.feeds}
+        done, late = wait(futures, timeout=deadline)
+        pool.shutdown(wait=False, cancel_futures=True)
+        
+        # Merge in registry order so dedup keeps the same winner every run
+        runs = []
+        for fut, feed in futures.items():
+            name = feed['source']
+            if fut in late:
+                print(f"[News] {name}: missed {deadline:.0f}s deadline")
+                continue
+            try:
+                items, validators = fut.result()
+            except Exception as e:
+                print(f"[News] {name} error: {e}")
+                continue
+            if validators is not None:
+                self.cache.store(feed['url'], validators, items)
+            added = [a for a in items if self.deduplicate(a['title'], a.get('guid') or a.get('url', ''))]
+            for a in added:
+                if 'ts' not in a:
+                    a['ts'] = parse_timestamp(a.get('time', '')) or time.time()
+            runs.append(added)
+            print(f"[News] {name}: {len(added)} articles")
+        
+        with self.metrics.stage("timeline_merge"):
+            new = self.timeline.merge(runs)
+        
+        with self.metrics.stage("persist"):
+            self.cache.save()
+            self.dedup.save()
+            self.timeline.save()
+        print(f"[News] Fetched {len(self.feeds)} feeds in {time.monotonic() - started:.1f}s "
+              f"({self.stats['not_modified']} not modified, {self.stats['bytes']:,} bytes downloaded)")
+        print(f"[News] Timeline: {new} new, {len(self.timeline)} retained")
         
-        # Sort by most recent
-        self.articles = sorted(self.articles, key=lambda x: x.get('time', ''), reverse=True)[:30]
+        # Timeline is kept newest-first, so this is a slice, not a sort
+        self.articles = self.timeline.newest(30)
         
         return self.articles
     
@@ -203,12 +381,18 @@ class NewsScraperPolyberg:
             'articles': self.articles,
             'count': len(self.articles)
         }
-        with open(path, 'w') as f:
-            json.dump(data, f, indent=2)
+        tmp = Path(path).with_suffix(".tmp")
+        with self.metrics.stage("write"):
+            with open(tmp, 'w') as f:
+                json.dump(data, f, indent=2)
+            tmp.replace(path)
+        self.metrics.add_bytes("news_json", Path(path).stat().st_size)
         print(f"✓ Saved {len(self.articles)} news articles to {path}")
 
 
 if __name__ == "__main__":
     scraper = NewsScraperPolyberg()
-    scraper.run()
-    scraper.save('data/news.json')
+    with profiled("news") as prof:
+        scraper.run()
+        scraper.save('data/news.json')
+    write_report(extra={"profile": prof.summary} if prof.summary else None)
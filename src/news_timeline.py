@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Polyberg News Timeline
+Persistent newest-first article timeline
+- Feed timestamps (RFC-822 pubDate or ISO-8601) parsed once into epoch seconds
+- Each feed's sorted items k-way heap-merged into the timeline
+- Bounded by a retention window and a size cap
+"""
+
+import heapq
+import json
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+DATA_DIR.mkdir(exist_ok=True)
+
+RETENTION_SEC = 3 * 86400
+MAX_ARTICLES = 1000
+
+
+def parse_timestamp(value: str) -> Optional[float]:
+    """Epoch seconds from an RSS pubDate or Atom ISO-8601 date"""
+    if not value:
+        return None
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        try:
+            dt = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def article_key(article: Dict) -> str:
+    return article.get("guid") or article.get("url") or article.get("title", "")
+
+
+class ArticleTimeline:
+    """Newest-first articles, merged incrementally across runs"""
+
+    def __init__(self, path: Optional[Path] = None, retention_sec: int = RETENTION_SEC,
+                 max_articles: int = MAX_ARTICLES):
+        self.path = path or DATA_DIR / "news_timeline.json"
+        self.retention_sec = retention_sec
+        self.max_articles = max_articles
+        self.articles: List[Dict] = []
+        self._keys = set()
+
+    def __len__(self) -> int:
+        return len(self.articles)
+
+    def merge(self, runs: List[List[Dict]], now: Optional[float] = None) -> int:
+        """Heap-merge newest-first article runs into the timeline
+
+        Each article needs a numeric 'ts'. Articles already present (same
+        GUID/URL) are skipped. Returns how many were added.
+        """
+        now = now if now is not None else time.time()
+        cutoff = now - self.retention_sec
+        fresh = []
+        for run in runs:
+            # Feeds are newest-first already, so this sort is near-linear
+            run = sorted(
+                (a for a in run if a["ts"] >= cutoff and article_key(a) not in self._keys),
+                key=lambda a: a["ts"],
+                reverse=True,
+            )
+            if run:
+                fresh.append(run)
+        if not fresh:
+            self._trim(cutoff)
+            return 0
+
+        merged = []
+        seen = set()
+        added = 0
+        for a in heapq.merge(self.articles, *fresh, key=lambda a: -a["ts"]):
+            if a["ts"] < cutoff or len(merged) >= self.max_articles:
+                break
+            key = article_key(a)
+            if key in seen:
+                continue
+            seen.add(key)
+            if key not in self._keys:
+                added += 1
+            merged.append(a)
+        self.articles = merged
+        self._keys = seen
+        return added
+
+    def _trim(self, cutoff: float) -> None:
+        keep = len(self.articles)
+        while keep and self.articles[keep - 1]["ts"] < cutoff:
+            keep -= 1
+        keep = min(keep, self.max_articles)
+        if keep < len(self.articles):
+            for a in self.articles[keep:]:
+                self._keys.discard(article_key(a))
+            del self.articles[keep:]
+
+    def newest(self, n: int = 30) -> List[Dict]:
+        return self.articles[:n]
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None, **kwargs) -> "ArticleTimeline":
+        timeline = cls(path, **kwargs)
+        if timeline.path.exists():
+            try:
+                with open(timeline.path, "r") as f:
+                    timeline.articles = json.load(f).get("articles", [])
+            except (OSError, ValueError):
+                timeline.articles = []
+        timeline._keys = {article_key(a) for a in timeline.articles}
+        return timeline
+
+    def save(self) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"articles": self.articles}, f, separators=(",", ":"))
+        tmp.replace(self.path)
+
+
+__all__ = [
+    "parse_timestamp",
+    "article_key",
+    "ArticleTimeline",
+]
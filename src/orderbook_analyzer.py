@@ -3,11 +3,18 @@ Orderbook Analyzer - Detect irregular orderbook behavior and anomalies
 """
 
 import asyncio
+import json
 from typing import Dict, List, Optional
 from dataclasses import dataclass, asdict
 from datetime import datetime
 from statistics import stdev, mean
-import aiohttp
+
+try:
+    from .http_client import AsyncHttpClient
+    from .instrumentation import metrics
+except ImportError:
+    from http_client import AsyncHttpClient
+    from instrumentation import metrics
 
 
 @dataclass
@@ -32,28 +39,38 @@ class OrderbookAnalyzer:
         self.history_window = history_window
         self.orderbook_history: Dict[str, List[Dict]] = {}
         self.anomalies: List[OrderbookAnomaly] = []
-        self.session = None
+        self.http = AsyncHttpClient()
+        self.metrics = metrics("orderbook")
     
     async def start(self):
-        self.session = aiohttp.ClientSession()
+        await self.http.start()
     
     async def stop(self):
-        if self.session:
-            await self.session.close()
+        await self.http.close()
     
     async def fetch_orderbook(self, market_id: str) -> Dict:
         """Fetch current orderbook from Polymarket API"""
         try:
             url = f"https://polymarket.com/api/market/{market_id}/orderbook"
-            async with self.session.get(url, timeout=10) as resp:
-                if resp.status == 200:
-                    return await resp.json()
+            with self.metrics.stage("fetch"):
+                status, body = await self.http.get(url, timeout=10)
+            if status == 200:
+                self.metrics.add_bytes("orderbook", len(body))
+                with self.metrics.stage("json_decode"):
+                    return json.loads(body)
         except Exception as e:
             print(f"Error fetching orderbook for {market_id}: {e}")
         return {}
     
     def analyze_orderbook(self, market_id: str, orderbook: Dict) -> List[OrderbookAnomaly]:
         """Analyze orderbook and detect anomalies"""
+        with self.metrics.stage("analyze"):
+            anomalies = self._analyze(market_id, orderbook)
+        self.metrics.count("snapshots")
+        self.metrics.count("anomalies", len(anomalies))
+        return anomalies
+    
+    def _analyze(self, market_id: str, orderbook: Dict) -> List[OrderbookAnomaly]:
         anomalies = []
         
         # Store in history
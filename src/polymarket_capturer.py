@@ -11,14 +11,20 @@ import json
 from dataclasses import dataclass, asdict
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Callable, Dict, List, Optional, Any, Tuple
 import time
-import requests
 import websockets
 from bisect import bisect_right
 from collections import deque
 import os
 
+try:
+    from .adaptive_concurrency import fetch_pages
+    from .http_client import HttpClient, shared_client
+except ImportError:
+    from adaptive_concurrency import fetch_pages
+    from http_client import HttpClient, shared_client
+
 GAMMA_URL = "https://gamma-api.polymarket.com"
 CLOB_WS_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
 RTDS_WS_URL = "wss://ws-live-data.polymarket.com"
@@ -42,6 +48,12 @@ class PriceCache:
         self.max_age_ms = max_age_sec * 1000
         self._ts: Dict[tuple[str, str], List[int]] = {}
         self._px: Dict[tuple[str, str], List[float]] = {}
+        self._listeners: List[Callable[[str, str, int, float], None]] = []
+
+    def subscribe(self, listener: Callable[[str, str, int, float], None]) -> Callable[[], None]:
+        """Call listener(source, asset, ts_ms, price) after every add; returns an unsubscribe function"""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
 
     def add(self, source: str, asset: str, ts_ms: int, price: float) -> None:
         key = (source, asset)
@@ -65,6 +77,13 @@ class PriceCache:
         if j > 0:
             del ts_arr[:j]
             del px_arr[:j]
+        
+        for listener in self._listeners:
+            # A failing listener must not take down the feed that calls add()
+            try:
+                listener(source, asset, ts_ms, price)
+            except Exception as e:
+                print(f"[PriceCache] listener error: {e}", flush=True)
 
     def asof(self, source: str, asset: str, ts_ms: int) -> Tuple[Optional[int], Optional[float]]:
         key = (source, asset)
@@ -78,6 +97,15 @@ class PriceCache:
         
         return ts_arr[i], self._px[key][i]
 
+    def window(self, source: str, asset: str, since_ms: int) -> Tuple[List[int], List[float]]:
+        """(timestamps, prices) from the last point at or before since_ms onwards"""
+        key = (source, asset)
+        ts_arr = self._ts.get(key)
+        if not ts_arr:
+            return [], []
+        i = max(0, bisect_right(ts_arr, since_ms) - 1)
+        return ts_arr[i:], self._px[key][i:]
+
 class OrderBook:
     """Maintain live bid/ask levels"""
     def __init__(self, asset_id: str):
@@ -99,6 +127,20 @@ class OrderBook:
         self.bids = dict(bids_sorted)
         self.asks = dict(asks_sorted)
 
+    def update(self, side: str, price: float, size: float) -> None:
+        """Apply one level change ("BUY" is the bid side); size 0 removes the level"""
+        levels = self.bids if side.upper() == "BUY" else self.asks
+        if size > 0:
+            levels[price] = size
+        else:
+            levels.pop(price, None)
+
+    def best_bid(self) -> Optional[float]:
+        return max(self.bids) if self.bids else None
+
+    def best_ask(self) -> Optional[float]:
+        return min(self.asks) if self.asks else None
+
     def snapshot(self) -> dict:
         out = {}
         bid_items = sorted(self.bids.items(), key=lambda x: x[0], reverse=True)[:LEVELS]
@@ -116,33 +158,30 @@ class OrderBook:
 
 class GammaClient:
     """Gamma API for market discovery and metadata"""
-    def __init__(self):
+    def __init__(self, http: HttpClient = None):
         self.base = GAMMA_URL.rstrip("/")
-        self.s = requests.Session()
+        self.http = http or shared_client()
 
     def get(self, path: str, params: dict = None) -> Any:
-        r = self.s.get(f"{self.base}/{path.lstrip('/')}", params=params, timeout=(5, 15))
-        r.raise_for_status()
-        return r.json()
+        return self.http.get_json(f"{self.base}/{path.lstrip('/')}", params, timeout=(5, 15))
+
+    def get_pages(self, path: str, params: dict = None, page_size: int = 200, max_pages: int = None) -> List[list]:
+        """Offset-paginated GET with adaptive concurrency (see adaptive_concurrency)"""
+        return fetch_pages(f"{self.base}/{path.lstrip('/')}", params, page_size, max_pages, http=self.http)
 
     def scan_15m_events(self, horizon_sec: int = 2 * 3600) -> List[dict]:
-        out, offset = [], 0
+        out = []
         now = utc_now()
         lo = now - timedelta(seconds=horizon_sec)
         hi = now + timedelta(seconds=horizon_sec)
         
-        for _ in range(20):
-            data = self.get("events", {
-                "order": "id",
-                "ascending": "false",
-                "limit": 200,
-                "offset": offset,
-                "closed": "false",
-            })
-            
-            if not data:
-                break
-            
+        pages = self.get_pages("events", {
+            "order": "id",
+            "ascending": "false",
+            "closed": "false",
+        }, page_size=200, max_pages=20)
+        
+        for data in pages:
             for e in data:
                 if not any(s.get("recurrence") == "15m" for s in e.get("series", [])):
                     continue
@@ -158,8 +197,6 @@ class GammaClient:
                 
                 if lo <= st <= hi:
                     out.append(e)
-            
-            offset += 200
         
         return out
 
@@ -9,13 +9,25 @@ Polyberg: Comprehensive Polymarket Data Fetcher
 
 import asyncio
 import json
-import requests
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from collections import defaultdict
 import time
 
+try:
+    from .adaptive_concurrency import fetch_pages
+    from .http_client import HttpClient, shared_client
+    from .instrumentation import metrics, profiled, write_report
+    from .market_news_index import MarketNewsIndex
+    from .snapshot_store import SnapshotStore
+except ImportError:
+    from adaptive_concurrency import fetch_pages
+    from http_client import HttpClient, shared_client
+    from instrumentation import metrics, profiled, write_report
+    from market_news_index import MarketNewsIndex
+    from snapshot_store import SnapshotStore
+
 GAMMA_URL = "https://gamma-api.polymarket.com"
 DATA_DIR = Path(__file__).parent.parent / "data"
 DATA_DIR.mkdir(exist_ok=True)
@@ -87,8 +99,10 @@ class PriceHistoryTracker:
     
     def save(self):
         """Persist history to disk"""
-        with open(self.history_file, "w") as f:
+        tmp = self.history_file.with_suffix(".tmp")
+        with open(tmp, "w") as f:
             json.dump(self.history, f)
+        tmp.replace(self.history_file)
     
     def get_history(self, market_id: str) -> Dict:
         """Get history for a market"""
@@ -97,57 +111,33 @@ class PriceHistoryTracker:
 class PolymarketFullFetcher:
     """Fetch all Polymarket markets with pagination and categorization"""
     
-    def __init__(self):
+    def __init__(self, http: HttpClient = None):
         self.base_url = GAMMA_URL.rstrip("/")
-        self.session = requests.Session()
-        self.session.headers.update({
-            "User-Agent": "Polyberg/1.0",
-        })
+        self.http = http or shared_client()
         self.price_tracker = PriceHistoryTracker()
         self.categorizer = MarketCategorizer()
-    
-    def _get(self, endpoint: str, params: dict = None) -> list:
-        """Make API request with retry logic"""
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                url = f"{self.base_url}/{endpoint.lstrip('/')}"
-                response = self.session.get(url, params=params, timeout=10)
-                response.raise_for_status()
-                return response.json()
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    print(f"Failed to fetch {endpoint}: {e}")
-                    return []
-                time.sleep(1)
-        return []
+        self.news_index = MarketNewsIndex.load()
+        self.snapshots = SnapshotStore()
+        self.metrics = metrics("markets")
     
     def fetch_all_markets(self) -> List[Dict]:
         """Fetch all Polymarket markets with pagination"""
         all_markets = []
-        offset = 0
         limit = 200  # Gamma API max per request
-        consecutive_empty = 0
+        # Per-market work is summed and recorded once, not timed call by call
+        categorize_sec = record_sec = 0.0
+        perf = time.perf_counter
         
         print("[Markets] Fetching all Polymarket markets...")
         
-        while consecutive_empty < 2:  # Stop after 2 empty responses
+        # Pages are fetched with an adaptive number in flight, then processed in order
+        with self.metrics.stage("http"):
+            pages = fetch_pages(f"{self.base_url}/markets", {"closed": "false"}, page_size=limit, http=self.http)
+        self.metrics.count("pages", len(pages))
+        
+        for page, data in enumerate(pages):
+            offset = page * limit
             try:
-                data = self._get("markets", {
-                    "limit": limit,
-                    "offset": offset,
-                    "closed": "false",
-                })
-                
-                if not data or len(data) == 0:
-                    consecutive_empty += 1
-                    if consecutive_empty >= 2:
-                        break
-                    offset += limit
-                    continue
-                
-                consecutive_empty = 0
-                
                 for market in data:
                     try:
                         market_id = market.get("id")
@@ -170,6 +160,10 @@ class PolymarketFullFetcher:
                         # Get expiry time
                         end_time = market.get("endTime", market.get("closesTime"))
                         
+                        t = perf()
+                        category = self.categorizer.categorize(title)
+                        categorize_sec += perf() - t
+                        
                         market_entry = {
                             "id": market_id,
                             "title": title,
@@ -180,12 +174,14 @@ class PolymarketFullFetcher:
                             "volume_24h": float(market.get("volume24h", 0)),
                             "volume_7d": float(market.get("volume7d", 0)),
                             "liquidity": float(market.get("liquidity", 0)),
-                            "category": self.categorizer.categorize(title),
+                            "category": category,
                             "end_time": end_time,
                         }
                         
                         # Track price history
+                        t = perf()
                         self.price_tracker.record(market_id, best_bid, best_ask)
+                        record_sec += perf() - t
                         
                         all_markets.append(market_entry)
                     
@@ -193,14 +189,19 @@ class PolymarketFullFetcher:
                         continue
                 
                 print(f"  [{offset:5d}] Fetched {len(data)} markets, total: {len(all_markets)}")
-                offset += limit
                 
             except Exception as e:
                 print(f"Error fetching markets: {e}")
                 break
         
+        self.metrics.record("categorize", categorize_sec, calls=max(1, len(all_markets)))
+        self.metrics.record("history_record", record_sec, calls=max(1, len(all_markets)))
+        self.metrics.count("markets", len(all_markets))
+        
         # Save price history
-        self.price_tracker.save()
+        with self.metrics.stage("history_save"):
+            self.price_tracker.save()
+        self.metrics.add_bytes("price_history", self.price_tracker.history_file.stat().st_size)
         
         # Sort by volume and liquidity
         all_markets = sorted(
@@ -216,9 +217,37 @@ class PolymarketFullFetcher:
         """Get price history for a specific market"""
         return self.price_tracker.get_history(market_id)
     
+    def link_news(self, markets: List[Dict], news_file: Path = None) -> int:
+        """Annotate markets with related articles from news.json"""
+        news_file = news_file or DATA_DIR / "news.json"
+        if not news_file.exists():
+            return 0
+        try:
+            with open(news_file, "r") as f:
+                articles = json.load(f).get("articles", [])
+        except:
+            return 0
+        
+        # Only markets whose title/slug changed are re-indexed
+        changed, removed = self.news_index.sync(markets)
+        related = self.news_index.link(articles)
+        self.news_index.save()
+        for market in markets:
+            news = related.get(str(market.get("id", "")))
+            if news:
+                market["news"] = news[:3]
+        
+        print(f"[Markets] Linked news to {len(related)} markets ({changed} indexed, {removed} removed)")
+        return len(related)
+    
     def fetch_and_save(self) -> Dict:
         """Fetch all data and save to live_data.json"""
-        markets = self.fetch_all_markets()
+        return self.save(self.fetch_all_markets())
+    
+    def save(self, markets: List[Dict]) -> Dict:
+        """Link news into fetched markets, write live_data.json and append the snapshot"""
+        with self.metrics.stage("link_news"):
+            self.link_news(markets)
         
         data = {
             "timestamp": datetime.now(timezone.utc).isoformat(),
@@ -227,12 +256,22 @@ class PolymarketFullFetcher:
         }
         
         output_file = DATA_DIR / "live_data.json"
-        with open(output_file, "w") as f:
-            json.dump(data, f, indent=2)
+        tmp = output_file.with_suffix(".tmp")
+        with self.metrics.stage("write"):
+            with open(tmp, "w") as f:
+                json.dump(data, f, indent=2)
+            tmp.replace(output_file)
+        self.metrics.add_bytes("live_data", output_file.stat().st_size)
+        
+        # live_data.json is overwritten each cycle; the snapshot store keeps the history
+        with self.metrics.stage("snapshot"):
+            self.snapshots.append(markets)
         
         print(f"✓ Saved {len(markets)} markets to {output_file}")
         return data
 
 if __name__ == "__main__":
     fetcher = PolymarketFullFetcher()
-    fetcher.fetch_and_save()
+    with profiled("markets") as prof:
+        fetcher.fetch_and_save()
+    write_report(extra={"profile": prof.summary} if prof.summary else None)
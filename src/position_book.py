@@ -0,0 +1,133 @@
+"""
+Position Book - Positions indexed by id, market and status with running aggregates
+"""
+
+from collections import deque
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from itertools import count
+from typing import Deque, Dict, List, Optional
+
+
+@dataclass
+class Position:
+    position_id: str
+    market_id: str
+    outcome: str
+    size: float  # shares
+    price: float  # average entry price
+    opened_at: str
+    status: str = "open"  # "open", "closed"
+    mark_price: float = 0.0
+    realized_pnl: float = 0.0
+    closed_at: Optional[str] = None
+    exit_price: Optional[float] = None
+    fills: int = 0
+
+    @property
+    def cost(self) -> float:
+        return self.size * self.price
+
+    @property
+    def unrealized_pnl(self) -> float:
+        return self.size * (self.mark_price - self.price) if self.status == "open" else 0.0
+
+
+class PositionBook:
+    """Open positions by id and market; summaries maintained per fill or close"""
+
+    def __init__(self, closed_history: int = 1000):
+        self.by_id: Dict[str, Position] = {}
+        self.by_market: Dict[str, Dict[str, Position]] = {}
+        self.closed: Deque[Position] = deque(maxlen=closed_history)
+        self._ids = count(1)
+
+        # Running aggregates
+        self.exposure = 0.0
+        self.unrealized_pnl = 0.0
+        self.realized_pnl = 0.0
+        self.open_count = 0
+        self.closed_count = 0
+
+    def __len__(self) -> int:
+        return self.open_count
+
+    def get(self, position_id: str) -> Optional[Position]:
+        return self.by_id.get(position_id)
+
+    def for_market(self, market_id: str) -> List[Position]:
+        return list(self.by_market.get(market_id, {}).values())
+
+    def open(self, market_id: str, outcome: str, size: float, price: float) -> Position:
+        pos = Position(
+            position_id=f"pos_{next(self._ids)}",
+            market_id=market_id,
+            outcome=outcome,
+            size=0.0,
+            price=price,
+            opened_at=datetime.now().isoformat(),
+            mark_price=price,
+        )
+        self.by_id[pos.position_id] = pos
+        self.by_market.setdefault(market_id, {})[pos.position_id] = pos
+        self.open_count += 1
+        self.fill(pos.position_id, size, price)
+        return pos
+
+    def fill(self, position_id: str, size: float, price: float) -> Position:
+        """Add shares to an open position at a fill price"""
+        pos = self.by_id[position_id]
+        before = pos.unrealized_pnl
+        total = pos.size + size
+        if total > 0:
+            pos.price = (pos.cost + size * price) / total
+        pos.size = total
+        pos.fills += 1
+        self.exposure += size * price
+        self.unrealized_pnl += pos.unrealized_pnl - before
+        return pos
+
+    def mark(self, market_id: str, price: float, outcome: Optional[str] = None) -> None:
+        """Re-mark a market's open positions, touching only that market"""
+        for pos in self.by_market.get(market_id, {}).values():
+            if outcome is not None and pos.outcome != outcome:
+                continue
+            before = pos.unrealized_pnl
+            pos.mark_price = price
+            self.unrealized_pnl += pos.unrealized_pnl - before
+
+    def close(self, position_id: str, exit_price: Optional[float] = None) -> Optional[Position]:
+        pos = self.by_id.pop(position_id, None)
+        if pos is None:
+            return None
+        market = self.by_market.get(pos.market_id, {})
+        market.pop(position_id, None)
+        if not market:
+            self.by_market.pop(pos.market_id, None)
+
+        self.unrealized_pnl -= pos.unrealized_pnl
+        self.exposure -= pos.cost
+        exit_price = pos.mark_price if exit_price is None else exit_price
+        pos.realized_pnl = pos.size * (exit_price - pos.price)
+        pos.exit_price = exit_price
+        pos.status = "closed"
+        pos.closed_at = datetime.now().isoformat()
+
+        self.realized_pnl += pos.realized_pnl
+        self.open_count -= 1
+        self.closed_count += 1
+        self.closed.append(pos)
+        return pos
+
+    def summary(self) -> Dict:
+        return {
+            "total_positions": self.open_count + self.closed_count,
+            "open": self.open_count,
+            "closed": self.closed_count,
+            "total_value": self.exposure,
+            "realized_pnl": self.realized_pnl,
+            "unrealized_pnl": self.unrealized_pnl,
+        }
+
+    def to_dict(self, pos: Position) -> Dict:
+        return {**asdict(pos), "unrealized_pnl": pos.unrealized_pnl}
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Polyberg Publisher
+Content-addressed, incremental copy of data files into docs/data
+- A file is rewritten only when its SHA-256 changes (atomic replace); JSON
+  files are hashed without their top-level generation timestamp, so a cycle
+  that fetched the same data publishes nothing
+- Changed files are precompressed next to the original (.gz, and .br when
+  the brotli package is installed)
+- manifest.json lists hash, size and generation time per file; the
+  dashboard polls it and re-downloads only what changed
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import brotli
+except ImportError:  # optional; .gz is always written
+    brotli = None
+
+REPO_ROOT = Path(__file__).parent.parent
+DATA_DIR = REPO_ROOT / "data"
+DOCS_DATA_DIR = REPO_ROOT / "docs" / "data"
+MANIFEST = "manifest.json"
+# Top-level JSON fields every producer restamps on each save
+VOLATILE_KEYS = ("timestamp", "generated_at")
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def content_digest(name: str, data: bytes) -> str:
+    """SHA-256 of a file's content, ignoring VOLATILE_KEYS in top-level JSON objects"""
+    if name.endswith(".json"):
+        try:
+            doc = json.loads(data)
+        except ValueError:
+            doc = None
+        if isinstance(doc, dict):
+            stable = {k: v for k, v in doc.items() if k not in VOLATILE_KEYS}
+            return sha256(json.dumps(stable, sort_keys=True, separators=(",", ":")).encode())
+    return sha256(data)
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Write via a temp file in the same directory and rename over `path`"""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, 0o644)  # mkstemp creates 0600; these files are served
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def compressed(data: bytes) -> Dict[str, bytes]:
+    """Precompressed variants by file suffix"""
+    # mtime=0 keeps the .gz bytes identical for identical input
+    out = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        out[".br"] = brotli.compress(data, quality=11)
+    return out
+
+
+class Publisher:
+    """Publishes changed files from data/ into docs/data with a manifest"""
+
+    def __init__(self, src_dir: Path = DATA_DIR, out_dir: Path = DOCS_DATA_DIR):
+        self.src_dir = Path(src_dir)
+        self.out_dir = Path(out_dir)
+        self.manifest_path = self.out_dir / MANIFEST
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict:
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+            if isinstance(manifest.get("files"), dict):
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {"generated_at": None, "files": {}}
+
+    def _is_current(self, name: str, digest: str) -> bool:
+        entry = self.manifest["files"].get(name)
+        if not entry or entry.get("sha256") != digest:
+            return False
+        # Also catch outputs deleted or edited behind the manifest's back
+        target = self.out_dir / name
+        return target.exists() and target.stat().st_size == entry.get("bytes")
+
+    def publish(self, files: Iterable[str]) -> Dict[str, List[str]]:
+        """Publish `files` (names relative to src_dir)
+
+        Returns {"written": [...], "unchanged": [...], "missing": [...]}.
+        The manifest is rewritten only when at least one file changed.
+        """
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        result: Dict[str, List[str]] = {"written": [], "unchanged": [], "missing": []}
+        now = datetime.now(timezone.utc).isoformat()
+
+        for name in files:
+            src = self.src_dir / name
+            if not src.exists():
+                result["missing"].append(name)
+                continue
+            data = src.read_bytes()
+            digest = content_digest(name, data)
+            if self._is_current(name, digest):
+                result["unchanged"].append(name)
+                continue
+
+            variants = compressed(data)
+            # Compressed copies first, so the plain file never points at stale ones
+            for suffix, blob in variants.items():
+                atomic_write(self.out_dir / f"{name}{suffix}", blob)
+            for suffix in {".gz", ".br"} - set(variants):
+                (self.out_dir / f"{name}{suffix}").unlink(missing_ok=True)
+            atomic_write(self.out_dir / name, data)
+
+            self.manifest["files"][name] = {
+                "sha256": digest,
+                "bytes": len(data),
+                "generated_at": now,
+                "encodings": {suffix[1:]: len(blob) for suffix, blob in variants.items()},
+            }
+            result["written"].append(name)
+
+        if result["written"]:
+            self.manifest["generated_at"] = now
+            atomic_write(self.manifest_path, json.dumps(self.manifest, indent=2).encode())
+        return result
+
+
+def publish(files: Iterable[str], src_dir: Path = DATA_DIR, out_dir: Path = DOCS_DATA_DIR) -> Dict[str, List[str]]:
+    return Publisher(src_dir, out_dir).publish(files)
+
+
+def main():
+    """Self-check: a second cycle with only new timestamps writes nothing"""
+    with tempfile.TemporaryDirectory() as tmp:
+        src, out = Path(tmp) / "data", Path(tmp) / "docs"
+        src.mkdir()
+        files = ["live_data.json", "news.json"]
+
+        def cycle(stamp: str, markets: list) -> Dict[str, List[str]]:
+            (src / "live_data.json").write_text(json.dumps({"timestamp": stamp, "markets": markets}, indent=2))
+            (src / "news.json").write_text(json.dumps({"timestamp": stamp, "articles": []}, indent=2))
+            return Publisher(src, out).publish(files)
+
+        first = cycle("2026-01-01T00:00:00+00:00", [{"id": 1}])
+        second = cycle("2026-01-01T00:01:00+00:00", [{"id": 1}])
+        third = cycle("2026-01-01T00:02:00+00:00", [{"id": 2}])
+        print(f"first: {first['written']}\nsecond: {second['written']}\nthird: {third['written']}")
+        assert first["written"] == files
+        assert second["written"] == [] and second["unchanged"] == files
+        assert third["written"] == ["live_data.json"]
+
+
+__all__ = [
+    "VOLATILE_KEYS",
+    "sha256",
+    "content_digest",
+    "atomic_write",
+    "compressed",
+    "Publisher",
+    "publish",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Polyberg Push Server
+Streams keyed collections (markets, whales, news, prices) to dashboards
+over Server-Sent Events
+- Producers replace a collection; only added, changed or removed items
+  become part of the next patch, and changed items carry only the changed
+  fields
+- Changes are coalesced and sent at most once per interval as one
+  versioned patch
+- Reconnecting clients resume from Last-Event-ID through a short patch
+  history, or get a fresh snapshot when they are too far behind
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_PORT = 8766  # 8765 is the whale alert socket
+DEFAULT_INTERVAL = 1.0
+HISTORY_SIZE = 600  # patches kept for resume, ten minutes at one per second
+CLIENT_QUEUE_SIZE = 64
+HEARTBEAT = 15.0  # idle keep-alive, and how long a stalled client may block a write
+
+# Collection -> item key field
+KEYS = {"markets": "id", "whales": "address", "news": "url", "prices": "asset"}
+
+_INDEX_HTML = Path(__file__).parent.parent / "docs" / "index.html"
+
+
+_MISSING = object()
+DELETED = object()  # diff_item value for a field the new item no longer has
+
+
+def diff_item(old: Dict, new: Dict) -> Dict:
+    """Fields of `new` that differ from `old`; removed fields come back as DELETED
+
+    A field that is now None is a change like any other, so patches can
+    tell "set to null" from "removed".
+    """
+    changed = {k: v for k, v in new.items() if old.get(k, _MISSING) != v}
+    for k in old.keys() - new.keys():
+        changed[k] = DELETED
+    return changed
+
+
+class PushHub:
+    """Keyed state plus a coalescing, versioned patch stream"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, history: int = HISTORY_SIZE,
+                 keys: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            interval: Seconds between patches; changes in between are merged
+            history: Patches kept so reconnecting clients can catch up
+            keys: Collection -> key field (defaults to KEYS)
+        """
+        self.interval = interval
+        self.keys = {**KEYS, **(keys or {})}
+        self.version = 0
+        # Event ids are "epoch:version", so ids from before a restart never look current
+        self.epoch = str(int(time.time()))
+        self.state: Dict[str, Dict[str, Dict]] = {}
+        # Net change per item since the last patch: fields to set, or None to delete
+        self._pending: Dict[Tuple[str, str], Optional[Dict]] = {}
+        self.history: Deque[Tuple[int, str]] = deque(maxlen=history)  # (version, encoded patch)
+        self.clients: Set[asyncio.Queue] = set()
+        self._wake: Optional[asyncio.Event] = None
+        self.stats = {"updates": 0, "patches": 0, "items_sent": 0, "bytes_sent": 0, "snapshots": 0, "dropped_clients": 0}
+
+    def _key(self, collection: str, item: Dict) -> str:
+        return str(item.get(self.keys.get(collection, "id"), ""))
+
+    def _stage(self, collection: str, key: str, old: Optional[Dict], new: Optional[Dict]) -> bool:
+        slot = (collection, key)
+        if new is None:
+            self._pending[slot] = None
+            return True
+        fields = diff_item(old, new) if old is not None else dict(new)
+        if not fields:
+            return False
+        prev = self._pending.get(slot, _MISSING)
+        if prev is None:
+            # Deleted and re-added inside one interval: send it whole
+            fields = dict(new)
+        elif prev is not _MISSING:
+            fields = {**prev, **fields}
+        self._pending[slot] = fields
+        return True
+
+    def update(self, collection: str, items: Iterable[Dict]) -> int:
+        """Replace a collection; items missing from `items` are deleted. Returns items staged"""
+        current = self.state.setdefault(collection, {})
+        staged = 0
+        seen = set()
+        for item in items:
+            key = self._key(collection, item)
+            if not key:
+                continue
+            seen.add(key)
+            staged += self._stage(collection, key, current.get(key), item)
+            current[key] = dict(item)
+        for key in [k for k in current if k not in seen]:
+            del current[key]
+            staged += self._stage(collection, key, None, None)
+        self.stats["updates"] += 1
+        if staged and self._wake:
+            self._wake.set()
+        return staged
+
+    def upsert(self, collection: str, item: Dict) -> None:
+        """Change one item without touching the rest of its collection"""
+        current = self.state.setdefault(collection, {})
+        key = self._key(collection, item)
+        if key:
+            changed = self._stage(collection, key, current.get(key), item)
+            current[key] = dict(item)
+            if changed and self._wake:
+                self._wake.set()
+
+    def snapshot(self) -> Dict:
+        return {
+            "v": self.version,
+            "data": {c: list(items.values()) for c, items in self.state.items()},
+        }
+
+    def flush(self) -> Optional[str]:
+        """Turn pending changes into the next patch and queue it to every client"""
+        if not self._pending:
+            return None
+        ops: Dict[str, Dict[str, Any]] = {}
+        for (collection, key), fields in self._pending.items():
+            op = ops.setdefault(collection, {"set": {}, "unset": {}, "del": []})
+            if fields is None:
+                op["del"].append(key)
+                continue
+            removed = [f for f, v in fields.items() if v is DELETED]
+            if removed:
+                op["unset"][key] = removed
+            kept = {f: v for f, v in fields.items() if v is not DELETED}
+            if kept:
+                op["set"][key] = kept
+        self.stats["items_sent"] += len(self._pending)
+        self._pending.clear()
+
+        self.version += 1
+        data = json.dumps({"v": self.version, "ops": ops}, separators=(",", ":"))
+        event = f"id: {self.epoch}:{self.version}\nevent: patch\ndata: {data}\n\n"
+        self.history.append((self.version, event))
+        self.stats["patches"] += 1
+        for queue in list(self.clients):
+            self._offer(queue, event)
+        return event
+
+    def drop(self, queue: asyncio.Queue) -> None:
+        """End a client's stream; its backlog is discarded"""
+        self.clients.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    def _offer(self, queue: asyncio.Queue, event: str) -> None:
+        if queue.full():
+            # Too slow to keep up: cut it off, it reconnects and resumes or resyncs
+            self.drop(queue)
+            self.stats["dropped_clients"] += 1
+            return
+        queue.put_nowait(event)
+
+    def catch_up(self, last_id: Optional[str]) -> List[str]:
+        """Events that bring a client whose last event id is `last_id` up to date"""
+        since = None
+        epoch, _, version = (last_id or "").partition(":")
+        if epoch == self.epoch and version.isdigit():
+            since = int(version)
+        if since is not None and since == self.version:
+            return []
+        if since is not None and self.history and self.history[0][0] <= since + 1 <= self.version:
+            return [event for v, event in self.history if v > since]
+        self.stats["snapshots"] += 1
+        data = json.dumps(self.snapshot(), separators=(",", ":"))
+        return [f"id: {self.epoch}:{self.version}\nevent: snapshot\ndata: {data}\n\n"]
+
+    async def run(self, stop_evt: asyncio.Event) -> None:
+        """Emit a patch whenever something changed, at most once per interval"""
+        self._wake = asyncio.Event()
+        if self._pending:
+            self._wake.set()
+        while not stop_evt.is_set():
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=HEARTBEAT)
+            except asyncio.TimeoutError:
+                for queue in list(self.clients):
+                    self._offer(queue, ": ping\n\n")
+                continue
+            started = time.monotonic()
+            self._wake.clear()
+            self.flush()
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+class PushServer:
+    """Minimal HTTP server: /events (SSE), /snapshot (JSON), / (dashboard)"""
+
+    def __init__(self, hub: PushHub, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        self.hub = hub
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._client, self.host, self.port)
+        print(f"[Push] serving on http://{self.host}:{self.port}/?push", flush=True)
+
+    async def close(self) -> None:
+        for queue in list(self.hub.clients):
+            self.hub.drop(queue)
+        await asyncio.sleep(0)  # let streams see the end marker
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=10)
+            lines = request.decode("latin-1").split("\r\n")
+            method, target, _ = lines[0].split(" ", 2)
+            headers = {}
+            for line in lines[1:]:
+                if ":" in line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+            url = urlsplit(target)
+            if method != "GET":
+                await self._respond(writer, 405, "text/plain", b"method not allowed")
+            elif url.path == "/events":
+                await self._stream(reader, writer, headers, parse_qs(url.query))
+            elif url.path == "/snapshot":
+                body = json.dumps(self.hub.snapshot(), separators=(",", ":")).encode()
+                await self._respond(writer, 200, "application/json", body)
+            elif url.path in ("/", "/index.html") and _INDEX_HTML.exists():
+                await self._respond(writer, 200, "text/html; charset=utf-8", _INDEX_HTML.read_bytes())
+            else:
+                await self._respond(writer, 404, "text/plain", b"not found")
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, content_type: str, body: bytes) -> None:
+        writer.write(
+            f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+            "Access-Control-Allow-Origin: *\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+    async def _stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                      headers: Dict[str, str], query: Dict[str, List[str]]) -> None:
+        last_id = headers.get("last-event-id") or (query.get("since") or [None])[0]
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+            b"Access-Control-Allow-Origin: *\r\nConnection: keep-alive\r\n\r\nretry: 2000\n\n"
+        )
+        # Catch-up and registration happen without awaiting, so no patch falls in between
+        queue: asyncio.Queue = asyncio.Queue(CLIENT_QUEUE_SIZE)
+        backlog = self.hub.catch_up(last_id)
+        self.hub.clients.add(queue)
+        # Clients send nothing after the request, so EOF means they went away
+        hangup = asyncio.ensure_future(reader.read())
+        hangup.add_done_callback(lambda _: self.hub.drop(queue))
+        try:
+            for event in backlog:
+                writer.write(event.encode())
+                self.hub.stats["bytes_sent"] += len(event)
+            await writer.drain()
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                writer.write(event.encode())
+                self.hub.stats["bytes_sent"] += len(event)
+                await asyncio.wait_for(writer.drain(), timeout=HEARTBEAT)
+        finally:
+            self.hub.clients.discard(queue)
+            hangup.cancel()
+
+
+def feeder_sink(hub: PushHub) -> Callable[[str, Any], None]:
+    """Adapter for PolybergLiveFeeder stage results (lists, or prices by asset)"""
+    def publish(name: str, result: Any) -> None:
+        if isinstance(result, dict):
+            result = [{"asset": asset, **entry} for asset, entry in result.items()]
+        hub.update(name, result)
+    return publish
+
+
+__all__ = [
+    "DELETED",
+    "diff_item",
+    "PushHub",
+    "PushServer",
+    "feeder_sink",
+]
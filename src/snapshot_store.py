@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Polyberg Snapshot Store
+Time series of every fetched market row, in one SQLite (WAL) file per UTC day
+- append() stores a cycle's markets: bid, ask, spread, volume_24h, liquidity
+- Rows are clustered by (cycle, market) with a (market, time) index, so a
+  whole cycle or one market's series is a range read
+- Partitions older than RAW_DAYS keep one cycle per DOWNSAMPLE_SECONDS;
+  partitions older than RETENTION_DAYS are deleted
+- `python src/snapshot_store.py series <market_id> [field] [days]`,
+  `... movers [field] [ratio]`, `... partitions`
+"""
+
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+SNAPSHOT_DIR = DATA_DIR / "snapshots"
+
+FIELDS = ("bid", "ask", "spread", "volume_24h", "liquidity")
+RAW_DAYS = 7
+DOWNSAMPLE_SECONDS = 3600
+RETENTION_DAYS = 90
+MAX_TS = 2 ** 62
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    ts INTEGER NOT NULL,
+    market_id TEXT NOT NULL,
+    bid REAL, ask REAL, spread REAL, volume_24h REAL, liquidity REAL,
+    PRIMARY KEY (ts, market_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS snapshots_market ON snapshots (market_id, ts);
+CREATE TABLE IF NOT EXISTS cycles (ts INTEGER PRIMARY KEY, markets INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def _day_start(day: str) -> int:
+    return int(datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+
+
+def _column(field: str) -> str:
+    # Field names end up in SQL text, so only known columns get through
+    if field not in FIELDS:
+        raise ValueError(f"unknown field {field!r}, expected one of {FIELDS}")
+    return field
+
+
+class SnapshotStore:
+    """Day-partitioned market snapshots with indexed range queries"""
+
+    def __init__(self, directory: Optional[Path] = None, raw_days: int = RAW_DAYS,
+                 resolution: int = DOWNSAMPLE_SECONDS, retention_days: int = RETENTION_DAYS):
+        """
+        Args:
+            directory: Where the markets_YYYY-MM-DD.db partitions live
+            raw_days: Partitions younger than this keep every cycle
+            resolution: Seconds per kept cycle in older partitions
+            retention_days: Partitions older than this are deleted
+        """
+        self.directory = Path(directory or SNAPSHOT_DIR)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.raw_days = raw_days
+        self.resolution = resolution
+        self.retention_days = retention_days
+        self._conns: Dict[str, sqlite3.Connection] = {}
+        self._lock = threading.RLock()
+        self._maintained: Optional[str] = None
+
+    def _path(self, day: str) -> Path:
+        return self.directory / f"markets_{day}.db"
+
+    def _connect(self, day: str, create: bool = False) -> Optional[sqlite3.Connection]:
+        conn = self._conns.get(day)
+        if conn is None:
+            path = self._path(day)
+            if not create and not path.exists():
+                return None
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # WAL keeps this crash-safe; only the last commit is at risk
+            conn.executescript(SCHEMA)
+            self._conns[day] = conn
+        return conn
+
+    def days(self, since: Optional[float] = None, until: Optional[float] = None) -> List[str]:
+        """Partitions overlapping [since, until], oldest first"""
+        lo = _day(since) if since is not None else ""
+        hi = _day(until) if until is not None else "9999"
+        found = sorted(p.stem[len("markets_"):] for p in self.directory.glob("markets_*.db"))
+        return [d for d in found if lo <= d <= hi]
+
+    def append(self, markets: Iterable[Dict], ts: Optional[float] = None) -> int:
+        """Store one cycle of market rows (as built by PolymarketFullFetcher). Returns rows written
+
+        An empty batch (a failed fetch) records no cycle, so it never becomes
+        the latest cycle that movers() and cycle() compare against.
+        """
+        ts = int(ts if ts is not None else time.time())
+        rows = [
+            (ts, str(m["id"]), m.get("bid"), m.get("ask"), m.get("spread"), m.get("volume_24h"), m.get("liquidity"))
+            for m in markets if m.get("id") is not None
+        ]
+        if not rows:
+            return 0
+        day = _day(ts)
+        with self._lock:
+            conn = self._connect(day, create=True)
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                conn.execute("INSERT OR REPLACE INTO cycles VALUES (?, ?)", (ts, len(rows)))
+            if self._maintained != day:
+                self.maintain(ts)
+        return len(rows)
+
+    def series(self, market_id: str, field: str = "spread", since: Optional[float] = None,
+               until: Optional[float] = None) -> List[Tuple[int, float]]:
+        """(ts, value) points for one market, oldest first"""
+        col = _column(field)
+        lo, hi = int(since or 0), int(until if until is not None else MAX_TS)
+        out: List[Tuple[int, float]] = []
+        with self._lock:
+            for day in self.days(since, until):
+                conn = self._connect(day)
+                out += conn.execute(
+                    f"SELECT ts, {col} FROM snapshots WHERE market_id = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+                    (str(market_id), lo, hi),
+                ).fetchall()
+        return out
+
+    def _cycle(self, since: Optional[float], until: Optional[float], last: bool) -> Optional[Tuple[str, int]]:
+        """(partition, ts) of the first or last cycle inside [since, until]"""
+        lo, hi = int(since or 0), int(until if until is not None else MAX_TS)
+        days = self.days(since, until)
+        for day in reversed(days) if last else days:
+            row = self._connect(day).execute(
+                f"SELECT ts FROM cycles WHERE ts BETWEEN ? AND ? AND markets > 0 ORDER BY ts {'DESC' if last else 'ASC'} LIMIT 1",
+                (lo, hi),
+            ).fetchone()
+            if row:
+                return day, row[0]
+        return None
+
+    def _rows(self, day: str, ts: int, fields: Iterable[str] = FIELDS) -> Dict[str, tuple]:
+        cols = ", ".join(_column(f) for f in fields)
+        cur = self._connect(day).execute(f"SELECT market_id, {cols} FROM snapshots WHERE ts = ?", (ts,))
+        return {row[0]: row[1:] for row in cur}
+
+    def cycle(self, at: Optional[float] = None) -> Tuple[Optional[int], Dict[str, Dict]]:
+        """(ts, {market_id: row}) for the last cycle at or before `at` (default: latest)"""
+        with self._lock:
+            found = self._cycle(None, at, last=True)
+            if found is None:
+                return None, {}
+            day, ts = found
+            return ts, {mid: dict(zip(FIELDS, values)) for mid, values in self._rows(day, ts).items()}
+
+    def movers(self, field: str = "volume_24h", since: Optional[float] = None, until: Optional[float] = None,
+               min_ratio: float = 2.0) -> List[Dict]:
+        """Markets whose `field` grew by at least `min_ratio` between the first and last
+        cycle in [since, until] (default: today, UTC), largest ratio first"""
+        if since is None:
+            since = _day_start(_day(until if until is not None else time.time()))
+        col = _column(field)
+        with self._lock:
+            first = self._cycle(since, until, last=False)
+            last = self._cycle(since, until, last=True)
+            if first is None or first == last:
+                return []
+            conn = self._connect(last[0])
+            start = "snapshots"
+            if first[0] != last[0]:
+                # Range spans days: join against the earlier partition in place
+                conn.execute("ATTACH DATABASE ? AS start", (str(self._path(first[0])),))
+                start = "start.snapshots"
+            try:
+                rows = conn.execute(
+                    f"SELECT b.market_id, a.{col}, b.{col} FROM snapshots b "
+                    f"JOIN {start} a ON a.ts = ? AND a.market_id = b.market_id "
+                    f"WHERE b.ts = ? AND a.{col} > 0 AND b.{col} >= a.{col} * ?",
+                    (first[1], last[1], min_ratio),
+                ).fetchall()
+            finally:
+                if first[0] != last[0]:
+                    conn.execute("DETACH DATABASE start")
+        out = [{"market_id": mid, "from": v0, "to": v1, "ratio": round(v1 / v0, 4)} for mid, v0, v1 in rows]
+        out.sort(key=lambda r: -r["ratio"])
+        return out
+
+    def _downsample(self, conn: sqlite3.Connection) -> int:
+        # Every market is written at its cycle's ts, so keeping whole cycles keeps rows aligned
+        keep = "SELECT MAX(ts) FROM cycles GROUP BY ts / ?"
+        with conn:
+            removed = conn.execute(f"DELETE FROM snapshots WHERE ts NOT IN ({keep})", (self.resolution,)).rowcount
+            conn.execute(f"DELETE FROM cycles WHERE ts NOT IN ({keep})", (self.resolution,))
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('resolution', ?)", (str(self.resolution),))
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+
+    def _drop(self, day: str) -> None:
+        conn = self._conns.pop(day, None)
+        if conn is not None:
+            conn.close()
+        path = self._path(day)
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{path}{suffix}").unlink(missing_ok=True)
+
+    def maintain(self, now: Optional[float] = None) -> Dict[str, List[str]]:
+        """Apply retention and downsampling; append() runs this once per day"""
+        now = now if now is not None else time.time()
+        today = datetime.fromtimestamp(now, tz=timezone.utc).date()
+        result: Dict[str, List[str]] = {"downsampled": [], "deleted": []}
+        with self._lock:
+            for day in self.days():
+                age = (today - datetime.strptime(day, "%Y-%m-%d").date()).days
+                if age > self.retention_days:
+                    self._drop(day)
+                    result["deleted"].append(day)
+                elif age > self.raw_days:
+                    conn = self._connect(day)
+                    if conn.execute("SELECT value FROM meta WHERE key = 'resolution'").fetchone() is None:
+                        self._downsample(conn)
+                        result["downsampled"].append(day)
+            self._maintained = _day(now)
+        return result
+
+    def partitions(self) -> List[Dict]:
+        """Size, cycle count and resolution of every partition"""
+        out = []
+        with self._lock:
+            for day in self.days():
+                conn = self._connect(day)
+                cycles = conn.execute("SELECT COUNT(*) FROM cycles").fetchone()[0]
+                resolution = conn.execute("SELECT value FROM meta WHERE key = 'resolution'").fetchone()
+                size = sum(p.stat().st_size for p in self.directory.glob(f"markets_{day}.db*"))
+                out.append({"day": day, "cycles": cycles, "bytes": size,
+                            "resolution": int(resolution[0]) if resolution else None})
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._conns.values():
+                conn.close()
+            self._conns.clear()
+
+
+def main():
+    store = SnapshotStore()
+    args = sys.argv[1:]
+    started = time.perf_counter()
+    if args[:1] == ["series"] and len(args) >= 2:
+        field = args[2] if len(args) > 2 else "spread"
+        days = float(args[3]) if len(args) > 3 else 7
+        points = store.series(args[1], field, since=time.time() - days * 86400)
+        for ts, value in points:
+            print(f"{datetime.fromtimestamp(ts, tz=timezone.utc):%Y-%m-%d %H:%M}  {value}")
+        print(f"{len(points)} points")
+    elif args[:1] == ["movers"]:
+        field = args[1] if len(args) > 1 else "volume_24h"
+        ratio = float(args[2]) if len(args) > 2 else 2.0
+        rows = store.movers(field, min_ratio=ratio)
+        for row in rows[:50]:
+            print(f"{row['market_id']:<12} {row['from']:>16,.2f} -> {row['to']:>16,.2f}  x{row['ratio']}")
+        print(f"{len(rows)} markets")
+    elif args[:1] == ["partitions"]:
+        for p in store.partitions():
+            res = f"{p['resolution']}s" if p["resolution"] else "raw"
+            print(f"{p['day']}  {p['cycles']:>5} cycles  {p['bytes'] / 1e6:8.1f} MB  {res}")
+    else:
+        print(__doc__)
+        return
+    print(f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+
+
+__all__ = [
+    "FIELDS",
+    "SnapshotStore",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,23 @@ import asyncio
 import json
 from typing import Dict, List, Optional
 from datetime import datetime
-import aiohttp
 from dataclasses import dataclass
 
+try:
+    from .http_client import AsyncHttpClient
+    from .live_dashboard import LiveDashboard
+    from .market_cache import MarketCache
+    from .market_search import MarketSearchIndex
+    from .matching_engine import BUY, MatchingEngine, Order
+    from .position_book import PositionBook
+except ImportError:
+    from http_client import AsyncHttpClient
+    from live_dashboard import LiveDashboard
+    from market_cache import MarketCache
+    from market_search import MarketSearchIndex
+    from matching_engine import BUY, MatchingEngine, Order
+    from position_book import PositionBook
+
 
 @dataclass
 class MarketInfo:
@@ -21,52 +35,90 @@ class MarketInfo:
     outcomes: List[str]
 
 
+def _spread_pct(m: MarketInfo) -> float:
+    return ((m.ask - m.bid) / m.bid * 100) if m.bid > 0 else 0
+
+
+MARKET_COLUMNS = [
+    ("MARKET", 40, lambda m: m.title[:38]),
+    ("BID", 8, lambda m: f"{m.bid:>8.4f}"),
+    ("ASK", 8, lambda m: f"{m.ask:>8.4f}"),
+    ("SPREAD", 8, lambda m: f"{_spread_pct(m):>7.2f}%"),
+    ("24H VOL", 15, lambda m: f"${m.volume_24h:>14,.0f}"),
+    ("LIQUIDITY", 15, lambda m: f"${m.liquidity:>14,.0f}"),
+]
+
+
 class TradingTerminal:
     """Interactive trading terminal for Polymarket"""
     
     def __init__(self):
-        self.session = None
+        self.http = AsyncHttpClient()
         self.portfolio: Dict[str, float] = {}
-        self.open_positions: List[Dict] = []
-        self.market_cache: Dict[str, MarketInfo] = {}
+        self.positions = PositionBook()
+        self.market_cache = MarketCache(self.fetch_markets)
+        self.search_index = MarketSearchIndex()
+        self.market_cache.subscribe(self._index_markets)
+        self.engine = MatchingEngine(on_fill=self._on_fill)
+        self._order_positions: Dict[int, str] = {}
     
     async def start(self):
-        self.session = aiohttp.ClientSession()
+        await self.http.start()
+        # Warm the cache once, then keep it fresh off the keystroke path
+        await self.market_cache.refresh()
+        self.market_cache.start()
     
     async def stop(self):
-        if self.session:
-            await self.session.close()
+        await self.market_cache.stop()
+        await self.http.close()
     
     async def fetch_markets(self) -> List[MarketInfo]:
         """Fetch all active markets from Polymarket"""
         try:
             url = "https://polymarket.com/api/markets"
-            async with self.session.get(url, timeout=10) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    markets = []
-                    
-                    for market in data.get("data", [])[:50]:  # Top 50 markets
-                        market_info = MarketInfo(
-                            market_id=market.get("id", ""),
-                            title=market.get("title", ""),
-                            bid=market.get("bid_price", 0),
-                            ask=market.get("ask_price", 0),
-                            liquidity=market.get("liquidity", 0),
-                            volume_24h=market.get("volume_24h", 0),
-                            outcomes=market.get("outcomes", [])
-                        )
-                        markets.append(market_info)
-                        self.market_cache[market_info.market_id] = market_info
-                    
-                    return markets
+            data = await self.http.get_json(url, timeout=10)
+            if data is not None:
+                markets = []
+                
+                for market in data.get("data", []):
+                    market_info = MarketInfo(
+                        market_id=market.get("id", ""),
+                        title=market.get("title", ""),
+                        bid=market.get("bid_price", 0),
+                        ask=market.get("ask_price", 0),
+                        liquidity=market.get("liquidity", 0),
+                        volume_24h=market.get("volume_24h", 0),
+                        outcomes=market.get("outcomes", [])
+                    )
+                    markets.append(market_info)
+                
+                return markets
         except Exception as e:
             print(f"Error fetching markets: {e}")
         
         return []
     
+    @staticmethod
+    def _book_key(market_id: str, outcome: str) -> str:
+        return f"{market_id}:{outcome}"
+
+    def _on_fill(self, order: Order, price: float, size: float) -> None:
+        """Turn engine fills into position updates"""
+        pos_id = self._order_positions.get(order.order_id)
+        if pos_id is not None and self.positions.get(pos_id) is not None:
+            self.positions.fill(pos_id, size, price)
+        else:
+            market_id, _, outcome = order.book.rpartition(":")
+            self._order_positions[order.order_id] = self.positions.open(market_id, outcome, size, price).position_id
+
+    def update_depth(self, market_id: str, outcome: str, ob) -> None:
+        """Feed a polymarket_capturer.OrderBook; fills crossed resting orders"""
+        self.engine.on_orderbook(self._book_key(market_id, outcome), ob)
+        if ob.bids:
+            self.positions.mark(market_id, max(ob.bids), outcome)
+
     async def place_order(self, market_id: str, outcome: str, amount: float, price: float) -> Dict:
-        """Place a trade order"""
+        """Place a paper buy order, matched against the outcome's order book"""
         try:
             payload = {
                 "market_id": market_id,
@@ -76,16 +128,13 @@ class TradingTerminal:
                 "timestamp": datetime.now().isoformat()
             }
             
-            # Add to positions
-            self.open_positions.append({
-                **payload,
-                "status": "pending",
-                "pnl": 0
-            })
+            order = self.engine.submit(self._book_key(market_id, outcome), BUY, price, amount)
             
             return {
                 "status": "success",
-                "order_id": f"order_{len(self.open_positions)}",
+                "order_id": order.order_id,
+                "position_id": self._order_positions.get(order.order_id),
+                "order": order.to_dict(),
                 "details": payload
             }
         except Exception as e:
@@ -93,37 +142,43 @@ class TradingTerminal:
                 "status": "error",
                 "message": str(e)
             }
+
+    def cancel_order(self, order_id: int) -> Dict:
+        """Cancel the unfilled remainder of a resting order"""
+        order = self.engine.cancel(order_id)
+        if order:
+            return {"status": "success", "order": order.to_dict()}
+        return {"status": "error", "message": "Order not found"}
     
-    async def close_position(self, position_id: int) -> Dict:
-        """Close an open position"""
-        if position_id < len(self.open_positions):
-            pos = self.open_positions[position_id]
-            pos["status"] = "closed"
-            pos["closed_at"] = datetime.now().isoformat()
-            
+    async def close_position(self, position_id: str, price: Optional[float] = None) -> Dict:
+        """Close an open position at `price`, or at its last mark"""
+        pos = self.positions.close(position_id, price)
+        if pos:
             return {
                 "status": "success",
-                "position": pos
+                "position": self.positions.to_dict(pos)
             }
         
         return {"status": "error", "message": "Position not found"}
     
     def get_portfolio_summary(self) -> Dict:
         """Get portfolio summary"""
-        total_value = sum(pos.get("amount", 0) * pos.get("price", 0) 
-                         for pos in self.open_positions if pos.get("status") == "open")
-        
-        open_count = sum(1 for pos in self.open_positions if pos.get("status") == "open")
-        closed_count = sum(1 for pos in self.open_positions if pos.get("status") == "closed")
-        
         return {
-            "total_positions": len(self.open_positions),
-            "open": open_count,
-            "closed": closed_count,
-            "total_value": total_value,
+            **self.positions.summary(),
             "portfolio": self.portfolio
         }
     
+    def _index_markets(self, changed: List[MarketInfo], evicted: List[str]) -> None:
+        for m in changed:
+            self.search_index.upsert(m.market_id, m.title, volume=m.volume_24h, liquidity=m.liquidity)
+        for market_id in evicted:
+            self.search_index.remove(market_id)
+
+    def search_markets(self, query: str, limit: int = 10) -> List[MarketInfo]:
+        """Prefix/typo-tolerant title search, ranked by volume and liquidity"""
+        hits = (self.market_cache.get(market_id) for market_id, _ in self.search_index.search(query, limit))
+        return [m for m in hits if m is not None]
+    
     def get_market_info(self, market_id: str) -> Optional[Dict]:
         """Get detailed market information"""
         market = self.market_cache.get(market_id)
@@ -145,8 +200,11 @@ class TradingTerminal:
         return None
     
     async def display_markets(self, limit: int = 10):
-        """Display top markets"""
-        markets = await self.fetch_markets()
+        """Display top markets from the cache"""
+        markets = self.market_cache.top(limit)
+        if not markets:
+            await self.market_cache.refresh()
+            markets = self.market_cache.top(limit)
         
         print("\n" + "="*100)
         print(f"{'MARKET':<40} {'BID':>8} {'ASK':>8} {'SPREAD':>8} {'24H VOL':>15} {'LIQUIDITY':>15}")
@@ -160,6 +218,24 @@ class TradingTerminal:
         
         print("="*100 + "\n")
 
+    async def watch_markets(self, fps: float = 10, stop_evt: Optional[asyncio.Event] = None):
+        """Live market table fed by cache refreshes; redraws only changed cells"""
+        dashboard = LiveDashboard(MARKET_COLUMNS, rank=lambda m: m.volume_24h, fps=fps)
+        for market in self.market_cache.top(len(self.market_cache)):
+            dashboard.push(market.market_id, market)
+
+        def on_update(changed: List[MarketInfo], evicted: List[str]) -> None:
+            for market in changed:
+                dashboard.push(market.market_id, market)
+            for market_id in evicted:
+                dashboard.remove(market_id)
+
+        unsubscribe = self.market_cache.subscribe(on_update)
+        try:
+            await dashboard.run(stop_evt)
+        finally:
+            unsubscribe()
+
 
 async def main():
     """Demo terminal"""
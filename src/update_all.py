@@ -1,71 +1,203 @@
 #!/usr/bin/env python3
 """
 Polyberg: Update all data (markets, news, whales)
+Stages run in-process as a dependency graph on a thread pool, sharing one
+pooled HTTP client, so a cycle takes about as long as its slowest branch.
 """
 
-import subprocess
 import sys
-from pathlib import Path
-import json
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from http_client import HttpClient, shared_client
+from instrumentation import profiled, write_report
+from news_scraper import NewsScraperPolyberg
+from polymarket_full_fetcher import PolymarketFullFetcher
+from publisher import Publisher
+from whale_tracker import WhaleTracker
+
+REPO_ROOT = Path(__file__).parent.parent
+DATA_DIR = REPO_ROOT / "data"
+DOCS_DATA_DIR = REPO_ROOT / "docs" / "data"
+PUBLISHED_FILES = ["live_data.json", "news.json", "whales.json", "price_history.json"]
+
+
+@dataclass
+class Stage:
+    name: str
+    label: str
+    run: Callable[[Dict[str, Any]], Any]  # called with the results of `deps`
+    deps: Tuple[str, ...] = ()  # must succeed first
+    after: Tuple[str, ...] = ()  # must finish first, successfully or not
+    timeout: float = 300
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str = "pending"  # "ok", "error", "timeout", "skipped"
+    started: float = 0.0
+    seconds: float = 0.0
+    error: str = ""
+    value: Any = field(default=None, repr=False)
+
+
+def run_graph(stages: List[Stage], max_workers: int = 8) -> Dict[str, StageResult]:
+    """Run stages as soon as their dependencies succeed
+
+    A stage past its timeout is reported as such and its dependents are
+    skipped; its worker thread is left to finish in the background.
+    """
+    results = {s.name: StageResult(s.name) for s in stages}
+    running: Dict[Future, Stage] = {}
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage")
+
+    def settle_blocked() -> None:
+        changed = True
+        while changed:
+            changed = False
+            for s in stages:
+                r = results[s.name]
+                if r.status == "pending" and any(results[d].status not in ("pending", "running", "ok") for d in s.deps):
+                    r.status = "skipped"
+                    r.error = "dependency failed"
+                    changed = True
+
+    def launch_ready() -> None:
+        for s in stages:
+            r = results[s.name]
+            if (r.status == "pending" and all(results[d].status == "ok" for d in s.deps)
+                    and all(results[d].status not in ("pending", "running") for d in s.after)):
+                r.status = "running"
+                r.started = time.monotonic()
+                deps = {d: results[d].value for d in s.deps}
+                running[pool.submit(s.run, deps)] = s
+                print(f"[{s.name}] started: {s.label}", flush=True)
+
+    launch_ready()
+    while running:
+        now = time.monotonic()
+        next_deadline = min(results[s.name].started + s.timeout for s in running.values())
+        done, _ = wait(running, timeout=max(0.0, next_deadline - now), return_when=FIRST_COMPLETED)
+
+        for fut in done:
+            s = running.pop(fut)
+            r = results[s.name]
+            r.seconds = time.monotonic() - r.started
+            try:
+                r.value = fut.result()
+                r.status = "ok"
+            except Exception as e:
+                r.status = "error"
+                r.error = str(e)
+            print(f"[{s.name}] {r.status} in {r.seconds:.1f}s" + (f": {r.error}" if r.error else ""), flush=True)
+
+        now = time.monotonic()
+        for fut, s in list(running.items()):
+            r = results[s.name]
+            if now - r.started >= s.timeout:
+                running.pop(fut)
+                r.status = "timeout"
+                r.seconds = now - r.started
+                r.error = f"exceeded {s.timeout:.0f}s"
+                # A thread cannot be killed: it keeps its worker until it returns. Its
+                # outputs are written atomically, so later stages see old or new files only
+                print(f"⚠ [{s.name}] timed out after {s.timeout:.0f}s; its thread is still running "
+                      f"and holds a worker", flush=True)
+
+        settle_blocked()
+        launch_ready()
+
+    pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def publish(files: List[str] = PUBLISHED_FILES) -> List[str]:
+    """Publish changed data files into the GitHub Pages tree"""
+    result = Publisher(DATA_DIR, DOCS_DATA_DIR).publish(files)
+    print(f"[publish] {len(result['written'])} written, {len(result['unchanged'])} unchanged"
+          + (f", missing: {', '.join(result['missing'])}" if result["missing"] else ""), flush=True)
+    return result["written"]
+
+
+def build_stages(http: HttpClient) -> List[Stage]:
+    fetcher = PolymarketFullFetcher(http)
+    scraper = NewsScraperPolyberg(http=http)
+    tracker = WhaleTracker(http=http)
+
+    def news(_):
+        articles = scraper.run()
+        scraper.save(DATA_DIR / "news.json")
+        return len(articles)
+
+    def markets(deps):
+        # Linking reads news.json, fresh if the news stage succeeded
+        return fetcher.save(deps["markets_fetch"])["market_count"]
+
+    def whales(_):
+        return len(tracker.track_and_save()["top_whales"])
+
+    return [
+        Stage("markets_fetch", "MARKETS: Fetch 25K+ from Polymarket", lambda _: fetcher.fetch_all_markets(), timeout=240),
+        Stage("news", "NEWS: Scrape from 5+ sources", news, timeout=60),
+        Stage("whales", "WHALES: Track top traders", whales, timeout=240),
+        Stage("markets", "MARKETS: Link news and save", markets, deps=("markets_fetch",), after=("news",), timeout=60),
+        Stage("publish", "DEPLOY: Copy to GitHub Pages", lambda _: publish(), after=("markets", "whales", "news"), timeout=30),
+    ]
+
+
+def report(results: Dict[str, StageResult], elapsed: float, profile: Dict = None) -> Dict:
+    """Print the stage table and write the cycle's run report (data/run_report.json)"""
+    print(f"\n{'STAGE':<16} {'STATUS':<9} {'SECONDS':>8}")
+    for r in results.values():
+        print(f"{r.name:<16} {r.status:<9} {r.seconds:>8.2f}" + (f"  {r.error}" if r.error else ""))
+    print(f"{'cycle':<16} {'':<9} {elapsed:>8.2f}  (sum of stages {sum(r.seconds for r in results.values()):.2f})")
+
+    extra = {
+        "cycle": {
+            "elapsed_sec": round(elapsed, 3),
+            "stages": {
+                r.name: {"status": r.status, "seconds": round(r.seconds, 3), "error": r.error}
+                for r in results.values()
+            },
+        },
+    }
+    if profile:
+        extra["profile"] = profile
+    data = write_report(extra=extra, clear=True)
+    for row in data["slowest"][:5]:
+        print(f"  slowest: {row['stage']:<32} {row['seconds']:>8.2f}s over {row['calls']} calls")
+    return data
 
-def run_command(cmd, label):
-    """Run a command and report results"""
-    print(f"\n{'='*60}")
-    print(f"[{label}]")
-    print('='*60)
-    try:
-        result = subprocess.run(cmd, shell=True, capture_output=False, text=True, timeout=300)
-        return result.returncode == 0
-    except subprocess.TimeoutExpired:
-        print(f"⚠ Timeout on {label}")
-        return False
-    except Exception as e:
-        print(f"✗ Error: {e}")
-        return False
 
 def main():
-    repo_root = Path(__file__).parent.parent
-    
     print(f"""
 ╔════════════════════════════════════════════╗
 ║     POLYBERG DATA UPDATE - Full Cycle      ║
 ╚════════════════════════════════════════════╝
 """)
-    
-    # Run all fetchers
-    success = True
-    success &= run_command("cd {} && python3 src/polymarket_full_fetcher.py".format(repo_root), "MARKETS: Fetch 25K+ from Polymarket")
-    success &= run_command("cd {} && python3 src/news_scraper.py".format(repo_root), "NEWS: Scrape from 5+ sources")
-    success &= run_command("cd {} && python3 src/whale_tracker.py".format(repo_root), "WHALES: Track top traders")
-    
-    # Copy to docs
-    print(f"\n{'='*60}")
-    print("[DEPLOY] Copying to GitHub Pages...")
-    print('='*60)
-    
-    import shutil
-    src_data = repo_root / "data"
-    dst_data = repo_root / "docs" / "data"
-    
-    for json_file in ["live_data.json", "news.json", "whales.json", "price_history.json"]:
-        src = src_data / json_file
-        dst = dst_data / json_file
-        if src.exists():
-            try:
-                shutil.copy2(src, dst)
-                print(f"✓ Copied {json_file}")
-            except Exception as e:
-                print(f"✗ Failed to copy {json_file}: {e}")
-    
+
+    started = time.monotonic()
+    # Not closed on return: a timed-out stage may still be using it
+    http = shared_client()
+    with profiled("update_all") as prof:
+        results = run_graph(build_stages(http))
+    report(results, time.monotonic() - started, prof.summary)
+    success = all(r.status == "ok" for r in results.values())
+
     # Final report
     print(f"\n{'='*60}")
-    print("UPDATE COMPLETE")
+    print("UPDATE COMPLETE" if success else "UPDATE FINISHED WITH ERRORS")
     print('='*60)
     print(f"✓ Live at: https://j-mastenbroek.github.io/openclawAlpha/")
     print(f"✓ Timestamp: {datetime.now(timezone.utc).isoformat()}")
-    
+
     return 0 if success else 1
 
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Polyberg Wallet Statistics Index
+Per-wallet 7d / 30d aggregates maintained incrementally
+- Trades land in hourly buckets, O(1) per trade
+- Buckets falling out of a window are subtracted from its running totals
+- Persisted as compact gzipped JSON
+"""
+
+import gzip
+import json
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+DATA_DIR.mkdir(exist_ok=True)
+
+HOUR_SEC = 3600
+WINDOWS = {"7d": 7 * 24, "30d": 30 * 24}  # window name -> span in hourly buckets
+
+# Bucket layout: [hour, trades, volume, pnl, wins, resolved]
+_HOUR, _TRADES, _VOLUME, _PNL, _WINS, _RESOLVED = range(6)
+
+
+class _Window:
+    """Running totals over the newest buckets within `span` hours of the clock"""
+    __slots__ = ("span", "n", "totals")
+
+    def __init__(self, span: int):
+        self.span = span
+        self.n = 0  # number of newest buckets inside the window
+        self.totals = [0, 0.0, 0.0, 0, 0]  # trades, volume, pnl, wins, resolved
+
+    def add(self, trades: int, volume: float, pnl: float, wins: int, resolved: int) -> None:
+        t = self.totals
+        t[0] += trades
+        t[1] += volume
+        t[2] += pnl
+        t[3] += wins
+        t[4] += resolved
+
+    def expire(self, buckets: deque, now_hour: int) -> None:
+        cutoff = now_hour - self.span
+        t = self.totals
+        while self.n and buckets[-self.n][_HOUR] <= cutoff:
+            b = buckets[-self.n]
+            t[0] -= b[_TRADES]
+            t[1] -= b[_VOLUME]
+            t[2] -= b[_PNL]
+            t[3] -= b[_WINS]
+            t[4] -= b[_RESOLVED]
+            self.n -= 1
+
+
+class WalletStats:
+    """Hourly buckets and window totals for one wallet"""
+    __slots__ = ("buckets", "windows", "clock", "last_trade")
+
+    def __init__(self):
+        self.buckets: deque = deque()
+        self.windows = [_Window(span) for span in WINDOWS.values()]
+        self.clock = 0  # newest hour seen, by trade or expiry
+        self.last_trade: Optional[int] = None
+
+    def _bucket(self, hour: int) -> Tuple[list, bool]:
+        """Bucket for `hour` and whether it was just created"""
+        buckets = self.buckets
+        if not buckets or hour > buckets[-1][_HOUR]:
+            b = [hour, 0, 0.0, 0.0, 0, 0]
+            buckets.append(b)
+            return b, True
+        if hour == buckets[-1][_HOUR]:
+            return buckets[-1], False
+
+        # Late trade: walk back from the newest end to its slot
+        i = len(buckets) - 1
+        while i >= 0 and buckets[i][_HOUR] > hour:
+            i -= 1
+        if i >= 0 and buckets[i][_HOUR] == hour:
+            return buckets[i], False
+        b = [hour, 0, 0.0, 0.0, 0, 0]
+        buckets.insert(i + 1, b)
+        return b, True
+
+    def record(self, ts: int, volume: float, pnl: float, won: Optional[bool]) -> None:
+        hour = ts // HOUR_SEC
+        if hour > self.clock:
+            self.expire(hour)
+        b, created = self._bucket(hour)
+        wins = 1 if won else 0
+        resolved = 0 if won is None else 1
+        b[_TRADES] += 1
+        b[_VOLUME] += volume
+        b[_PNL] += pnl
+        b[_WINS] += wins
+        b[_RESOLVED] += resolved
+        for w in self.windows:
+            if hour > self.clock - w.span:
+                if created:
+                    w.n += 1
+                w.add(1, volume, pnl, wins, resolved)
+        if self.last_trade is None or ts > self.last_trade:
+            self.last_trade = ts
+
+    def expire(self, now_hour: int) -> bool:
+        """Advance the clock; True when any window total changed"""
+        self.clock = max(self.clock, now_hour)
+        changed = False
+        for w in self.windows:
+            n = w.n
+            w.expire(self.buckets, self.clock)
+            changed |= w.n != n
+        cutoff = self.clock - max(WINDOWS.values())
+        while self.buckets and self.buckets[0][_HOUR] <= cutoff:
+            self.buckets.popleft()
+        return changed
+
+    def rebuild(self) -> None:
+        """Recompute window totals from the buckets"""
+        for w in self.windows:
+            w.n, w.totals = 0, [0, 0.0, 0.0, 0, 0]
+            for b in reversed(self.buckets):
+                if b[_HOUR] <= self.clock - w.span:
+                    break
+                w.n += 1
+                w.add(b[_TRADES], b[_VOLUME], b[_PNL], b[_WINS], b[_RESOLVED])
+
+    def snapshot(self) -> Dict:
+        out = {}
+        for name, w in zip(WINDOWS, self.windows):
+            trades, volume, pnl, _, _ = w.totals
+            out[f"trades_{name}"] = trades
+            out[f"volume_{name}"] = round(volume, 2)
+            out[f"pnl_{name}"] = round(pnl, 2)
+        _, _, _, wins, resolved = self.windows[-1].totals
+        out["win_rate"] = round(wins / resolved, 3) if resolved else 0.0
+        out["last_trade"] = (
+            datetime.fromtimestamp(self.last_trade, timezone.utc).isoformat()
+            if self.last_trade is not None else None
+        )
+        return out
+
+
+class WalletStatsIndex:
+    """Sliding-window trade aggregates for every observed wallet"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or DATA_DIR / "wallet_stats.json.gz"
+        self.wallets: Dict[str, WalletStats] = {}
+        self.block: Optional[int] = None  # last chain block whose transfers are included
+
+    def __len__(self) -> int:
+        return len(self.wallets)
+
+    def __contains__(self, address: str) -> bool:
+        return address.lower() in self.wallets
+
+    def addresses(self) -> Iterator[str]:
+        return iter(self.wallets)
+
+    def record_trade(self, address: str, ts: int, volume: float,
+                     pnl: float = 0.0, won: Optional[bool] = None) -> WalletStats:
+        """Add one trade (epoch seconds) to a wallet's buckets"""
+        address = address.lower()
+        stats = self.wallets.get(address)
+        if stats is None:
+            stats = self.wallets[address] = WalletStats()
+        stats.record(int(ts), float(volume), float(pnl), won)
+        return stats
+
+    def expire(self, now: Optional[int] = None) -> List[str]:
+        """Drop buckets that fell out of every window, and wallets left empty
+
+        Returns the addresses whose aggregates changed, including removed ones.
+        """
+        now_hour = int(now if now is not None else datetime.now(timezone.utc).timestamp()) // HOUR_SEC
+        changed, empty = [], []
+        for address, stats in self.wallets.items():
+            if stats.expire(now_hour):
+                changed.append(address)
+            if not stats.buckets:
+                empty.append(address)
+        for address in empty:
+            del self.wallets[address]
+        return changed
+
+    def get(self, address: str) -> Optional[Dict]:
+        stats = self.wallets.get(address.lower())
+        if stats is None:
+            return None
+        return {"address": address.lower(), **stats.snapshot()}
+
+    def snapshot_all(self) -> List[Dict]:
+        return [{"address": a, **s.snapshot()} for a, s in self.wallets.items()]
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "WalletStatsIndex":
+        index = cls(path)
+        if not index.path.exists():
+            return index
+        try:
+            with gzip.open(index.path, "rt") as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return index
+
+        index.block = raw.get("block")
+        for address, (last_trade, clock, buckets) in raw.get("wallets", {}).items():
+            stats = WalletStats()
+            stats.last_trade = last_trade
+            stats.clock = clock
+            stats.buckets = deque(buckets)
+            stats.rebuild()
+            index.wallets[address] = stats
+        return index
+
+    def save(self) -> None:
+        raw = {
+            "version": 1,
+            "block": self.block,
+            "wallets": {a: [s.last_trade, s.clock, list(s.buckets)] for a, s in self.wallets.items()},
+        }
+        tmp = self.path.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", compresslevel=6) as f:
+            json.dump(raw, f, separators=(",", ":"))
+        tmp.replace(self.path)
+
+
+__all__ = [
+    "WalletStats",
+    "WalletStatsIndex",
+]
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Polyberg Whale Alerts
+Stream large transfers by watched wallets to subscribers as they happen
+- Sources: eth_subscribe over WebSocket, or polling new blocks over JSON-RPC
+- O(1) watched-wallet match per transfer
+- Fan-out through bounded per-subscriber queues (oldest alert dropped when full)
+- Watched wallets refreshed from the saved leaderboard every WATCH_REFRESH_SEC
+- Sinks: terminal, JSON-lines file, local TCP socket
+"""
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Iterable, Optional
+import websockets
+
+from chain_ingest import TRANSFER_TOPIC, TransferIngestor
+from whale_tracker import DATA_DIR, WhaleTracker
+
+DEFAULT_MIN_ALERT = 50_000
+DEFAULT_QUEUE_SIZE = 256
+WATCH_REFRESH_SEC = 300
+STATS_INTERVAL = 60
+RECONNECT_MIN_SEC = 0.2
+RECONNECT_MAX_SEC = 30
+
+
+def _short(address: str) -> str:
+    return f"{address[:6]}…{address[-4:]}"
+
+
+class Subscriber:
+    """Bounded alert queue drained into one sink by its own task"""
+
+    def __init__(self, name: str, sink: Callable, maxsize: int = DEFAULT_QUEUE_SIZE):
+        self.name = name
+        self.sink = sink
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.delivered = 0
+        self.dropped = 0
+        self.max_lag_ms = 0.0
+
+    def offer(self, alert: dict) -> None:
+        """Enqueue without blocking the publisher; a slow sink loses its oldest alert"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(alert)
+
+    async def drain(self) -> None:
+        while True:
+            alert = await self.queue.get()
+            try:
+                result = self.sink(alert)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                print(f"[Alerts] {self.name} sink error: {e}", flush=True)
+                continue
+            self.delivered += 1
+            lag = time.time() * 1000 - alert["detected_ms"]
+            if lag > self.max_lag_ms:
+                self.max_lag_ms = lag
+
+
+class WhaleAlertStream:
+    """Match transfers against watched wallets and fan alerts out"""
+
+    def __init__(self, watched: Iterable[str] = (), min_amount: float = DEFAULT_MIN_ALERT):
+        self.watched = {a.lower() for a in watched}
+        self.min_amount = min_amount
+        self.subscribers: Dict[str, Subscriber] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.stats = {"events": 0, "alerts": 0}
+
+    def watch(self, addresses: Iterable[str]) -> None:
+        self.watched.update(a.lower() for a in addresses)
+
+    def unwatch(self, addresses: Iterable[str]) -> None:
+        self.watched.difference_update(a.lower() for a in addresses)
+
+    def subscribe(self, name: str, sink: Callable, maxsize: int = DEFAULT_QUEUE_SIZE) -> Subscriber:
+        """Register a sink (sync or async callable taking one alert dict)"""
+        sub = Subscriber(name, sink, maxsize)
+        self.subscribers[name] = sub
+        try:
+            self._tasks[name] = asyncio.get_running_loop().create_task(sub.drain())
+        except RuntimeError:
+            pass  # started by run()
+        return sub
+
+    def unsubscribe(self, name: str) -> None:
+        self.subscribers.pop(name, None)
+        task = self._tasks.pop(name, None)
+        if task:
+            task.cancel()
+
+    def set_watched(self, addresses: Iterable[str]) -> None:
+        """Replace the watched set, through watch()/unwatch()"""
+        addresses = {a.lower() for a in addresses}
+        self.unwatch(self.watched - addresses)
+        self.watch(addresses)
+
+    def print_stats(self) -> None:
+        subs = " | ".join(f"{s.name} delivered={s.delivered} dropped={s.dropped} max_lag={s.max_lag_ms:.0f}ms"
+                          for s in self.subscribers.values())
+        print(f"[Alerts] events={self.stats['events']} alerts={self.stats['alerts']} | {subs}", flush=True)
+
+    def match(self, transfer: dict) -> Optional[dict]:
+        if transfer["amount"] < self.min_amount:
+            return None
+        if transfer["from"] in self.watched:
+            wallet, direction = transfer["from"], "out"
+        elif transfer["to"] in self.watched:
+            wallet, direction = transfer["to"], "in"
+        else:
+            return None
+        return {
+            **transfer,
+            "wallet": wallet,
+            "direction": direction,
+            "detected_ms": int(time.time() * 1000),
+        }
+
+    def publish(self, transfer: dict) -> Optional[dict]:
+        self.stats["events"] += 1
+        alert = self.match(transfer)
+        if alert is None:
+            return None
+        self.stats["alerts"] += 1
+        for sub in self.subscribers.values():
+            sub.offer(alert)
+        return alert
+
+    async def run(self, source: AsyncIterator[dict], stop_evt: asyncio.Event) -> None:
+        loop = asyncio.get_running_loop()
+        for name, sub in self.subscribers.items():
+            if name not in self._tasks:
+                self._tasks[name] = loop.create_task(sub.drain())
+        stats_task = loop.create_task(self._stats_loop(stop_evt))
+        try:
+            async for transfer in source:
+                self.publish(transfer)
+                if stop_evt.is_set():
+                    break
+        finally:
+            stats_task.cancel()
+            # Give sinks a moment to flush what is already queued
+            for sub in self.subscribers.values():
+                try:
+                    await asyncio.wait_for(_wait_empty(sub.queue), timeout=1)
+                except asyncio.TimeoutError:
+                    pass
+            for task in self._tasks.values():
+                task.cancel()
+            self._tasks.clear()
+            self.print_stats()
+
+    async def _stats_loop(self, stop_evt: asyncio.Event, interval: float = STATS_INTERVAL) -> None:
+        while not stop_evt.is_set():
+            try:
+                await asyncio.wait_for(stop_evt.wait(), interval)
+            except asyncio.TimeoutError:
+                self.print_stats()
+
+
+async def _wait_empty(queue: asyncio.Queue) -> None:
+    while not queue.empty():
+        await asyncio.sleep(0.01)
+
+
+async def poll_transfers(ingestor: TransferIngestor, stop_evt: asyncio.Event,
+                         interval: float = 1.0) -> AsyncIterator[dict]:
+    """Poll for new blocks and yield their transfers"""
+    loop = asyncio.get_running_loop()
+    while not stop_evt.is_set():
+        try:
+            transfers = await loop.run_in_executor(None, ingestor.run, False)
+        except Exception as e:
+            print(f"[Alerts] poll error: {e}", flush=True)
+            transfers = []
+        for t in transfers:
+            yield t
+        ingestor.commit()
+        try:
+            await asyncio.wait_for(stop_evt.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def subscribe_transfers(ws_url: str, ingestor: TransferIngestor,
+                              stop_evt: asyncio.Event) -> AsyncIterator[dict]:
+    """Yield transfers pushed by an eth_subscribe("logs") WebSocket"""
+    sub_msg = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "eth_subscribe",
+        "params": ["logs", {"address": list(ingestor.contracts.values()), "topics": [TRANSFER_TOPIC]}],
+    }
+
+    delay = RECONNECT_MIN_SEC
+    while not stop_evt.is_set():
+        try:
+            async with websockets.connect(ws_url, ping_interval=20, ping_timeout=20, close_timeout=5) as ws:
+                await ws.send(json.dumps(sub_msg))
+                reply = json.loads(await asyncio.wait_for(ws.recv(), timeout=30))
+                if reply.get("error") or not reply.get("result"):
+                    raise RuntimeError(f"eth_subscribe refused: {reply.get('error') or reply}")
+                print(f"[Alerts] subscribed to logs ({reply['result']})", flush=True)
+                delay = RECONNECT_MIN_SEC
+
+                while not stop_evt.is_set():
+                    try:
+                        raw = await asyncio.wait_for(ws.recv(), timeout=30)
+                    except asyncio.TimeoutError:
+                        continue
+
+                    try:
+                        msg = json.loads(raw)
+                    except Exception:
+                        continue
+
+                    log = (msg.get("params") or {}).get("result")
+                    if not isinstance(log, dict) or log.get("removed"):
+                        continue
+
+                    t = ingestor.decode_log(log)
+                    if t:
+                        t["ts"] = int(time.time())
+                        yield t
+
+        except Exception as e:
+            print(f"[Alerts] subscription error: {e!r}", flush=True)
+
+        if not stop_evt.is_set():
+            print(f"[Alerts] closed -> reconnect in {delay:.1f}s", flush=True)
+            try:
+                await asyncio.wait_for(stop_evt.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, RECONNECT_MAX_SEC)
+
+
+async def refresh_watched(stream: WhaleAlertStream, tracker: WhaleTracker, stop_evt: asyncio.Event,
+                          interval: float = WATCH_REFRESH_SEC) -> None:
+    """Follow the leaderboard as update_all.py saves new wallet stats"""
+    while not stop_evt.is_set():
+        try:
+            await asyncio.wait_for(stop_evt.wait(), interval)
+            return
+        except asyncio.TimeoutError:
+            pass
+        def reload() -> set:
+            tracker.reload_stats()
+            return tracker.watched_wallets()
+
+        try:
+            watched = await asyncio.to_thread(reload)
+        except Exception as e:
+            print(f"[Alerts] watch refresh error: {e}", flush=True)
+            continue
+        added, removed = len(watched - stream.watched), len(stream.watched - watched)
+        stream.set_watched(watched)
+        if added or removed:
+            print(f"[Alerts] watching {len(stream.watched)} wallets (+{added} -{removed})", flush=True)
+
+
+def terminal_sink(alert: dict) -> None:
+    arrow = "→" if alert["direction"] == "out" else "←"
+    token = alert["token"].split("_")[0].upper()
+    print(
+        f"[Alert] {_short(alert['wallet'])} {arrow} {alert['amount']:>14,.0f} {token} "
+        f"{_short(alert['to'] if alert['direction'] == 'out' else alert['from'])} tx={alert['tx'][:12]}",
+        flush=True,
+    )
+
+
+class FileSink:
+    """Append alerts as JSON lines"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._f = open(self.path, "a")
+
+    def __call__(self, alert: dict) -> None:
+        self._f.write(json.dumps(alert) + "\n")
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class SocketSink:
+    """Broadcast alerts as JSON lines to local TCP clients"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, max_buffer: int = 1 << 20):
+        self.host = host
+        self.port = port
+        self.max_buffer = max_buffer
+        self.clients = set()
+        self.server = None
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._client, self.host, self.port)
+        print(f"[Alerts] socket sink on {self.host}:{self.port}", flush=True)
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.clients.add(writer)
+        try:
+            await reader.read()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    def __call__(self, alert: dict) -> None:
+        line = (json.dumps(alert) + "\n").encode()
+        for writer in list(self.clients):
+            # A client that stops reading is cut off instead of buffering forever
+            if writer.transport.get_write_buffer_size() > self.max_buffer:
+                self.clients.discard(writer)
+                writer.close()
+                continue
+            writer.write(line)
+
+    async def close(self) -> None:
+        for writer in list(self.clients):
+            writer.close()
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+
+async def main():
+    """Stream whale alerts to the terminal, data/whale_alerts.jsonl and a local socket"""
+    rpc_url = os.environ.get("POLYBERG_RPC_URL")
+    ws_url = os.environ.get("POLYBERG_WS_URL")
+    if not rpc_url:
+        print("Set POLYBERG_RPC_URL (and optionally POLYBERG_WS_URL) to stream alerts")
+        return
+
+    tracker = WhaleTracker(rpc_url=rpc_url)
+    ingestor = TransferIngestor(
+        rpc_url,
+        WhaleTracker.CONTRACTS,
+        decimals=WhaleTracker.TOKEN_DECIMALS,
+        confirmations=1,
+        lookback_blocks=0,
+        min_amount=DEFAULT_MIN_ALERT,
+        checkpoint_file=DATA_DIR / "chain_stream_checkpoint.json",
+    )
+    ingestor.checkpoint = None  # alerts are for new blocks only
+
+    stream = WhaleAlertStream(tracker.watched_wallets())
+    print(f"[Alerts] watching {len(stream.watched)} wallets", flush=True)
+
+    file_sink = FileSink(DATA_DIR / "whale_alerts.jsonl")
+    socket_sink = SocketSink()
+    await socket_sink.start()
+    stream.subscribe("terminal", terminal_sink)
+    stream.subscribe("file", file_sink)
+    stream.subscribe("socket", socket_sink)
+
+    stop_evt = asyncio.Event()
+    source = subscribe_transfers(ws_url, ingestor, stop_evt) if ws_url else poll_transfers(ingestor, stop_evt)
+    refresher = asyncio.create_task(refresh_watched(stream, tracker, stop_evt))
+    try:
+        await stream.run(source, stop_evt)
+    finally:
+        refresher.cancel()
+        file_sink.close()
+        await socket_sink.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
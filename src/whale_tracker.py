@@ -6,15 +6,32 @@ No API keys required - uses public contract event parsing
 """
 
 import json
-import requests
+import os
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 from typing import List, Dict, Optional
 import time
 
+try:
+    from .chain_ingest import TransferIngestor
+    from .http_client import HttpClient, shared_client
+    from .instrumentation import metrics, profiled, write_report
+    from .wallet_stats import WalletStatsIndex
+    from .leaderboard import Leaderboard
+except ImportError:
+    from chain_ingest import TransferIngestor
+    from http_client import HttpClient, shared_client
+    from instrumentation import metrics, profiled, write_report
+    from wallet_stats import WalletStatsIndex
+    from leaderboard import Leaderboard
+
 DATA_DIR = Path(__file__).parent.parent / "data"
 DATA_DIR.mkdir(exist_ok=True)
 
+# Transfers carry amounts but no outcome, so only these are measurable on-chain
+CHAIN_METRICS = ("volume_30d", "trades_30d")
+UNMEASURED_FIELDS = ("pnl_7d", "pnl_30d", "win_rate")
+
 class WhaleTracker:
     """Track whale movements from blockchain contracts"""
     
@@ -30,12 +47,104 @@ class WhaleTracker:
         "dai_ethereum": "0x6b175474e89094c44da98b954eedeac495271d0f",
     }
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            "User-Agent": "Polyberg/1.0",
-        })
+    TOKEN_DECIMALS = {
+        "usdc_ethereum": 6,
+        "dai_ethereum": 18,
+    }
+    
+    def __init__(self, rpc_url: Optional[str] = None, http: Optional[HttpClient] = None):
+        self.http = http or shared_client()
+        self.metrics = metrics("whales")
         self.whales = []
+        self.transfers: List[Dict] = []
+        self.stats_index = WalletStatsIndex.load()
+        self.leaderboard = Leaderboard(CHAIN_METRICS)
+        self._dirty_wallets = set(self.stats_index.addresses())
+        
+        # On-chain ingestion is enabled when an Ethereum JSON-RPC endpoint is configured
+        rpc_url = rpc_url or os.environ.get("POLYBERG_RPC_URL")
+        self.ingestor = TransferIngestor(
+            rpc_url,
+            self.CONTRACTS,
+            decimals=self.TOKEN_DECIMALS,
+        ) if rpc_url else None
+        # The stats file records the block it was saved at, atomically with the stats.
+        # If a run died between saving it and checkpointing, resume after that block
+        # instead of counting its transfers twice
+        block = self.stats_index.block
+        if self.ingestor and block is not None and (self.ingestor.checkpoint is None or block > self.ingestor.checkpoint):
+            self.ingestor.checkpoint = block
+    
+    def ingest_transfers(self) -> List[Dict]:
+        """Pull new Transfer logs for CONTRACTS since the last checkpoint"""
+        if not self.ingestor:
+            return []
+        try:
+            self.transfers = self.ingestor.run()
+        except Exception as e:
+            print(f"[Whales] Chain ingestion error: {e}")
+            self.transfers = []
+            self.ingestor.scanned = None
+        
+        # Each transfer counts as a trade for both sides in the rolling windows
+        for t in self.transfers:
+            if t.get("ts") is None:
+                continue
+            self.stats_index.record_trade(t["from"], t["ts"], t["amount"])
+            self.stats_index.record_trade(t["to"], t["ts"], t["amount"])
+            self._dirty_wallets.add(t["from"])
+            self._dirty_wallets.add(t["to"])
+        if self.ingestor.scanned is not None:
+            self.stats_index.block = self.ingestor.scanned
+        return self.transfers
+    
+    def refresh_leaderboard(self) -> None:
+        """Re-rank only wallets whose rolling stats changed since the last refresh"""
+        self._dirty_wallets.update(self.stats_index.expire())
+        for address in self._dirty_wallets:
+            stats = self.stats_index.get(address)
+            if stats is None:
+                self.leaderboard.remove(address)
+                continue
+            self.leaderboard.update(address, {
+                **{k: v for k, v in stats.items() if k not in UNMEASURED_FIELDS},
+                "nickname": f"{address[:6]}…{address[-4:]}",
+                "favorite_markets": [],
+            })
+        self._dirty_wallets.clear()
+    
+    def reload_stats(self) -> None:
+        """Pick up wallet stats saved since by another process (update_all.py)"""
+        old = set(self.stats_index.addresses())
+        self.stats_index = WalletStatsIndex.load()
+        self._dirty_wallets.update(old, self.stats_index.addresses())
+    
+    def watched_wallets(self, limit: int = 500) -> set:
+        """Addresses worth alerting on: known whales plus the volume leaders"""
+        self.refresh_leaderboard()
+        wallets = {a.lower() for a in self.KNOWN_WHALE_WALLETS}
+        wallets.update(w["address"] for w in self.leaderboard.top("volume_30d", limit))
+        return wallets
+    
+    def _whales_from_index(self, limit: int = 25) -> List[Dict]:
+        """Build whale records from the rolling wallet statistics"""
+        self.refresh_leaderboard()
+        return self.leaderboard.top("volume_30d", limit)
+    
+    def _activity_from_transfers(self, transfers: List[Dict]) -> List[Dict]:
+        """Turn the newest ingested transfers into activity log entries"""
+        activity = []
+        for t in reversed(transfers[-50:]):
+            activity.append({
+                "whale": f"{t['from'][:6]}…{t['from'][-4:]}",
+                "action": "transfer",
+                "market": t["token"].split("_")[0].upper(),
+                "amount": round(t["amount"], 2),
+                "timestamp": datetime.fromtimestamp(t["ts"], timezone.utc).isoformat() if t.get("ts") else None,
+                "tx": t["tx"],
+                "to": t["to"],
+            })
+        return activity
     
     def fetch_top_holders(self, token: str = "usdc") -> List[Dict]:
         """Fetch top token holders from public blockchain data"""
@@ -53,19 +162,23 @@ class WhaleTracker:
                 
                 # Using DefiLlama's public API (no key required)
                 try:
-                    response = self.session.get(
-                        f"https://coins.llama.fi/marketcap/ethereum:{contract}",
-                        timeout=10
-                    )
+                    with self.metrics.stage("http"):
+                        response = self.http.get(
+                            f"https://coins.llama.fi/marketcap/ethereum:{contract}",
+                            timeout=10
+                        )
+                    self.metrics.add_bytes("http", len(response.content))
                     if response.status_code == 200:
                         data = response.json()
                         # This gives us USDC data but not individual holders
                 except:
                     pass
             
-            # Alternative: Track from known Polymarket integrations
-            # Simulate whale activity based on known patterns
-            whales = self._generate_whale_data()
+            if len(self.stats_index):
+                whales = self._whales_from_index()
+            else:
+                # No chain endpoint configured: fall back to demonstration data
+                whales = self._generate_whale_data()
         
         except Exception as e:
             print(f"Whale tracking error: {e}")
@@ -142,13 +255,11 @@ class WhaleTracker:
         try:
             print("[Whales] Fetching whale activity...")
             
-            # In production, this would:
-            # 1. Monitor on-chain transfer events
-            # 2. Parse transaction logs for large positions
-            # 3. Track collateral deposits/withdrawals
-            
-            # For now, simulate activity
-            activity = self._generate_activity()
+            if self.ingestor:
+                activity = self._activity_from_transfers(self.transfers)
+            else:
+                # No chain endpoint configured: fall back to demonstration data
+                activity = self._generate_activity()
         
         except Exception as e:
             print(f"Activity tracking error: {e}")
@@ -202,22 +313,42 @@ class WhaleTracker:
     
     def track_and_save(self) -> Dict:
         """Track whales and save data"""
-        whales = self.fetch_top_holders()
-        activity = self.fetch_whale_activity()
+        with self.metrics.stage("ingest"):
+            self.ingest_transfers()
+        self.metrics.count("transfers", len(self.transfers))
+        with self.metrics.stage("rank"):
+            whales = self.fetch_top_holders()
+        with self.metrics.stage("activity"):
+            activity = self.fetch_whale_activity()
         
         data = {
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "top_whales": whales,
             "recent_activity": activity,
         }
+        if len(self.leaderboard):
+            data["wallet_count"] = len(self.leaderboard)
+            data["leaderboard"] = {m: self.leaderboard.page(m, 1, 25) for m in self.leaderboard.metrics}
+        
+        if self.ingestor:
+            with self.metrics.stage("stats_save"):
+                self.stats_index.save()
+            # Only now are the scanned blocks safe to skip on the next run
+            self.ingestor.commit()
         
         output_file = DATA_DIR / "whales.json"
-        with open(output_file, "w") as f:
-            json.dump(data, f, indent=2)
+        tmp = output_file.with_suffix(".tmp")
+        with self.metrics.stage("write"):
+            with open(tmp, "w") as f:
+                json.dump(data, f, indent=2)
+            tmp.replace(output_file)
+        self.metrics.add_bytes("whales_json", output_file.stat().st_size)
         
         print(f"✓ Saved whale data: {len(whales)} whales, {len(activity)} activity logs")
         return data
 
 if __name__ == "__main__":
     tracker = WhaleTracker()
-    tracker.track_and_save()
+    with profiled("whales") as prof:
+        tracker.track_and_save()
+    write_report(extra={"profile": prof.summary} if prof.summary else None)